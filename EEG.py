@@ -1,19 +1,36 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 from flask_login import LoginManager, UserMixin, login_user, login_required, current_user
-import numpy as np
-import mne
+import os
+from collections import OrderedDict
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from lazy_imports import lazy_import
+import http_cache
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key'  # Change this to a random secret key
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Heavy libraries are imported on first use so worker boot stays fast
+np = lazy_import('numpy')
+mne = lazy_import('mne')
+overview_pyramid = lazy_import('overview_pyramid')
+live_frames = lazy_import('live_frames')
+asr = lazy_import('asr')
+spatial_filters = lazy_import('spatial_filters')
+
+bp = Blueprint('eeg', __name__)
+socketio = SocketIO(cors_allowed_origins="*")
 login_manager = LoginManager()
-login_manager.init_app(app)
-limiter = Limiter(app, key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address)
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'your-secret-key'  # Change this to a random secret key
+    CORS(app)
+    socketio.init_app(app)
+    login_manager.init_app(app)
+    limiter.init_app(app)
+    app.register_blueprint(bp)
+    return app
 
 class User(UserMixin):
     def __init__(self, id):
@@ -23,7 +40,7 @@ class User(UserMixin):
 def load_user(user_id):
     return User(user_id)
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def login():
     # This is a basic example. In a real application, you'd verify credentials against a database
     username = request.json.get('username')
@@ -34,34 +51,175 @@ def login():
         return jsonify({'success': True})
     return jsonify({'success': False}), 401
 
-def process_eeg_data(file_path):
+# Overview pyramids built at ingest are saved next to the recording; loaded
+# ones are kept keyed by (path, mtime, size) of the saved file
+_overview_cache = OrderedDict()
+MAX_CACHED_OVERVIEWS = 8
+OVERVIEW_SUFFIX = '.overview.npz'
+
+# Band-pass applied before building overviews; part of the response ETag
+FILTER_BAND = (1, 40)
+
+# Serialized /api/eeg-data responses keyed by ETag and encoding
+response_cache = http_cache.DiskCache(os.path.join('cache', 'responses'))
+
+def overview_path(file_path):
+    return file_path + OVERVIEW_SUFFIX
+
+def build_overview(file_path):
+    # Runs once per upload: the only pass over the full recording
     try:
         raw = mne.io.read_raw_edf(file_path, preload=True)
-        raw.filter(l_freq=1, h_freq=40)
-        data, times = raw[:, :]
-        channels = {ch_name: data[i, :].tolist() for i, ch_name in enumerate(raw.ch_names)}
-        return {'time': times.tolist(), 'channels': channels}
+        raw.filter(l_freq=FILTER_BAND[0], h_freq=FILTER_BAND[1])
+        pyramid = overview_pyramid.OverviewPyramid(raw.get_data(), raw.info['sfreq'], raw.ch_names)
+        pyramid.save(overview_path(file_path))
     except FileNotFoundError:
         raise ValueError("EEG file not found")
     except Exception as e:
         raise ValueError(f"Error processing EEG data: {str(e)}")
+    return pyramid
+
+def load_overview(file_path):
+    path = overview_path(file_path)
+    source = os.stat(file_path)
+    if not os.path.exists(path) or os.stat(path).st_mtime_ns < source.st_mtime_ns:
+        raise ValueError("No overview has been built for this recording; upload it again")
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key in _overview_cache:
+        _overview_cache.move_to_end(key)
+        return _overview_cache[key]
+    pyramid = overview_pyramid.OverviewPyramid.load(path)
+    _overview_cache[key] = pyramid
+    if len(_overview_cache) > MAX_CACHED_OVERVIEWS:
+        _overview_cache.popitem(last=False)
+    return pyramid
+
+def eeg_data_response(file_path, tmin=None, tmax=None, max_points=None):
+    # The payload depends only on the file content and the query, so it is
+    # served with an ETag and cached in serialized, compressed form
+    try:
+        etag = http_cache.make_etag(http_cache.file_digest(file_path),
+                                    {'start': tmin, 'end': tmax, 'width': max_points, 'filter': FILTER_BAND})
+        last_modified = http_cache.file_mtime(file_path)
+    except FileNotFoundError:
+        raise ValueError("EEG file not found")
+    return http_cache.conditional_response(
+        etag, lambda: process_eeg_data(file_path, tmin, tmax, max_points),
+        last_modified=last_modified, cache=response_cache
+    )
+
+def process_eeg_data(file_path, tmin=None, tmax=None, max_points=None):
+    try:
+        pyramid = load_overview(file_path)
+        return pyramid.query(tmin, tmax, max_points or overview_pyramid.DEFAULT_MAX_POINTS)
+    except FileNotFoundError:
+        raise ValueError("EEG file not found")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error processing EEG data: {str(e)}")
 
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
 
+# Coalescing binary frame emitter shared by all live viewers; process_eeg
+# pushes the cleaned blocks it produces into it
+_live_stream = None
+
+def get_live_stream():
+    global _live_stream
+    if _live_stream is None:
+        _live_stream = live_frames.FrameEmitter(socketio)
+        _live_stream.start()
+    return _live_stream
+
+def publish_live(ch_names, sfreq, block):
+    # A new channel layout or rate starts a new stream; otherwise the block
+    # continues the current one
+    stream = get_live_stream()
+    if stream.ch_names != list(ch_names) or stream.sfreq != float(sfreq):
+        stream.open(ch_names, sfreq)
+    stream.push(block)
+
+@socketio.on('subscribe_live')
+@login_required
+def subscribe_live(settings=None):
+    settings = settings or {}
+    try:
+        get_live_stream().add_client(request.sid, settings.get('encoding', 'float32'),
+                                     settings.get('fps', live_frames.DEFAULT_FPS))
+    except (ValueError, TypeError) as e:
+        emit('error', {'error': str(e)})
+
+# Streaming ASR cleaners of connections sending consecutive blocks, with the
+# time of the next sample each will release
+_asr_streams = {}
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    if _live_stream is not None:
+        _live_stream.remove_client(request.sid)
+    _asr_streams.pop(request.sid, None)
+
 @socketio.on('process_eeg')
 @login_required
 def process_eeg(data):
-    # Process EEG data in real-time
-    # This is a placeholder, replace with actual processing
-    processed_data = np.random.rand(10, 100).tolist()
-    emit('eeg_data', {'data': processed_data})
+    # Artifact subspace reconstruction of {time, channels} blocks. A single
+    # block is cleaned as a whole; with 'stream' set, blocks continue one
+    # stream per connection (calibrated on the first block) and the samples
+    # released so far are returned. An optional 'spatial' mapping
+    # ({reference, laplacian}) applies a cached spatial operator afterwards,
+    # with sensor positions from the standard 10-20 montage. Connections
+    # subscribed to the live stream receive the result as binary eeg_frame
+    # pushes; others get a JSON eeg_data message
+    data = data or {}
+    try:
+        eeg = data['data']
+        ch_names = list(eeg['channels'])
+        block = np.array([eeg['channels'][ch] for ch in ch_names], dtype=float)
+        times = np.asarray(eeg['time'], dtype=float)
+        sfreq = float(data.get('sfreq') or 1.0 / np.median(np.diff(times)))
+        stream = _asr_streams.get(request.sid) if data.get('stream') else None
+        if stream is None or stream[0].n_channels != len(ch_names) or stream[0].sfreq != sfreq:
+            cleaner = asr.ASR(sfreq, cutoff=data.get('cutoff', asr.DEFAULT_CUTOFF),
+                              lookahead=0 if data.get('stream') else None)
+            cleaner.calibrate(asr.find_clean_segment(block, sfreq))
+            stream = [cleaner, float(times[0])]
+            if data.get('stream'):
+                _asr_streams[request.sid] = stream
+        cleaner, start = stream
+        if data.get('stream'):
+            cleaned = cleaner.transform(block)
+            stream[1] = start + cleaned.shape[1] / sfreq
+        else:
+            cleaned = cleaner.clean(block)
+        cleaned_times = start + np.arange(cleaned.shape[1]) / sfreq
+        if data.get('spatial'):
+            spatial = data['spatial']
+            pos = spatial_filters.standard_positions(ch_names) if spatial.get('laplacian') else None
+            operator = spatial_filters.build_operator(ch_names, pos=pos,
+                                                      reference=spatial.get('reference'),
+                                                      laplacian=spatial.get('laplacian'))
+            cleaned = operator.apply(cleaned)
+    except (KeyError, TypeError, ValueError, np.linalg.LinAlgError) as e:
+        emit('error', {'error': f"Cannot clean EEG block: {str(e)}"})
+        return
+    if _live_stream is not None and request.sid in _live_stream.clients:
+        publish_live(ch_names, sfreq, cleaned)
+        return
+    emit('eeg_data', {'time': cleaned_times.tolist(),
+                      'channels': {ch: cleaned[i].tolist() for i, ch in enumerate(ch_names)}})
 
-@app.route('/api/eeg-data', methods=['GET', 'POST'])
+@bp.route('/api/eeg-data', methods=['GET', 'POST'])
 @login_required
 @limiter.limit("5 per minute")
 def get_eeg_data():
+    # Visible time span in seconds and plot width in pixels select the pyramid level
+    tmin = request.args.get('start', type=float)
+    tmax = request.args.get('end', type=float)
+    width = request.args.get('width', type=int)
     if request.method == 'POST':
         if 'file' not in request.files:
             return jsonify({'error': 'No file part'}), 400
@@ -72,19 +230,20 @@ def get_eeg_data():
             try:
                 file_path = 'temp_eeg_file.edf'  # Save uploaded file temporarily
                 file.save(file_path)
-                eeg_data = process_eeg_data(file_path)
-                return jsonify(eeg_data)
+                build_overview(file_path)
+                return eeg_data_response(file_path, tmin, tmax, width)
             except ValueError as e:
                 return jsonify({'error': str(e)}), 400
     else:  # GET request
         file_path = 'path/to/your/eeg_file.edf'
         try:
-            eeg_data = process_eeg_data(file_path)
-            return jsonify(eeg_data)
+            return eeg_data_response(file_path, tmin, tmax, width)
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': 'Internal server error'}), 500
 
+app = create_app()
+
 if __name__ == '__main__':
     socketio.run(app, debug=True, ssl_context='adhoc')  # This enables HTTPS
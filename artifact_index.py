@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Artifact Annotation Index
+
+Interval index over artifact and bad-segment annotations. Annotations are
+kept as sorted per-channel arrays of merged (disjoint) intervals so that:
+1. Overlap queries by time range and channel cost O(log n)
+2. Many windows can be tested at once with a single searchsorted call
+3. Boolean sample masks are built in bulk without rescanning annotations
+
+Annotations whose channel is ``All`` (or empty) apply to every channel.
+
+Author: MVT Nexus Team
+"""
+
+import csv
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALL_CHANNELS = 'All'
+
+
+@dataclass(frozen=True)
+class Annotation:
+    """Single artifact or bad-segment annotation"""
+    start: float
+    end: float
+    channel: str = ALL_CHANNELS
+    type: str = 'BAD'
+
+
+def _merge_intervals(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge overlapping intervals into sorted, disjoint intervals"""
+    if starts.size == 0:
+        return starts.astype(float), ends.astype(float)
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    running_end = np.maximum.accumulate(ends)
+    # A new group begins wherever a start lies beyond everything seen so far
+    new_group = np.empty(starts.size, dtype=bool)
+    new_group[0] = True
+    new_group[1:] = starts[1:] > running_end[:-1]
+    group_ids = np.cumsum(new_group) - 1
+    merged_starts = starts[new_group]
+    merged_ends = np.full(merged_starts.size, -np.inf)
+    np.maximum.at(merged_ends, group_ids, ends)
+    return merged_starts, merged_ends
+
+
+class ArtifactIndex:
+    """Sorted-array interval index over artifact annotations"""
+
+    def __init__(self, annotations: Iterable[Annotation] = ()):
+        self.annotations: List[Annotation] = sorted(
+            (a for a in annotations if a.end > a.start),
+            key=lambda a: (a.start, a.end)
+        )
+        self._intervals: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._combined: Dict[Optional[str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._build()
+
+    def _build(self):
+        """Build the per-channel merged interval arrays"""
+        grouped: Dict[str, List[Annotation]] = {}
+        for annotation in self.annotations:
+            grouped.setdefault(annotation.channel, []).append(annotation)
+
+        for channel, items in grouped.items():
+            starts = np.fromiter((a.start for a in items), dtype=float, count=len(items))
+            ends = np.fromiter((a.end for a in items), dtype=float, count=len(items))
+            self._intervals[channel] = _merge_intervals(starts, ends)
+
+        # Raw record arrays for listing queries: sorted starts plus running max end
+        self._starts = np.array([a.start for a in self.annotations], dtype=float)
+        self._ends = np.array([a.end for a in self.annotations], dtype=float)
+        self._max_end = (np.maximum.accumulate(self._ends)
+                         if self._ends.size else self._ends)
+        self._channels = np.array([a.channel for a in self.annotations], dtype=object)
+
+    @classmethod
+    def from_csv(cls, file_path: Union[str, Path]) -> 'ArtifactIndex':
+        """
+        Build an index from a CSV with Start_Time, End_Time, Type and Channel columns.
+
+        Args:
+            file_path: Path to the artifact CSV (e.g. docs/examples/artifacts.csv)
+
+        Returns:
+            ArtifactIndex: Index over all rows of the file
+        """
+        annotations = []
+        with open(file_path, newline='') as f:
+            for row in csv.DictReader(f):
+                annotations.append(Annotation(
+                    start=float(row['Start_Time']),
+                    end=float(row['End_Time']),
+                    channel=(row.get('Channel') or ALL_CHANNELS).strip(),
+                    type=(row.get('Type') or 'BAD').strip()
+                ))
+        logger.info(f"Loaded {len(annotations)} artifact annotations from {file_path}")
+        return cls(annotations)
+
+    @classmethod
+    def from_mne_annotations(cls, annotations, bad_prefix: str = 'BAD',
+                             offset: float = 0.0) -> 'ArtifactIndex':
+        """
+        Build an index from ``mne.Annotations``, keeping only bad segments.
+
+        Args:
+            annotations: MNE annotations (e.g. ``raw.annotations``)
+            bad_prefix: Description prefix marking a bad segment
+            offset: Seconds subtracted from each onset (``raw.first_time``
+                when the annotations are anchored to the measurement date)
+
+        Returns:
+            ArtifactIndex: Index over the bad-segment annotations
+        """
+        items = []
+        ch_names = getattr(annotations, 'ch_names', None)
+        for i, (onset, duration, description) in enumerate(
+                zip(annotations.onset, annotations.duration, annotations.description)):
+            if not str(description).upper().startswith(bad_prefix.upper()):
+                continue
+            channels = tuple(ch_names[i]) if ch_names is not None and len(ch_names[i]) else (ALL_CHANNELS,)
+            start = float(onset) - offset
+            for channel in channels:
+                items.append(Annotation(start, start + float(duration), channel, str(description)))
+        return cls(items)
+
+    def merge(self, other: 'ArtifactIndex') -> 'ArtifactIndex':
+        """Return a new index containing the annotations of both indexes"""
+        return ArtifactIndex(self.annotations + other.annotations)
+
+    def __len__(self) -> int:
+        return len(self.annotations)
+
+    @property
+    def fingerprint(self) -> str:
+        """SHA-256 of the annotations, for cache keys ('' when there are none)"""
+        if not self.annotations:
+            return ''
+        text = '\n'.join(f'{a.start!r},{a.end!r},{a.channel},{a.type}' for a in self.annotations)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    @property
+    def channels(self) -> List[str]:
+        """Channels that carry at least one annotation"""
+        return sorted(self._intervals)
+
+    def _channel_intervals(self, channel: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Merged intervals affecting a channel (its own plus the global ones)"""
+        if channel in self._combined:
+            return self._combined[channel]
+
+        if channel is None or channel == ALL_CHANNELS:
+            keys = list(self._intervals) if channel is None else [ALL_CHANNELS]
+        else:
+            keys = [channel, ALL_CHANNELS]
+        parts = [self._intervals[k] for k in keys if k in self._intervals]
+        if parts:
+            starts = np.concatenate([p[0] for p in parts])
+            ends = np.concatenate([p[1] for p in parts])
+            merged = _merge_intervals(starts, ends) if len(parts) > 1 else parts[0]
+        else:
+            merged = (np.empty(0), np.empty(0))
+        self._combined[channel] = merged
+        return merged
+
+    def overlaps(self, tmin: float, tmax: float, channel: Optional[str] = None) -> bool:
+        """
+        Check whether [tmin, tmax) overlaps any annotation.
+
+        Args:
+            tmin: Start of the query range in seconds
+            tmax: End of the query range in seconds
+            channel: Channel to check; None checks every channel
+
+        Returns:
+            bool: True if the range touches contaminated data
+        """
+        return bool(self.windows_overlap(np.array([tmin]), np.array([tmax]), channel)[0])
+
+    def windows_overlap(self, tmins: np.ndarray, tmaxs: np.ndarray,
+                        channel: Optional[str] = None) -> np.ndarray:
+        """
+        Vectorized overlap test for many [tmin, tmax) windows.
+
+        Args:
+            tmins: Window start times in seconds
+            tmaxs: Window end times in seconds
+            channel: Channel to check; None checks every channel
+
+        Returns:
+            np.ndarray: Boolean array, True where a window is contaminated
+        """
+        tmins = np.asarray(tmins, dtype=float)
+        tmaxs = np.asarray(tmaxs, dtype=float)
+        starts, ends = self._channel_intervals(channel)
+        if starts.size == 0:
+            return np.zeros(tmins.shape, dtype=bool)
+        # Last interval starting before the window ends; disjoint intervals mean
+        # it is the only candidate that can still reach past the window start
+        idx = np.searchsorted(starts, tmaxs, side='left') - 1
+        valid = idx >= 0
+        result = np.zeros(tmins.shape, dtype=bool)
+        result[valid] = ends[idx[valid]] > tmins[valid]
+        return result
+
+    def query(self, tmin: float, tmax: float, channel: Optional[str] = None) -> List[Annotation]:
+        """
+        List the annotations overlapping [tmin, tmax).
+
+        Args:
+            tmin: Start of the query range in seconds
+            tmax: End of the query range in seconds
+            channel: Channel to filter on; global annotations always match
+
+        Returns:
+            List[Annotation]: Matching annotations ordered by start time
+        """
+        if not self.annotations:
+            return []
+        stop = np.searchsorted(self._starts, tmax, side='left')
+        # Running max end is non-decreasing, so the first candidate is found by bisection
+        first = np.searchsorted(self._max_end[:stop], tmin, side='right')
+        candidates = np.arange(first, stop)
+        candidates = candidates[self._ends[candidates] > tmin]
+        if channel is not None:
+            keep = (self._channels[candidates] == channel) | (self._channels[candidates] == ALL_CHANNELS)
+            candidates = candidates[keep]
+        return [self.annotations[i] for i in candidates]
+
+    def sample_mask(self, n_times: int, sfreq: float, ch_names: Optional[Sequence[str]] = None,
+                    first_time: float = 0.0) -> np.ndarray:
+        """
+        Build boolean sample masks in bulk.
+
+        Args:
+            n_times: Number of samples in the recording or window
+            sfreq: Sampling frequency in Hz
+            ch_names: Channels to build masks for; None returns a single
+                mask that is True wherever any channel is contaminated
+            first_time: Time in seconds of the first sample
+
+        Returns:
+            np.ndarray: (n_channels, n_times) or (n_times,) mask, True where contaminated
+        """
+        if ch_names is None:
+            return self._interval_mask(self._channel_intervals(None), n_times, sfreq, first_time)
+
+        mask = np.zeros((len(ch_names), n_times), dtype=bool)
+        global_mask = self._interval_mask(self._channel_intervals(ALL_CHANNELS), n_times, sfreq, first_time)
+        for i, name in enumerate(ch_names):
+            if name in self._intervals:
+                mask[i] = self._interval_mask(self._channel_intervals(name), n_times, sfreq, first_time)
+            else:
+                mask[i] = global_mask
+        return mask
+
+    @staticmethod
+    def _interval_mask(intervals: Tuple[np.ndarray, np.ndarray], n_times: int,
+                       sfreq: float, first_time: float) -> np.ndarray:
+        """Rasterize disjoint intervals to a sample mask with a difference array"""
+        starts, ends = intervals
+        if starts.size == 0:
+            return np.zeros(n_times, dtype=bool)
+        first = np.clip(np.ceil((starts - first_time) * sfreq - 1e-9).astype(np.int64), 0, n_times)
+        last = np.clip(np.ceil((ends - first_time) * sfreq - 1e-9).astype(np.int64), 0, n_times)
+        delta = np.zeros(n_times + 1, dtype=np.int32)
+        np.add.at(delta, first, 1)
+        np.add.at(delta, last, -1)
+        return np.cumsum(delta[:-1]) > 0
+
+    def clean_windows(self, n_times: int, sfreq: float, window_samples: int,
+                      step_samples: Optional[int] = None, first_time: float = 0.0,
+                      channel: Optional[str] = None) -> np.ndarray:
+        """
+        Start samples of fixed-length windows that contain no artifacts.
+
+        Args:
+            n_times: Number of samples available
+            sfreq: Sampling frequency in Hz
+            window_samples: Window length in samples
+            step_samples: Hop between windows in samples (defaults to window length)
+            first_time: Time in seconds of the first sample
+            channel: Channel to check; None checks every channel
+
+        Returns:
+            np.ndarray: Start sample of each clean window
+        """
+        step_samples = step_samples or window_samples
+        if n_times < window_samples:
+            return np.empty(0, dtype=np.int64)
+        window_starts = np.arange(0, n_times - window_samples + 1, step_samples, dtype=np.int64)
+        tmins = first_time + window_starts / sfreq
+        tmaxs = tmins + window_samples / sfreq
+        return window_starts[~self.windows_overlap(tmins, tmaxs, channel)]
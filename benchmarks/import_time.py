@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cold Import Time Benchmark
+
+Imports each service module in a fresh interpreter and reports the wall time
+and whether any heavy scientific module was pulled in at import.
+
+Usage::
+
+    python benchmarks/import_time.py [--repeat 5]
+
+Author: MVT Nexus Team
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Module name -> statement importing it from the repository root
+TARGETS = {
+    'EEG': 'import EEG',
+    'docs/EEG.py': "import runpy; runpy.run_path('docs/EEG.py')",
+}
+
+_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [m for m in ('numpy', 'scipy', 'mne', 'redis') if m in sys.modules]
+print(json.dumps({{'seconds': elapsed, 'heavy': heavy}}))
+'''
+
+
+def measure(statement: str, repeat: int = 5) -> dict:
+    """
+    Time an import statement in fresh interpreters.
+
+    Args:
+        statement: Python code that performs the import
+        repeat: Number of cold runs
+
+    Returns:
+        dict: Median and best wall time in seconds, and heavy modules loaded
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(statement=statement)],
+                             cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    seconds = [run['seconds'] for run in runs]
+    return {'median': statistics.median(seconds), 'best': min(seconds), 'heavy': runs[-1]['heavy']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for name, statement in TARGETS.items():
+        result = measure(statement, args.repeat)
+        heavy = ', '.join(result['heavy']) or 'none'
+        print(f"{name:<14} median {result['median'] * 1000:7.1f} ms  "
+              f"best {result['best'] * 1000:7.1f} ms  heavy modules: {heavy}")
+
+
+if __name__ == '__main__':
+    main()
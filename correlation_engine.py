@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cross-Participant Feature x Measure Correlation Engine
+
+Relates per-participant EEG features (from ``EEGProcessor.extract_features``)
+to psychometric measures such as the cognitive test scores and Big Five trait
+scores:
+1. The full feature x measure correlation matrix is one matrix product of
+   column-standardized data (Pearson, or Spearman on ranks)
+2. Partial correlations remove covariates (e.g. Age, Gender, Education) by
+   projecting both sides onto the orthogonal complement of the covariates
+3. Family-wise error is controlled by max-statistic permutation testing;
+   permutations are evaluated in blocks as a single matrix product against
+   the stacked permuted measures
+4. False discovery rate is controlled with Benjamini-Hochberg (or
+   Benjamini-Yekutieli) adjustment of the parametric p-values
+
+Author: MVT Nexus Team
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the correlation block computed per batch of permutations
+PERMUTATION_BLOCK_BYTES = 256 * 1024 * 1024
+
+
+@dataclass
+class CorrelationResult:
+    """Feature x measure correlations with parametric, FDR and FWER p-values"""
+    r: pd.DataFrame
+    p: pd.DataFrame
+    p_fdr: pd.DataFrame
+    p_fwer: Optional[pd.DataFrame]
+    n: int
+    df: int
+    covariates: List[str]
+    n_permutations: int
+
+    def significant(self, alpha: float = 0.05, correction: str = 'fdr') -> pd.DataFrame:
+        """
+        Feature/measure pairs below the significance level, strongest first.
+
+        Args:
+            alpha: Significance level
+            correction: 'fdr', 'fwer' (permutation) or 'none'
+
+        Returns:
+            pd.DataFrame: One row per significant pair
+        """
+        p_values = {'fdr': self.p_fdr, 'fwer': self.p_fwer, 'none': self.p}[correction]
+        if p_values is None:
+            raise ValueError("No permutation p-values; run with n_permutations > 0")
+        long = pd.DataFrame({
+            'r': self.r.stack(),
+            'p': self.p.stack(),
+            'p_fdr': self.p_fdr.stack(),
+        })
+        if self.p_fwer is not None:
+            long['p_fwer'] = self.p_fwer.stack()
+        long = long[p_values.stack() < alpha]
+        long.index.names = ['feature', 'measure']
+        return long.reindex(long['r'].abs().sort_values(ascending=False).index).reset_index()
+
+
+def flatten_features(features: Dict, ch_names: Optional[Sequence[str]] = None,
+                     prefix: str = '') -> Dict[str, float]:
+    """
+    Flatten nested ``extract_features`` output into named scalar features.
+
+    Per-channel lists become one feature per channel, e.g.
+    ``band_powers.alpha.Fz`` or ``statistical.kurtosis.3``.
+
+    Args:
+        features: Nested dict of scalars, lists and dicts
+        ch_names: Channel names used to label per-channel lists
+        prefix: Name prefix (used in recursion)
+
+    Returns:
+        Dict[str, float]: Flat feature vector
+    """
+    flat = {}
+    for name, value in features.items():
+        key = f'{prefix}{name}'
+        if isinstance(value, dict):
+            flat.update(flatten_features(value, ch_names, prefix=f'{key}.'))
+        elif isinstance(value, (list, tuple, np.ndarray)):
+            values = np.asarray(value, dtype=np.float64).ravel()
+            labels = ch_names if ch_names is not None and len(ch_names) == values.size else range(values.size)
+            flat.update({f'{key}.{label}': float(v) for label, v in zip(labels, values)})
+        elif isinstance(value, (int, float, np.number)):
+            flat[key] = float(value)
+    return flat
+
+
+def feature_table(participant_features: Dict[str, Dict],
+                  ch_names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Participants x features table from per-participant ``extract_features`` output.
+
+    Args:
+        participant_features: {participant_id: features dict}
+        ch_names: Channel names used to label per-channel features
+
+    Returns:
+        pd.DataFrame: One row per participant, indexed by participant ID
+    """
+    table = pd.DataFrame.from_dict(
+        {pid: flatten_features(features, ch_names) for pid, features in participant_features.items()},
+        orient='index'
+    )
+    table.index.name = 'Participant_ID'
+    return table
+
+
+def covariate_matrix(df: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Numeric design matrix for covariates.
+
+    Numeric columns are used as they are; categorical ones (e.g. Gender,
+    Education) are dummy-coded with the first level dropped.
+    """
+    return pd.get_dummies(df[list(columns)], drop_first=True, dtype=np.float64)
+
+
+def _standardize(data: np.ndarray) -> np.ndarray:
+    """Center columns and scale them to unit norm (so Z.T @ Z is a correlation)"""
+    centered = data - data.mean(axis=0)
+    norms = np.linalg.norm(centered, axis=0)
+    norms[norms == 0] = np.nan
+    return centered / norms
+
+
+def _residualize(data: np.ndarray, covariates: np.ndarray) -> np.ndarray:
+    """Remove the part of each column explained by the covariates and an intercept"""
+    design = np.column_stack([np.ones(len(covariates)), covariates])
+    q, _ = np.linalg.qr(design)
+    return data - q @ (q.T @ data)
+
+
+def fdr_correction(p_values: np.ndarray, method: str = 'bh') -> np.ndarray:
+    """
+    Benjamini-Hochberg ('bh') or Benjamini-Yekutieli ('by') adjusted p-values.
+
+    Args:
+        p_values: P-values of any shape; NaNs are ignored
+
+    Returns:
+        np.ndarray: Adjusted p-values of the same shape
+    """
+    p = np.asarray(p_values, dtype=np.float64)
+    flat = p.ravel()
+    valid = np.flatnonzero(~np.isnan(flat))
+    m = valid.size
+    adjusted = np.full(flat.shape, np.nan)
+    if m == 0:
+        return adjusted.reshape(p.shape)
+    order = valid[np.argsort(flat[valid])]
+    scale = m / np.arange(1, m + 1)
+    if method == 'by':
+        scale = scale * np.sum(1.0 / np.arange(1, m + 1))
+    elif method != 'bh':
+        raise ValueError(f"Unknown FDR method: {method}")
+    stepped = np.minimum.accumulate((flat[order] * scale)[::-1])[::-1]
+    adjusted[order] = np.minimum(stepped, 1.0)
+    return adjusted.reshape(p.shape)
+
+
+def max_statistic_null(x: np.ndarray, y: np.ndarray, n_permutations: int,
+                       random_state: Optional[int] = 42,
+                       block_bytes: int = PERMUTATION_BLOCK_BYTES) -> np.ndarray:
+    """
+    Null distribution of max |r| under permutation of the participants of ``y``.
+
+    Permutations are evaluated in blocks: the permuted copies of ``y`` are
+    stacked side by side so each block is a single (features x n) @
+    (n x block * measures) matrix product.
+
+    Args:
+        x: Standardized (n, n_features) matrix
+        y: Standardized (n, n_measures) matrix
+        n_permutations: Number of permutations
+        random_state: Seed for the permutations
+        block_bytes: Memory budget for one block of correlations
+
+    Returns:
+        np.ndarray: (n_permutations,) maximum absolute correlation per permutation
+    """
+    n, n_measures = y.shape
+    n_features = x.shape[1]
+    rng = np.random.default_rng(random_state)
+    block = int(max(1, min(n_permutations, block_bytes // (8 * n_features * n_measures))))
+    xt = np.ascontiguousarray(x.T)
+    maxima = np.empty(n_permutations)
+    for start in range(0, n_permutations, block):
+        size = min(block, n_permutations - start)
+        indices = rng.permuted(np.tile(np.arange(n), (size, 1)), axis=1)
+        # (n, size * n_measures): permutation-major blocks of measures
+        stacked = y[indices].transpose(1, 0, 2).reshape(n, size * n_measures)
+        r = np.abs(xt @ stacked).reshape(n_features, size, n_measures)
+        maxima[start:start + size] = np.nanmax(r, axis=(0, 2))
+    return maxima
+
+
+def correlate(features: pd.DataFrame, measures: pd.DataFrame,
+              covariates: Optional[pd.DataFrame] = None, method: str = 'pearson',
+              n_permutations: int = 10_000, fdr_method: str = 'bh',
+              random_state: Optional[int] = 42) -> CorrelationResult:
+    """
+    Correlate every feature with every measure across participants.
+
+    Rows are matched on the index (participant ID); participants with any
+    missing feature, measure or covariate are excluded.
+
+    Args:
+        features: (participants x features) EEG features
+        measures: (participants x measures) psychometric scores
+        covariates: Optional (participants x covariates) numeric design
+            (see ``covariate_matrix``); yields partial correlations
+        method: 'pearson' or 'spearman'
+        n_permutations: Permutations for max-statistic FWER p-values (0 to skip)
+        fdr_method: 'bh' or 'by'
+        random_state: Seed for the permutations
+
+    Returns:
+        CorrelationResult: Correlations and p-values
+    """
+    frames = [features.add_prefix('f:'), measures.add_prefix('m:')]
+    if covariates is not None:
+        frames.append(covariates.add_prefix('c:'))
+    joined = pd.concat(frames, axis=1, join='inner').dropna()
+    n = len(joined)
+    x = joined[['f:' + c for c in features.columns]].to_numpy(dtype=np.float64)
+    y = joined[['m:' + c for c in measures.columns]].to_numpy(dtype=np.float64)
+    if method == 'spearman':
+        x, y = stats.rankdata(x, axis=0), stats.rankdata(y, axis=0)
+    elif method != 'pearson':
+        raise ValueError(f"Unknown correlation method: {method}")
+
+    n_covariates = 0
+    if covariates is not None:
+        c = joined[['c:' + col for col in covariates.columns]].to_numpy(dtype=np.float64)
+        if method == 'spearman':
+            c = stats.rankdata(c, axis=0)
+        n_covariates = np.linalg.matrix_rank(np.column_stack([np.ones(n), c])) - 1
+        x, y = _residualize(x, c), _residualize(y, c)
+    dof = n - 2 - n_covariates
+    if dof < 1:
+        raise ValueError(f"Not enough participants ({n}) for {n_covariates} covariates")
+
+    zx, zy = _standardize(x), _standardize(y)
+    r = np.clip(zx.T @ zy, -1.0, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(dof / (1.0 - r ** 2))
+    p = 2.0 * stats.t.sf(np.abs(t), dof)
+
+    p_fwer = None
+    if n_permutations > 0:
+        logger.info(f"Running {n_permutations} permutations for {r.shape[0]} x {r.shape[1]} correlations")
+        null = np.sort(max_statistic_null(np.nan_to_num(zx), np.nan_to_num(zy),
+                                          n_permutations, random_state))
+        exceed = n_permutations - np.searchsorted(null, np.abs(r) - 1e-12, side='left')
+        p_fwer = (exceed + 1.0) / (n_permutations + 1.0)
+        p_fwer[np.isnan(r)] = np.nan
+
+    index, columns = list(features.columns), list(measures.columns)
+    as_frame = lambda values: pd.DataFrame(values, index=index, columns=columns)
+    return CorrelationResult(
+        r=as_frame(r), p=as_frame(p), p_fdr=as_frame(fdr_correction(p, fdr_method)),
+        p_fwer=as_frame(p_fwer) if p_fwer is not None else None,
+        n=n, df=dof,
+        covariates=list(covariates.columns) if covariates is not None else [],
+        n_permutations=n_permutations
+    )
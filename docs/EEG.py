@@ -23,30 +23,62 @@ This script provides comprehensive EEG data analysis capabilities including:
 Author: MVT Nexus Team
 """
 
+from __future__ import annotations
+
+from collections import OrderedDict
 from contextlib import nullcontext
+import copy
 import gzip
 import os
 import sys
-import mne
-import numpy as np
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, current_app, jsonify, request
 from flask_cors import CORS
 import json
 import queue
 import logging
 from pathlib import Path
-import scipy
 from werkzeug.utils import secure_filename
 import hashlib
 import uuid
 import shutil
 import tempfile
-from typing import Dict, List, Optional, TYPE_CHECKING
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 from concurrent.futures import ThreadPoolExecutor
 import yaml
 from dataclasses import dataclass
 from enum import Enum
-import redis
+
+# Shared analysis modules live at the repository root next to EEG.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from lazy_imports import lazy_import
+from pipeline_spec import PipelineSpec
+
+# Heavy scientific stack is imported on first use, not at worker boot
+mne = lazy_import('mne')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+scipy = lazy_import('scipy')
+redis = lazy_import('redis')
+artifact_index = lazy_import('artifact_index')
+filtering = lazy_import('filtering')
+bad_channels = lazy_import('bad_channels')
+channel_stats = lazy_import('channel_stats')
+precision = lazy_import('precision')
+norms = lazy_import('norms')
+feature_store = lazy_import('feature_store')
+text_ingest = lazy_import('text_ingest')
+http_cache = lazy_import('http_cache')
+job_queue = lazy_import('job_queue')
+spectral_params = lazy_import('spectral_params')
+memory_budget = lazy_import('memory_budget')
+asr = lazy_import('asr')
+spatial_filters = lazy_import('spatial_filters')
+channel_covariance = lazy_import('channel_covariance')
+qeeg_norms = lazy_import('qeeg_norms')
+summary_sketch = lazy_import('summary_sketch')
+
 try:
     from prometheus_client import start_http_server, Counter, Gauge, Histogram
 except ImportError:
@@ -181,6 +213,7 @@ except ImportError:
     # Mock JWT if not available
     class JWTManager:
         def __init__(self, *args, **kwargs): pass
+        def init_app(self, app): pass
     def jwt_required(): return lambda x: x
     def create_access_token(**kwargs): return ""
 
@@ -194,6 +227,7 @@ except ImportError:
     # Mock JWT if not available
     class JWTManager:
         def __init__(self, *args, **kwargs): pass
+        def init_app(self, app): pass
     def jwt_required(): return lambda x: x
     def create_access_token(**kwargs): return ""
 
@@ -257,51 +291,101 @@ except ImportError:
                 
             return timer()
 
-# Configure logging with handlers
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('eeg_processor.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
-# Load configuration
-try:
-    with open('config.yaml', 'r') as f:
-        config = yaml.safe_load(f)
-except FileNotFoundError:
-    logger.warning("Config file not found, using defaults")
-    config = {
-        'upload_folder': 'uploads',
-        'max_file_size': 100 * 1024 * 1024,  # 100MB
-        'allowed_extensions': {'eeg', 'edf', 'bdf', 'gdf', 'set'},
-        'redis_url': 'redis://localhost:6379',
-        'jwt_secret_key': str(uuid.uuid4()),
-        'rate_limit': '100 per minute'
-    }
-
-# Initialize Flask app with security features
-app = Flask(__name__)
-CORS(app)
-jwt = JWTManager(app)
-app.config['JWT_SECRET_KEY'] = config['jwt_secret_key']
-limiter = Limiter(app=app, key_func=get_remote_address)
-
-# Redis for caching and session management
-redis_client = redis.from_url(config['redis_url'])
+def configure_logging(log_file: str = 'eeg_processor.log'):
+    """Attach the file and stdout handlers (called by the app factory, not at import)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stdout)
+        ],
+        force=True
+    )
+
+# Config file used by get_config(); set by create_app()
+_config_path = 'config.yaml'
+
+def get_config(path: Optional[str] = None) -> Dict:
+    """
+    Load the service configuration once per process.
+
+    Args:
+        path: YAML config file (defaults to the one given to create_app);
+            defaults are used when it does not exist
+
+    Returns:
+        Dict: Configuration mapping
+    """
+    return _load_config(path or _config_path)
+
+@lru_cache(maxsize=None)
+def _load_config(path: str) -> Dict:
+    try:
+        with open(path, 'r') as f:
+            return yaml.safe_load(f)
+    except FileNotFoundError:
+        logger.warning("Config file not found, using defaults")
+        return {
+            'upload_folder': 'uploads',
+            'max_file_size': 100 * 1024 * 1024,  # 100MB
+            'allowed_extensions': {'eeg', 'edf', 'bdf', 'gdf', 'set', 'csv', 'tsv', 'txt'},
+            'redis_url': 'redis://localhost:6379',
+            'jwt_secret_key': str(uuid.uuid4()),
+            'rate_limit': '100 per minute',
+            'cache_dir': 'cache',
+            'norms_file': 'cache/norms.npz',
+            'norms_source': 'examples/raw_data/psychometric_calculator_data.csv',
+            'norms_group_by': ['Test_Type'],
+            'qeeg_norms_file': 'cache/qeeg_norms.npz',  # built by `python qeeg_norms.py build`
+            'summary_dir': 'cache/summaries',
+            'summary_group_by': ['Test_Type', 'Testing_Environment'],
+            'feature_store': 'cache/feature_store',
+            'text_time_column': 'Time',
+            'text_scale': 1.0,
+            'response_cache': 'disk',
+            'response_cache_max_bytes': 1024 ** 3,  # disk cache size limit
+            'execution': 'local',
+            'job_stream': 'eeg:jobs',
+            'memory_budget': None,  # bytes; defaults to 75% of the node's memory
+            'memory_ledger': 'cache/memory_ledger.json',
+            'memory_degrade_after': 30.0
+        }
+
+# Extensions are bound to the app in create_app()
+api = Blueprint('api', __name__)
+jwt = JWTManager()
+limiter = Limiter(key_func=get_remote_address)
+
+# Redis connection pool, created lazily and recreated after fork
+_redis_pool = None
+_redis_pid = None
+_redis_lock = threading.Lock()
+
+def get_redis():
+    """
+    Redis client for caching and session management.
+
+    The connection pool is created on first use in each process, so the
+    gunicorn master never opens sockets that forked workers would share.
+
+    Returns:
+        redis.Redis: Client backed by this process's connection pool
+    """
+    global _redis_pool, _redis_pid
+    with _redis_lock:
+        if _redis_pool is None or _redis_pid != os.getpid():
+            _redis_pool = redis.ConnectionPool.from_url(get_config()['redis_url'])
+            _redis_pid = os.getpid()
+    return redis.Redis(connection_pool=_redis_pool)
 
 # Prometheus metrics
 REQUESTS = Counter('eeg_requests_total', 'Total EEG processing requests')
 PROCESSING_TIME = Histogram('eeg_processing_seconds', 'Time spent processing EEG data')
 MEMORY_USAGE = Gauge('eeg_memory_usage_bytes', 'Memory usage of EEG processor')
-
-# Create required directories
-UPLOAD_FOLDER = config['upload_folder']
-Path(UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = config['max_file_size']
+MEMORY_BUDGET = Gauge('eeg_memory_budget_bytes', 'Memory budget for analysis jobs on this node')
+MEMORY_RESERVED = Gauge('eeg_memory_reserved_bytes', 'Memory reserved by admitted analysis jobs')
+ADMISSION_QUEUE_DEPTH = Gauge('eeg_admission_queue_depth', 'Analysis jobs waiting for memory')
 
 class ProcessingStatus(Enum):
     """Enum for processing status tracking"""
@@ -318,16 +402,48 @@ class ProcessingResult:
     error: Optional[str] = None
     processing_time: Optional[float] = None
 
+# Signal quality checks on the shared covariance pass: window length in
+# seconds, PREP-style correlation criterion and flat-channel variance ratio
+QUALITY_WINDOW = 1.0
+LOW_CORRELATION = 0.4
+LOW_CORRELATION_FRACTION = 0.01
+FLAT_VARIANCE_RATIO = 1e-6
+
+# Welch segments transformed per batch (bounds the copied samples)
+WELCH_BATCH = 64
+
+# Recordings and pipeline results kept in memory per processor
+MAX_RAW_CACHE = 2
+MAX_PIPELINE_CACHE = 4
+
+# Default cache directory argument: take it from the config
+_CONFIG_CACHE_DIR = 'config'
+
 class EEGProcessor:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = _CONFIG_CACHE_DIR):
+        """
+        Args:
+            cache_dir: Directory for memory-mapped recordings and pipeline
+                results (default: ``cache_dir`` from the config; None
+                disables the disk cache)
+        """
         self.raw = None
+        self.file_hash = None
         self.filtered_data = None
         self.epochs = None
         self.features = {}
+        self.spectral_windows = None
+        self.artifact_index = artifact_index.ArtifactIndex()
+        self.filter_engine = filtering.FilterEngine()
+        self.pipeline_spec = PipelineSpec.from_config(get_config())
+        self.pipeline_cache = OrderedDict()
+        self.cache_dir = get_config().get('cache_dir') if cache_dir == _CONFIG_CACHE_DIR else cache_dir
+        self.report_decim = 1
+        self._covariance = None
         self.processing_queue = queue.Queue()
         self.is_processing = False
         self.thread_pool = ThreadPoolExecutor(max_workers=4)
-        self.cache = {}
+        self.cache = OrderedDict()
         
     def load_eeg_data(self, file_path: str, file_type: str = 'auto') -> bool:
         """
@@ -343,15 +459,27 @@ class EEGProcessor:
         try:
             # Calculate file hash for caching
             file_hash = self._calculate_file_hash(file_path)
+            self.file_hash = file_hash
             
             # Check cache
             if file_hash in self.cache:
                 logger.info("Loading data from cache")
+                self.cache.move_to_end(file_hash)
                 self.raw = self.cache[file_hash]
+                self._index_annotations()
                 return True
                 
             logger.info(f"Loading EEG data from {file_path}")
-            if file_type == 'auto':
+            if file_type in ('csv', 'tsv', 'txt') or (
+                    file_type == 'auto' and Path(file_path).suffix.lower() in text_ingest.TEXT_EXTENSIONS):
+                # Text exports are parsed in blocks into a memory-mapped sample file
+                config = get_config()
+                self.raw = text_ingest.read_raw_text(
+                    file_path, time_column=config.get('text_time_column', 'Time'),
+                    scale=config.get('text_scale', 1.0),
+                    memmap_path=Path(self.cache_dir) / file_hash / 'raw.dat' if self.cache_dir else None
+                )
+            elif file_type == 'auto':
                 self.raw = mne.io.read_raw(file_path, preload=True, verbose=False)
             else:
                 self.raw = mne.io.read_raw(file_path, preload=True, verbose=False,
@@ -360,15 +488,41 @@ class EEGProcessor:
             # Validate data
             if not self._validate_data():
                 raise ValueError("Invalid EEG data format")
-                
+            
             # Cache the loaded data
             self.cache[file_hash] = self.raw
+            while len(self.cache) > MAX_RAW_CACHE:
+                self.cache.popitem(last=False)
             
+            self._index_annotations()
             return True
             
         except Exception as e:
             logger.error(f"Error loading EEG data: {str(e)}")
             raise
+
+    def _index_annotations(self):
+        """Index bad segments already annotated in the recording"""
+        annotations = self.raw.annotations
+        offset = self.raw.first_time if annotations.orig_time is not None else 0.0
+        self.artifact_index = artifact_index.ArtifactIndex.from_mne_annotations(annotations, offset=offset)
+            
+    def load_artifact_annotations(self, file_path: str) -> int:
+        """
+        Add artifact spans from a CSV file to the artifact index.
+        
+        Args:
+            file_path: CSV with Start_Time, End_Time, Type and Channel columns
+            
+        Returns:
+            int: Total number of indexed annotations
+        """
+        try:
+            self.artifact_index = self.artifact_index.merge(artifact_index.ArtifactIndex.from_csv(file_path))
+            return len(self.artifact_index)
+        except Exception as e:
+            logger.error(f"Error loading artifact annotations: {str(e)}")
+            raise
             
     def _validate_data(self) -> bool:
         """Validate loaded EEG data"""
@@ -383,9 +537,11 @@ class EEGProcessor:
         if len(self.raw.ch_names) == 0:
             return False
             
-        # Check data quality
-        if np.any(np.isnan(self.raw.get_data())):
-            return False
+        # Check data quality block by block, so memory-mapped recordings stay on disk
+        data = self.raw._data
+        for start in range(0, data.shape[1], channel_stats.DEFAULT_CHUNK_SIZE):
+            if np.isnan(data[:, start:start + channel_stats.DEFAULT_CHUNK_SIZE]).any():
+                return False
             
         return True
         
@@ -399,7 +555,9 @@ class EEGProcessor:
         return sha256_hash.hexdigest()
 
     def preprocess_data(self, l_freq: float = 1.0, h_freq: float = 40.0, 
-                       notch_freq: float = 50.0) -> bool:
+                       notch_freq: float = 50.0, filter_method: str = 'iir',
+                       line_noise_method: str = 'comb',
+                       spec: Optional[PipelineSpec] = None) -> bool:
         """
         Comprehensive preprocessing pipeline with advanced artifact removal.
         
@@ -407,91 +565,152 @@ class EEGProcessor:
             l_freq: Lower frequency bound for bandpass filter
             h_freq: Higher frequency bound for bandpass filter
             notch_freq: Frequency for notch filter
+            filter_method: 'iir' (SOS, forward-backward) or 'fir' (overlap-add)
+            line_noise_method: 'comb', 'notch' or 'spectrum_fit'
+            spec: Pipeline spec to run instead of the default stages built
+                from the arguments above
             
         Returns:
             bool: Success status of preprocessing operation
         """
-        try:
-            logger.info("Starting preprocessing pipeline")
-            
-            # Create a copy of raw data
-            self.filtered_data = self.raw.copy()
-            
-            # Apply bandpass filter
-            logger.debug("Applying bandpass filter")
-            self.filtered_data.filter(l_freq=l_freq, h_freq=h_freq)
-            
-            # Apply notch filter
-            logger.debug("Applying notch filter")
-            self.filtered_data.notch_filter(freqs=notch_freq)
-            
-            # Detect and interpolate bad channels
-            logger.debug("Detecting bad channels")
-            bads = mne.preprocessing.find_bad_channels_maxwell(self.filtered_data)
-            self.filtered_data.info['bads'] = bads
-            self.filtered_data.interpolate_bads(reset_bads=True)
-            
-            # Apply ICA
-            logger.debug("Applying ICA")
-            ica = mne.preprocessing.ICA(
-                n_components=0.95,
-                random_state=42,
-                method='fastica'
-            )
-            ica.fit(self.filtered_data)
-            
-            # Detect and remove artifacts
-            logger.debug("Starting comprehensive artifact detection and removal")
-            
-            # EOG (eye movement) artifact detection and removal
-            logger.debug("Detecting EOG artifacts")
-            eog_indices, eog_scores = ica.find_bads_eog(self.filtered_data, 
-                                                       threshold=3.0,
-                                                       measure='zscore')
-            logger.info(f"Found {len(eog_indices)} EOG components")
-            
-            # ECG (heart) artifact detection and removal  
-            logger.debug("Detecting ECG artifacts")
-            ecg_indices, ecg_scores = ica.find_bads_ecg(self.filtered_data,
-                                                       method='correlation',
-                                                       threshold=0.35)
-            logger.info(f"Found {len(ecg_indices)} ECG components")
-            
-            # Muscle artifact detection
-            logger.debug("Detecting muscle artifacts")
-            muscle_indices = []
-            for comp in ica.get_components():
-                # Detect high frequency components characteristic of muscle activity
-                freqs, psd = scipy.signal.welch(comp, fs=self.filtered_data.info['sfreq'])
-                if np.mean(psd[freqs > 30]) > np.mean(psd[freqs <= 30]) * 2:
-                    muscle_indices.append(comp)
-            logger.info(f"Found {len(muscle_indices)} muscle artifact components")
-            
-            # Movement artifact detection using accelerometer data if available
-            movement_indices = []
-            if hasattr(self.filtered_data, 'accel_data'):
-                logger.debug("Detecting movement artifacts")
-                threshold = np.std(self.filtered_data.accel_data) * 3
-                movement_mask = np.any(np.abs(self.filtered_data.accel_data) > threshold, axis=1)
-                movement_indices = np.where(movement_mask)[0]
-                logger.info(f"Found {len(movement_indices)} movement artifacts")
-            
-            # Combine all artifact indices
-            ica.exclude = list(set(eog_indices + ecg_indices + muscle_indices + movement_indices))
-            logger.info(f"Total components marked for removal: {len(ica.exclude)}")
+        if spec is None:
+            spec = PipelineSpec.from_dict({'stages': [
+                {'name': 'bandpass', 'params': {'l_freq': l_freq, 'h_freq': h_freq,
+                                                'method': filter_method}},
+                {'name': 'notch', 'params': {'freqs': notch_freq}},
+                'bad_channels', 'ica', 'muscle_artifacts',
+                {'name': 'line_noise', 'params': {'base_freq': notch_freq,
+                                                  'method': line_noise_method}}
+            ]})
+        return self._run_stages(spec)
+
+    def run_pipeline(self, spec: PipelineSpec) -> bool:
+        """
+        Run preprocessing and feature extraction as described by a pipeline spec.
+        
+        Results are cached by (file hash, spec hash) in memory and, when a
+        cache directory is configured, on disk, so the same spec over the
+        same file is never recomputed.
+        
+        Args:
+            spec: Pipeline spec selecting and parameterizing the stages
             
-            # Apply ICA to remove artifacts
-            logger.debug("Applying ICA to remove detected artifacts")
-            ica.apply(self.filtered_data)
+        Returns:
+            bool: Success status of the pipeline run
+        """
+        cache_key = self._pipeline_key(spec)
+        cached = self.pipeline_cache.get(cache_key) or self._load_cached_pipeline(spec)
+        if cached is not None and cached.get('features') is not None:
+            logger.info(f"Using cached results for pipeline {spec.hash[:12]}")
+            self.filtered_data = cached['filtered_data']
+            # Callers get their own copy, so later runs cannot alter cached results
+            self.features = copy.deepcopy(cached['features'])
+            self.pipeline_spec = spec
+            return True
             
-            # Additional advanced cleaning steps
-            logger.debug("Performing additional signal cleaning")
+        if not self._run_stages(spec) or not self.extract_features():
+            return False
+        self._remember_pipeline(cache_key, {'filtered_data': self.filtered_data,
+                                            'features': copy.deepcopy(self.features)})
+        self._store_cached_pipeline(spec)
+        return True
+
+    def _pipeline_key(self, spec: PipelineSpec) -> Tuple[str, str, str]:
+        """Cache key of a pipeline run: file, spec and artifact annotations"""
+        return (self.file_hash, spec.hash, self.artifact_index.fingerprint)
+
+    def _remember_pipeline(self, key: Tuple[str, str, str], entry: Dict):
+        """Keep a pipeline result in memory, evicting the least recently stored"""
+        self.pipeline_cache.pop(key, None)
+        self.pipeline_cache[key] = entry
+        while len(self.pipeline_cache) > MAX_PIPELINE_CACHE:
+            self.pipeline_cache.popitem(last=False)
+
+    def _pipeline_cache_path(self, spec: PipelineSpec) -> Optional[Path]:
+        """Directory holding on-disk results for this file, spec and artifact annotations"""
+        if not self.cache_dir or not self.file_hash:
+            return None
+        path = Path(self.cache_dir) / self.file_hash / spec.hash
+        fingerprint = self.artifact_index.fingerprint
+        return path / fingerprint[:16] if fingerprint else path
+
+    def _load_cached_pipeline(self, spec: PipelineSpec) -> Optional[Dict]:
+        """Load preprocessed data and features stored by a previous run"""
+        path = self._pipeline_cache_path(spec)
+        if path is None or not (path / 'features.json.gz').exists():
+            return None
+        try:
+            with gzip.open(path / 'features.json.gz', 'rt') as f:
+                features = json.load(f)
+            filtered_data = precision.cast_raw(
+                mne.io.read_raw_fif(path / 'preprocessed_raw.fif', preload=True, verbose=False),
+                spec.precision
+            )
+            cached = {'filtered_data': filtered_data, 'features': features}
+            self._remember_pipeline(self._pipeline_key(spec), cached)
+            return cached
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable pipeline cache at {path}: {str(e)}")
+            return None
+
+    def _store_cached_pipeline(self, spec: PipelineSpec):
+        """Persist preprocessed data and features for this file and spec"""
+        path = self._pipeline_cache_path(spec)
+        if path is None:
+            return
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            # FIF defaults to single precision; float64 specs must reload bit for bit
+            self.filtered_data.save(path / 'preprocessed_raw.fif', overwrite=True, verbose=False,
+                                    fmt='double' if spec.precision == 'float64' else 'single')
+            with gzip.open(path / 'features.json.gz', 'wt') as f:
+                json.dump(self.features, f)
+            with open(path / 'spec.json', 'w') as f:
+                json.dump(spec.to_dict(), f, indent=2)
+        except Exception as e:
+            logger.warning(f"Could not write pipeline cache to {path}: {str(e)}")
+
+    def cached_bytes(self) -> int:
+        """Bytes of sample data this processor keeps in memory between jobs"""
+        arrays = {}
+        for raw in [self.raw, self.filtered_data, *self.cache.values(),
+                    *(entry['filtered_data'] for entry in self.pipeline_cache.values())]:
+            data = getattr(raw, '_data', None)
+            # File-backed memmaps (text recordings) live in the page cache, not the heap
+            if data is not None and getattr(data, 'filename', None) is None:
+                arrays[id(data)] = data.nbytes
+        return sum(arrays.values())
+
+    def clear_memory_cache(self):
+        """Drop in-memory recordings and pipeline results (the disk cache is kept)"""
+        self.cache.clear()
+        self.pipeline_cache.clear()
+        self.raw = self.filtered_data = self.epochs = None
+        self._covariance = None
+
+    def _run_stages(self, spec: PipelineSpec) -> bool:
+        """Run the enabled preprocessing stages of a spec in order"""
+        try:
+            logger.info(f"Starting preprocessing pipeline {spec.hash[:12]}: "
+                        f"{[stage.name for stage in spec.stages]}")
+            cache_key = self._pipeline_key(spec)
+            if cache_key in self.pipeline_cache:
+                logger.info("Using cached preprocessed data")
+                self.filtered_data = self.pipeline_cache[cache_key]['filtered_data']
+                self.pipeline_spec = spec
+                return True
             
-            # Remove residual muscle artifacts using wavelet-based methods
-            self._remove_muscle_artifacts()
+            # Create a copy of raw data in the spec's working precision (the
+            # loaded recording keeps its native dtype for other specs)
+            self.filtered_data = precision.copy_raw(self.raw, spec.precision)
+            for stage in spec.stages:
+                logger.debug(f"Running stage {stage.name}")
+                with (precision.float64_data(self.filtered_data)
+                      if stage.name in precision.FLOAT64_STAGES else nullcontext()):
+                    getattr(self, f'_stage_{stage.name}')(**stage.params)
             
-            # Remove power line noise and harmonics
-            self._remove_line_noise()
+            self.pipeline_spec = spec
+            self._remember_pipeline(cache_key, {'filtered_data': self.filtered_data, 'features': None})
             
             # Apply signal quality metrics
             signal_quality = self._assess_signal_quality()
@@ -503,6 +722,169 @@ class EEGProcessor:
             logger.error(f"Error in preprocessing: {str(e)}")
             raise
 
+    def _stage_resample(self, sfreq: float):
+        """Resample to a target sampling frequency"""
+        if self.filtered_data.info['sfreq'] != sfreq:
+            self.filtered_data.resample(sfreq, verbose=False)
+
+    def _stage_bandpass(self, l_freq: Optional[float], h_freq: Optional[float],
+                        method: str = 'iir', order: int = 4):
+        """Apply bandpass filter (design is memoized per sfreq and band)"""
+        self.filter_engine.method = method
+        self.filter_engine.iir_order = order
+        self.filtered_data.apply_function(
+            self.filter_engine.bandpass, sfreq=self.filtered_data.info['sfreq'],
+            l_freq=l_freq, h_freq=h_freq, channel_wise=False
+        )
+
+    def _stage_notch(self, freqs):
+        """Apply notch filter"""
+        self.filtered_data.apply_function(
+            self.filter_engine.notch, sfreq=self.filtered_data.info['sfreq'],
+            freqs=freqs, channel_wise=False
+        )
+
+    def _stage_bad_channels(self, method: str = 'auto', interpolate: bool = True):
+        """Detect and interpolate bad channels (Maxwell filtering only applies to MEG)"""
+        if method == 'maxwell' or (method == 'auto' and 'meg' in self.filtered_data):
+            noisy, flat = mne.preprocessing.find_bad_channels_maxwell(self.filtered_data)
+            bads = noisy + flat
+        else:
+            bads = bad_channels.find_bad_channels_raw(self.filtered_data).bads
+        self.filtered_data.info['bads'] = bads
+        if interpolate and bads:
+            # EEG bads are interpolated with a cached operator; MEG needs MNE's field mapping
+            if set(bads) <= set(self._spatial_picks()[1]) and self._apply_spatial(interpolate=True):
+                self.filtered_data.info['bads'] = []
+            else:
+                self.filtered_data.interpolate_bads(reset_bads=True)
+
+    def _stage_spatial(self, reference='average', laplacian: Optional[str] = None,
+                       n_neighbors: int = 4):
+        """Re-reference and/or surface Laplacian as one cached spatial operator"""
+        if not self._apply_spatial(reference=reference, laplacian=laplacian, n_neighbors=n_neighbors):
+            raise ValueError("The surface Laplacian needs sensor positions (set a montage)")
+        if reference:
+            with self.filtered_data.info._unlock():
+                self.filtered_data.info['custom_ref_applied'] = mne.io.constants.FIFF.FIFFV_MNE_CUSTOM_REF_ON
+
+    def _spatial_picks(self):
+        """EEG channel indices and names the spatial operators act on"""
+        picks = mne.pick_types(self.filtered_data.info, eeg=True, exclude=[])
+        return picks, [self.filtered_data.ch_names[i] for i in picks]
+
+    def _apply_spatial(self, **params) -> bool:
+        """
+        Apply a spatial operator (see spatial_filters.py) to the EEG channels in place.
+
+        Operators are cached per montage and bad set, so repeated pipeline
+        runs on the same montage skip the matrix construction.
+
+        Returns:
+            bool: False when the operator needs sensor positions the
+                recording does not have
+        """
+        picks, names = self._spatial_picks()
+        pos = spatial_filters.montage_positions(self.filtered_data.info, names)
+        needs_pos = params.get('laplacian') or (params.get('interpolate') and self.filtered_data.info['bads'])
+        if needs_pos and pos is None:
+            return False
+        operator = spatial_filters.build_operator(names, pos=pos, bads=self.filtered_data.info['bads'],
+                                                  **params)
+        data = self.filtered_data._data
+        if len(picks) == data.shape[0]:
+            operator.apply(data, out=data)
+        else:
+            data[picks] = operator.apply(data[picks])
+        return True
+
+    def _stage_asr(self, cutoff: float = 20.0, window: float = 0.5,
+                   calibration_start: Optional[float] = None, calibration_end: Optional[float] = None):
+        """Artifact subspace reconstruction, calibrated once and applied in chunks"""
+        sfreq = self.filtered_data.info['sfreq']
+        picks = mne.pick_types(self.filtered_data.info, eeg=True, exclude='bads')
+        data = self.filtered_data._data
+        eeg = data if len(picks) == data.shape[0] else data[picks]
+        if calibration_start is not None or calibration_end is not None:
+            # Explicit clean reference segment, in seconds
+            start = int(round((calibration_start or 0.0) * sfreq))
+            stop = None if calibration_end is None else int(round(calibration_end * sfreq))
+            reference = eeg[:, start:stop]
+        else:
+            mask = None
+            if len(self.artifact_index):
+                mask = self.artifact_index.sample_mask(self.filtered_data.n_times, sfreq)
+            reference = asr.find_clean_segment(eeg, sfreq, mask=mask)
+        cleaner = asr.ASR(sfreq, cutoff=cutoff, window=window).calibrate(reference)
+        if eeg is data:
+            cleaner.clean(data, out=data)
+        else:
+            data[picks] = cleaner.clean(eeg)
+
+    def _stage_ica(self, n_components=0.95, method: str = 'fastica', random_state: int = 42,
+                   eog: bool = True, ecg: bool = True, muscle: bool = True,
+                   decim: Optional[int] = None):
+        """Fit ICA (on every ``decim``-th sample) and remove EOG, ECG, muscle and movement components"""
+        ica = mne.preprocessing.ICA(
+            n_components=n_components,
+            random_state=random_state,
+            method=method
+        )
+        ica.fit(self.filtered_data, decim=decim)
+        
+        # EOG (eye movement) artifact detection and removal
+        eog_indices = []
+        if eog:
+            try:
+                eog_indices, _ = ica.find_bads_eog(self.filtered_data, threshold=3.0,
+                                                   measure='zscore')
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"Skipping EOG detection: {str(e)}")
+            logger.info(f"Found {len(eog_indices)} EOG components")
+        
+        # ECG (heart) artifact detection and removal  
+        ecg_indices = []
+        if ecg:
+            try:
+                ecg_indices, _ = ica.find_bads_ecg(self.filtered_data, method='correlation',
+                                                   threshold=0.35)
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"Skipping ECG detection: {str(e)}")
+            logger.info(f"Found {len(ecg_indices)} ECG components")
+        
+        # Muscle artifact detection: components dominated by high frequencies
+        muscle_indices = []
+        if muscle:
+            sources = ica.get_sources(self.filtered_data).get_data()
+            freqs, psd = scipy.signal.welch(sources, fs=self.filtered_data.info['sfreq'])
+            high = psd[:, freqs > 30].mean(axis=1)
+            low = psd[:, freqs <= 30].mean(axis=1)
+            muscle_indices = np.flatnonzero(high > 2 * low).tolist()
+            logger.info(f"Found {len(muscle_indices)} muscle artifact components")
+        
+        # Movement artifact detection using accelerometer data if available
+        movement_indices = []
+        if hasattr(self.filtered_data, 'accel_data'):
+            threshold = np.std(self.filtered_data.accel_data) * 3
+            movement_mask = np.any(np.abs(self.filtered_data.accel_data) > threshold, axis=1)
+            movement_indices = np.where(movement_mask)[0].tolist()
+            logger.info(f"Found {len(movement_indices)} movement artifacts")
+        
+        # Combine all artifact indices
+        ica.exclude = sorted(set(eog_indices + ecg_indices + muscle_indices + movement_indices))
+        logger.info(f"Total components marked for removal: {len(ica.exclude)}")
+        ica.apply(self.filtered_data)
+
+    def _stage_muscle_artifacts(self):
+        """Remove residual muscle artifacts"""
+        self._remove_muscle_artifacts()
+
+    def _stage_line_noise(self, base_freq: float = 50.0, method: str = 'comb'):
+        """Remove power line noise and harmonics"""
+        self.filter_engine.line_noise_method = method
+        self._line_freq = base_freq
+        self._remove_line_noise()
+
     def _remove_muscle_artifacts(self):
         """Remove high-frequency muscle artifacts"""
         try:
@@ -513,16 +895,121 @@ class EEGProcessor:
             logger.warning(f"Could not remove muscle artifacts: {str(e)}")
 
     def _remove_line_noise(self):
-        """Remove power line noise using advanced techniques"""
+        """Remove power line noise and harmonics up to Nyquist"""
         try:
-            self.filtered_data.notch_filter(
-                freqs=np.arange(50, 251, 50),
+            self.filtered_data.apply_function(
+                self.filter_engine.remove_line_noise,
                 picks='all',
-                method='spectrum_fit'
+                sfreq=self.filtered_data.info['sfreq'],
+                base_freq=getattr(self, '_line_freq', 50.0),
+                channel_wise=False
             )
         except Exception as e:
             logger.warning(f"Could not remove line noise: {str(e)}")
 
+    def iter_clean_windows(self, window_sec: float = 2.0, step_sec: Optional[float] = None):
+        """
+        Yield fixed-length windows of filtered data that contain no artifacts.
+        
+        Args:
+            window_sec: Window length in seconds
+            step_sec: Hop between windows in seconds (defaults to window length)
+            
+        Yields:
+            Tuple[float, np.ndarray]: Window start time and (n_channels, n_samples) data
+        """
+        sfreq = self.filtered_data.info['sfreq']
+        window_samples = int(round(window_sec * sfreq))
+        step_samples = int(round(step_sec * sfreq)) if step_sec else window_samples
+        starts = self.artifact_index.clean_windows(self.filtered_data.n_times, sfreq,
+                                                   window_samples, step_samples)
+        for start in starts:
+            yield float(start) / sfreq, self.filtered_data.get_data(start=start, stop=start + window_samples)
+
+    def create_epochs(self, duration: float = 2.0, overlap: float = 0.0) -> Optional['mne.Epochs']:
+        """
+        Create fixed-length epochs, dropping those that overlap indexed artifacts.
+        
+        Args:
+            duration: Epoch length in seconds
+            overlap: Overlap between consecutive epochs in seconds
+            
+        Returns:
+            Optional[mne.Epochs]: Epochs over clean data only, or None when
+                no epoch is free of artifacts
+        """
+        sfreq = self.filtered_data.info['sfreq']
+        starts = self.artifact_index.clean_windows(
+            self.filtered_data.n_times, sfreq,
+            int(round(duration * sfreq)), int(round((duration - overlap) * sfreq))
+        )
+        if not len(starts):
+            logger.warning(f"No artifact-free {duration} s epochs")
+            self.epochs = None
+            return None
+        events = np.column_stack([
+            starts + self.filtered_data.first_samp,
+            np.zeros(len(starts), dtype=int),
+            np.ones(len(starts), dtype=int)
+        ])
+        self.epochs = mne.Epochs(self.filtered_data, events, tmin=0.0,
+                                 tmax=duration - 1.0 / sfreq, baseline=None,
+                                 reject_by_annotation=False, preload=True, verbose=False)
+        logger.info(f"Created {len(self.epochs)} clean epochs")
+        return self.epochs
+
+    def _feature_picks(self):
+        """Indices and names of the data channels all per-channel features describe"""
+        picks = mne.pick_types(self.filtered_data.info, meg=True, eeg=True, seeg=True, ecog=True,
+                               dbs=True, fnirs=True, exclude=[])
+        return picks, [self.filtered_data.ch_names[i] for i in picks]
+
+    def _iter_clean_chunks(self, chunk_size: Optional[int] = None):
+        """Yield consecutive blocks of the feature channels with indexed artifact samples removed"""
+        chunk_size = chunk_size or channel_stats.DEFAULT_CHUNK_SIZE
+        picks, _ = self._feature_picks()
+        n_times = self.filtered_data.n_times
+        mask = None
+        if len(self.artifact_index):
+            mask = self.artifact_index.sample_mask(n_times, self.filtered_data.info['sfreq'])
+        for start in range(0, n_times, chunk_size):
+            stop = min(start + chunk_size, n_times)
+            chunk = self.filtered_data.get_data(picks=picks, start=start, stop=stop)
+            yield chunk if mask is None else chunk[:, ~mask[start:stop]]
+
+    def _clean_welch(self, fmin: float, fmax: float, n_fft: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Welch PSD of the feature channels over artifact-free segments only.
+        
+        Segments (half-overlapping, as in a plain Welch estimate) that touch
+        an indexed artifact are skipped. When no full-length segment is
+        clean, shorter ones are tried down to one second.
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: PSD (n_channels, n_freqs) and frequencies
+        """
+        data = self.filtered_data
+        sfreq, n_times = data.info['sfreq'], data.n_times
+        picks, _ = self._feature_picks()
+        n_fft = min(n_fft, n_times)
+        starts = self.artifact_index.clean_windows(n_times, sfreq, n_fft, max(n_fft // 2, 1))
+        while not len(starts) and n_fft // 2 >= sfreq:
+            n_fft //= 2
+            starts = self.artifact_index.clean_windows(n_times, sfreq, n_fft, n_fft // 2)
+        if not len(starts):
+            raise ValueError("No artifact-free segment long enough for spectral features")
+            
+        psd_sum, freqs = None, None
+        for batch in np.array_split(starts, max(1, len(starts) // WELCH_BATCH)):
+            segments = np.stack([data.get_data(picks=picks, start=start, stop=start + n_fft)
+                                 for start in batch])
+            psd, freqs = mne.time_frequency.psd_array_welch(
+                segments, sfreq, fmin=fmin, fmax=fmax, n_fft=n_fft, n_overlap=0, verbose=False
+            )
+            psd_sum = psd.sum(axis=0) if psd_sum is None else psd_sum + psd.sum(axis=0)
+        logger.info(f"Welch PSD over {len(starts)} clean segments of {n_fft} samples")
+        return psd_sum / len(starts), freqs
+
     @PROCESSING_TIME.time()
     def extract_features(self) -> bool:
         """
@@ -534,23 +1021,18 @@ class EEGProcessor:
         try:
             logger.info("Starting feature extraction")
             
-            # Calculate power spectral density
-            psd, freqs = mne.time_frequency.psd_welch(
-                self.filtered_data,
-                fmin=1, fmax=40,
-                n_fft=2048,
-                n_overlap=1024
-            )
+            # Every run starts from an empty feature set
+            features = {}
             
-            # Extract band powers in parallel
-            bands = {
-                'delta': (1, 4),
-                'theta': (4, 8),
-                'alpha': (8, 13),
-                'beta': (13, 30),
-                'gamma': (30, 40)
-            }
+            bands = self.pipeline_spec.bands
             
+            # Calculate power spectral density over the configured bands
+            # (computed in the working precision of the data), over
+            # artifact-free segments only
+            psd, freqs = self._clean_welch(min(low for low, _ in bands.values()),
+                                           max(high for _, high in bands.values()))
+            
+            # Extract band powers in parallel
             with ThreadPoolExecutor() as executor:
                 futures = {
                     band: executor.submit(
@@ -560,61 +1042,65 @@ class EEGProcessor:
                     for band, (fmin, fmax) in bands.items()
                 }
                 
-                self.features['band_powers'] = {
+                features['band_powers'] = {
                     band: future.result()
                     for band, future in futures.items()
                 }
             
-            # Calculate additional features with error handling and validation
-            try:
-                connectivity = self._calculate_connectivity()
-                temporal = self._extract_temporal_features()
-                complexity = self._calculate_complexity_measures()
-                statistical = self._calculate_statistical_features()
-
-                # Validate each feature set before adding
-                if self._validate_feature_set(connectivity, 'connectivity') and \
-                   self._validate_feature_set(temporal, 'temporal') and \
-                   self._validate_feature_set(complexity, 'complexity') and \
-                   self._validate_feature_set(statistical, 'statistical'):
-                    
-                    self.features.update({
-                        'connectivity': connectivity,
-                        'temporal': temporal, 
-                        'complexity': complexity,
-                        'statistical': statistical
-                    })
-                else:
-                    raise ValueError("One or more feature sets failed validation")
-
-            except Exception as e:
-                logger.error(f"Error calculating additional features: {str(e)}")
-                raise
+            # Aperiodic/periodic decomposition, when enabled in the spec
+            if self.pipeline_spec.spectral_params is not None:
+                features['spectral_params'] = self._calculate_spectral_params(
+                    self.pipeline_spec.spectral_params)
+            
+            # Additional feature sets; one that cannot be computed is left out
+            for name, calculate in [('connectivity', self._calculate_connectivity),
+                                    ('temporal', self._extract_temporal_features),
+                                    ('statistical', self._calculate_statistical_features)]:
+                feature_set = calculate()
+                if self._validate_feature_set(feature_set, name):
+                    features[name] = feature_set
 
             # Validate overall feature structure and values
-            validation_errors = self._validate_features()
+            validation_errors = self._validate_features(features)
             if validation_errors:
                 error_msg = "Feature validation failed: " + "; ".join(validation_errors)
                 logger.error(error_msg)
                 raise ValueError(error_msg)
             
-            # Cache validated features
-            feature_hash = hashlib.md5(str(self.features).encode()).hexdigest()
-            self.cache[feature_hash] = self.features.copy()
-            
+            self.features = features
             logger.info("Feature extraction completed successfully")
             return True
             
         except Exception as e:
             logger.error(f"Error in feature extraction: {str(e)}")
-            # Attempt recovery of partial results from cache
-            if hasattr(self, 'cache') and self.cache:
-                logger.info("Attempting to recover last valid features from cache")
-                last_cache = list(self.cache.values())[-1]
-                self.features = last_cache
-                return True
             raise
 
+    @staticmethod
+    def _validate_feature_set(feature_set: Dict, name: str) -> bool:
+        """Whether a feature set was computed (failed sets come back empty)"""
+        if not isinstance(feature_set, dict) or not feature_set:
+            logger.warning(f"Leaving out {name} features: none could be computed")
+            return False
+        return True
+
+    def _validate_features(self, features: Dict) -> List[str]:
+        """
+        Check the band powers every downstream consumer relies on.
+        
+        Returns:
+            List[str]: Problems found (empty when the features are valid)
+        """
+        errors = []
+        n_channels = len(self._feature_picks()[0])
+        band_powers = features.get('band_powers') or {}
+        for band in self.pipeline_spec.bands:
+            values = np.asarray(band_powers.get(band, []), dtype=float)
+            if values.size != n_channels:
+                errors.append(f"{band} power has {values.size} values for {n_channels} channels")
+            elif not np.all(np.isfinite(values) & (values >= 0)):
+                errors.append(f"{band} power has negative or non-finite values")
+        return errors
+
     def _calculate_band_power(self, psd: np.ndarray, freqs: np.ndarray, 
                             fmin: float, fmax: float) -> List[float]:
         """Calculate power in specific frequency band"""
@@ -627,46 +1113,136 @@ class EEGProcessor:
             
         return np.mean(psd[:, freq_mask], axis=1).tolist()
 
-    def _calculate_complexity_measures(self) -> Dict:
-        """Calculate signal complexity measures"""
+    def _calculate_spectral_params(self, settings: Dict) -> Dict:
+        """
+        Aperiodic offset/exponent and per-band peak parameters per channel.
+        
+        The artifact-free spectrum of every channel is parameterized; with
+        ``window`` (and optionally ``step`` and the Welch ``segment``, all in
+        seconds) in the settings every sliding window is fitted as well, kept
+        in ``self.spectral_windows`` and summarized per channel.
+        
+        Args:
+            settings: ``features.spectral_params`` from the pipeline spec
+            
+        Returns:
+            Dict: Per-channel lists (None where a band has no peak)
+        """
+        settings = dict(settings)
+        window, step = settings.pop('window', None), settings.pop('step', None)
+        segment = settings.pop('segment', None)
+        fit_range = {**spectral_params.DEFAULT_SETTINGS, **settings}
+        sfreq = self.filtered_data.info['sfreq']
+        psd, freqs = self._clean_welch(fit_range['fmin'], fit_range['fmax'])
+        fit = spectral_params.fit_spectra(freqs, psd, **settings)
+        as_list = lambda values: [None if np.isnan(v) else float(v) for v in values]
+        
+        peaks = {}
+        for band, (fmin, fmax) in self.pipeline_spec.bands.items():
+            frequency, power, bandwidth = fit.dominant_peak(fmin, fmax)
+            peaks[band] = {'frequency': as_list(frequency), 'power': as_list(power),
+                           'bandwidth': as_list(bandwidth)}
+        result = {
+            'aperiodic_offset': as_list(fit.offset),
+            'aperiodic_exponent': as_list(fit.exponent),
+            'r_squared': as_list(fit.r_squared),
+            'n_peaks': fit.n_peaks.tolist(),
+            'peaks': peaks
+        }
+        
+        if window:
+            windows, times = self._fit_clean_windows(float(window), float(step or window / 2.0),
+                                                     segment, settings)
+            self.spectral_windows = {'times': times, 'fit': windows}
+            alpha = self.pipeline_spec.bands.get('alpha', [8.0, 13.0])
+            alpha_frequency, _, _ = windows.dominant_peak(*alpha)
+            with np.errstate(all='ignore'):
+                result['windows'] = {
+                    'n_windows': len(times),
+                    'aperiodic_exponent_mean': as_list(np.nanmean(windows.exponent, axis=1)),
+                    'aperiodic_exponent_std': as_list(np.nanstd(windows.exponent, axis=1)),
+                    'aperiodic_offset_mean': as_list(np.nanmean(windows.offset, axis=1)),
+                    'alpha_peak_frequency_mean': as_list(np.nanmean(alpha_frequency, axis=1)),
+                    'alpha_peak_presence': np.mean(~np.isnan(alpha_frequency), axis=1).tolist()
+                }
+        return result
+
+    def _fit_clean_windows(self, window: float, step: float, segment: Optional[float],
+                           settings: Dict) -> Tuple['spectral_params.SpectralFit', np.ndarray]:
+        """
+        Parameterize the spectra of the sliding windows that contain no indexed artifact.
+        
+        Windows are read and fitted a batch at a time, so memory does not
+        grow with the length of the recording.
+        
+        Returns:
+            Tuple: SpectralFit with (n_channels, n_windows) leading shape and
+                the window center times in seconds
+        """
+        data = self.filtered_data
+        sfreq, n_times = data.info['sfreq'], data.n_times
+        picks, _ = self._feature_picks()
+        window_samples = int(round(window * sfreq))
+        starts = self.artifact_index.clean_windows(n_times, sfreq, window_samples,
+                                                   max(1, int(round(step * sfreq))))
+        if not len(starts):
+            raise ValueError(f"No artifact-free {window} s window for windowed spectral parameters")
+            
+        fits = []
+        for batch in np.array_split(starts, max(1, len(starts) // WELCH_BATCH)):
+            segments = np.stack([data.get_data(picks=picks, start=start, stop=start + window_samples)
+                                 for start in batch], axis=1)
+            freqs, spectra = spectral_params.segment_spectra(segments, sfreq, segment)
+            fits.append(spectral_params.fit_spectra(freqs, spectra, **settings))
+        fit = spectral_params.SpectralFit(**{
+            name: np.concatenate([getattr(part, name) for part in fits], axis=1)
+            for name in spectral_params.SpectralFit.__dataclass_fields__
+        })
+        logger.info(f"Fitted {len(starts)} artifact-free spectral windows")
+        return fit, (starts + window_samples / 2.0) / sfreq
+
+    def _extract_temporal_features(self) -> Dict:
+        """Hjorth parameters and line length per channel, over clean samples"""
         try:
-            data = self.filtered_data.get_data()
-            if data.size == 0:
-                raise ValueError("Empty data array")
+            n_channels = len(self._feature_picks()[0])
+            dtype = self.filtered_data._data.dtype
+            # Moments of the signal and of its first and second differences
+            moments = [channel_stats.ChannelMoments.empty(n_channels) for _ in range(3)]
+            abs_diff = np.zeros(n_channels)
+            for chunk in self._iter_clean_chunks():
+                if chunk.shape[1] < 3:
+                    continue
+                first = np.diff(chunk, axis=1)
+                for i, block in enumerate([chunk, first, np.diff(first, axis=1)]):
+                    moments[i] = moments[i].update(block, dtype=dtype)
+                abs_diff += np.abs(first).sum(axis=1, dtype=np.float64)
+            if moments[0].n == 0:
+                raise ValueError("No clean samples")
                 
-            complexity_measures = {
-                'sample_entropy': self._sample_entropy(data),
-                'approximate_entropy': self._approximate_entropy(data),
-                'hurst_exponent': self._hurst_exponent(data),
-                'lyapunov_exp': self._calculate_lyapunov(data),
-                'correlation_dim': self._correlation_dimension(data)
+            activity, first_var, second_var = (m.m2 / m.n for m in moments)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mobility = np.sqrt(first_var / activity)
+                complexity = np.sqrt(second_var / first_var) / mobility
+            return {
+                'hjorth_activity': activity.tolist(),
+                'hjorth_mobility': mobility.tolist(),
+                'hjorth_complexity': complexity.tolist(),
+                'line_length': (abs_diff / moments[1].n).tolist()
             }
             
-            # Validate measures
-            if any(np.isnan(val).any() for val in complexity_measures.values() if isinstance(val, np.ndarray)):
-                raise ValueError("NaN values detected in complexity measures")
-                
-            return complexity_measures
-            
         except Exception as e:
-            logger.error(f"Error calculating complexity measures: {str(e)}")
+            logger.error(f"Error calculating temporal features: {str(e)}")
             return {}
 
     def _calculate_statistical_features(self) -> Dict:
         """Calculate statistical features"""
         try:
-            data = self.filtered_data.get_data()
-            if data.size == 0:
-                raise ValueError("Empty data array")
-                
-            stats = {
-                'variance': np.var(data, axis=1).tolist(),
-                'peak_to_peak': np.ptp(data, axis=1).tolist(),
-                'zero_crossings': np.sum(np.diff(np.signbit(data), axis=1), axis=1).tolist(),
-                'kurtosis': scipy.stats.kurtosis(data, axis=1).tolist(),
-                'skewness': scipy.stats.skew(data, axis=1).tolist(),
-                'rms': np.sqrt(np.mean(np.square(data), axis=1)).tolist()
-            }
+            # Fused single pass over cache-sized blocks instead of six full passes
+            moments = channel_stats.accumulate_chunks(
+                self._iter_clean_chunks(), len(self._feature_picks()[0]),
+                dtype=self.filtered_data._data.dtype
+            )
+            stats = moments.to_features()
             
             # Validate statistical measures
             if any(np.isnan(val).any() for val in stats.values()):
@@ -678,12 +1254,131 @@ class EEGProcessor:
             logger.error(f"Error calculating statistical features: {str(e)}")
             return {}
 
-    def export_results(self, output_dir: str) -> bool:
+    def _channel_covariance(self) -> Dict:
+        """
+        Channel covariances of the filtered data from one pass over clean samples.
+
+        Collects the broadband and per-band (spec bands) covariances and, per
+        ``QUALITY_WINDOW`` window, how often each channel correlates poorly
+        with all others. The pass is cached for the current data, so the
+        connectivity features, quality checks and report share it.
+
+        Returns:
+            Dict: ``accumulator`` (channel_covariance.CovarianceAccumulator),
+                ``ch_names``, ``low_correlation_windows`` (per channel),
+                ``n_windows`` and ``artifact_fraction``
+        """
+        key = (self.file_hash, self.pipeline_spec.hash, id(self.filtered_data))
+        if self._covariance is not None and self._covariance['key'] == key:
+            return self._covariance
+
+        data = self.filtered_data
+        sfreq = data.info['sfreq']
+        picks, ch_names = self._feature_picks()
+        nyquist = sfreq / 2.0
+        bands = {name: (low, high) for name, (low, high) in self.pipeline_spec.bands.items() if low < nyquist}
+        low_counts = np.zeros(len(picks), dtype=np.int64)
+        n_windows = [0]
+
+        def on_window(band, index, stats):
+            if band is None and stats.n > 1:
+                corr = np.abs(stats.correlation())
+                np.fill_diagonal(corr, 0.0)
+                low_counts[:] += corr.max(axis=1) < LOW_CORRELATION
+                n_windows[0] += 1
+
+        accumulator = channel_covariance.CovarianceAccumulator(
+            len(picks), sfreq=sfreq, bands=bands, window=int(round(QUALITY_WINDOW * sfreq)),
+            on_window=on_window, dtype=data._data.dtype
+        )
+        mask = None
+        if len(self.artifact_index):
+            mask = self.artifact_index.sample_mask(data.n_times, sfreq)
+        chunk_size = channel_stats.DEFAULT_CHUNK_SIZE
+        for start in range(0, data.n_times, chunk_size):
+            stop = min(start + chunk_size, data.n_times)
+            accumulator.update(data.get_data(picks=picks, start=start, stop=stop),
+                               None if mask is None else mask[start:stop])
+        accumulator.finish()
+
+        self._covariance = {
+            'key': key,
+            'accumulator': accumulator,
+            'ch_names': ch_names,
+            'low_correlation_windows': low_counts,
+            'n_windows': n_windows[0],
+            'artifact_fraction': float(mask.mean()) if mask is not None else 0.0
+        }
+        return self._covariance
+
+    def _calculate_connectivity(self) -> Dict:
+        """Channel-pair correlations and node strength, broadband and per band"""
+        try:
+            covariance = self._channel_covariance()
+            accumulator, ch_names = covariance['accumulator'], covariance['ch_names']
+            rows, cols = np.triu_indices(len(ch_names), k=1)
+            connectivity = {'correlation': {}, 'strength': {}}
+            for band in [None, *accumulator.bands]:
+                corr = accumulator.correlation(band)
+                name = band or 'broadband'
+                connectivity['correlation'][name] = {
+                    f'{ch_names[i]}-{ch_names[j]}': float(corr[i, j]) for i, j in zip(rows, cols)
+                }
+                # Mean absolute correlation of each channel with all others
+                connectivity['strength'][name] = ((np.abs(corr).sum(axis=1) - 1.0)
+                                                  / max(len(ch_names) - 1, 1)).tolist()
+            return connectivity
+
+        except Exception as e:
+            logger.error(f"Error calculating connectivity: {str(e)}")
+            return {}
+
+    def _calculate_quality_metrics(self) -> Dict:
+        """
+        Signal quality from the shared covariance pass.
+
+        Flat channels have a variance below ``FLAT_VARIANCE_RATIO`` of the
+        median channel variance; low-correlation channels correlate below
+        ``LOW_CORRELATION`` with every other channel in more than
+        ``LOW_CORRELATION_FRACTION`` of the windows (as in PREP).
+
+        Returns:
+            Dict: Bad channel lists, mean absolute correlation, artifact
+                fraction and an overall ``quality_score`` in [0, 1]
+        """
+        covariance = self._channel_covariance()
+        accumulator, ch_names = covariance['accumulator'], covariance['ch_names']
+        variance = np.diag(accumulator.covariance())
+        flat = variance <= FLAT_VARIANCE_RATIO * np.median(variance)
+        n_windows = max(covariance['n_windows'], 1)
+        low = covariance['low_correlation_windows'] / n_windows > LOW_CORRELATION_FRACTION
+        corr = np.abs(accumulator.correlation())
+        off_diagonal = corr[~np.eye(len(ch_names), dtype=bool)]
+        bad_fraction = np.count_nonzero(flat | low) / max(len(ch_names), 1)
+        return {
+            'n_channels': len(ch_names),
+            'flat_channels': [ch for ch, bad in zip(ch_names, flat) if bad],
+            'low_correlation_channels': [ch for ch, bad in zip(ch_names, low & ~flat) if bad],
+            'mean_abs_correlation': float(off_diagonal.mean()) if off_diagonal.size else 1.0,
+            'artifact_fraction': covariance['artifact_fraction'],
+            'quality_score': float((1.0 - bad_fraction) * (1.0 - covariance['artifact_fraction']))
+        }
+
+    def _assess_signal_quality(self) -> float:
+        """Overall signal quality score in [0, 1]"""
+        return self._calculate_quality_metrics()['quality_score']
+
+    def export_results(self, output_dir: str, participant_id: Optional[str] = None,
+                       session: str = '1', attributes: Optional[Dict] = None) -> bool:
         """
         Export analysis results to various formats with compression.
         
         Args:
             output_dir: Directory to save the results
+            participant_id: If given, also append the features to the cohort
+                feature store under this participant
+            session: Session label for the feature store
+            attributes: Participant attributes (Age, Gender, ...) for the feature store
             
         Returns:
             bool: Success status of export operation
@@ -701,6 +1396,18 @@ class EEGProcessor:
                 logger.error(f"Error saving features: {str(e)}")
                 raise
             
+            # Names of the channels the per-channel features describe (not
+            # EOG/stim channels) and participant attributes (Age, ...) for the qEEG norms
+            _, ch_names = self._feature_picks()
+            with open(output_path / 'attributes.json', 'w') as f:
+                json.dump({'ch_names': ch_names, **(attributes or {})}, f)
+            
+            if participant_id is not None:
+                feature_store.FeatureStore(get_config().get('feature_store', 'cache/feature_store')).append(
+                    self.features, participant_id, ch_names, session=session,
+                    recording_id=self.file_hash, attributes=attributes
+                )
+            
             # Export plots with error handling
             try:
                 self._export_plots(output_path)
@@ -735,6 +1442,32 @@ class EEGProcessor:
             logger.error(f"Error in exporting results: {str(e)}")
             raise
 
+    def _plot_channel_correlations(self):
+        """Broadband and per-band channel correlation matrices from the shared covariance pass"""
+        import matplotlib.pyplot as plt
+
+        covariance = self._channel_covariance()
+        accumulator, ch_names = covariance['accumulator'], covariance['ch_names']
+        bands = [None, *accumulator.bands]
+        fig, axes = plt.subplots(1, len(bands), figsize=(4 * len(bands), 4), squeeze=False)
+        for ax, band in zip(axes[0], bands):
+            image = ax.imshow(accumulator.correlation(band), vmin=-1.0, vmax=1.0, cmap='RdBu_r')
+            ax.set_title(band or 'broadband')
+            if len(ch_names) <= 32:
+                ax.set_xticks(range(len(ch_names)), ch_names, rotation=90, fontsize=6)
+                ax.set_yticks(range(len(ch_names)), ch_names, fontsize=6)
+        fig.colorbar(image, ax=axes[0].tolist(), shrink=0.8, label='r')
+        return fig
+
+    def _create_quality_metrics_html(self, metrics: Dict) -> str:
+        """Quality metrics as an HTML table"""
+        rows = ''.join(
+            f"<tr><td>{name.replace('_', ' ').capitalize()}</td>"
+            f"<td>{', '.join(value) if isinstance(value, list) else value}</td></tr>"
+            for name, value in metrics.items()
+        )
+        return f"<table class='quality-metrics'>{rows}</table>"
+
     def _create_report(self, output_path: Path):
         """Create comprehensive analysis report with detailed visualizations and metrics"""
         try:
@@ -774,6 +1507,7 @@ class EEGProcessor:
             tfr = mne.time_frequency.tfr_morlet(self.filtered_data.get_data(), 
                                                self.filtered_data.info['sfreq'],
                                                **tfr_params,
+                                               decim=self.report_decim,
                                                average=False)
             fig_tfr = tfr.plot(show=False)
             report.add_figure(fig_tfr, title='Time-Frequency Analysis')
@@ -820,3 +1554,376 @@ class EEGProcessor:
             raise
 
 
+# One processor per worker process so pipeline results stay cached across requests
+_processor = None
+_processor_pid = None
+
+def get_processor() -> EEGProcessor:
+    """Return this process's shared EEGProcessor, creating it on first use"""
+    global _processor, _processor_pid
+    if _processor is None or _processor_pid != os.getpid():
+        _processor = EEGProcessor()
+        _processor_pid = os.getpid()
+    return _processor
+
+def init_worker():
+    """Drop per-process state inherited from the parent after a fork"""
+    global _redis_pool, _processor, _memory_budget, _response_cache
+    _redis_pool = None
+    _processor = None
+    _memory_budget = None
+    _response_cache = None
+
+def create_app(config_path: str = 'config.yaml') -> Flask:
+    """
+    Build the Flask application.
+
+    Args:
+        config_path: YAML config file
+
+    Returns:
+        Flask: Configured application with the API blueprint registered
+    """
+    global _config_path
+    _config_path = config_path
+    config = get_config()
+    configure_logging()
+    app = Flask(__name__)
+    CORS(app)
+    app.config['JWT_SECRET_KEY'] = config['jwt_secret_key']
+    app.config['UPLOAD_FOLDER'] = config['upload_folder']
+    app.config['MAX_CONTENT_LENGTH'] = config['max_file_size']
+    Path(config['upload_folder']).mkdir(parents=True, exist_ok=True)
+    jwt.init_app(app)
+    limiter.init_app(app)
+    app.register_blueprint(api)
+    return app
+
+@api.route('/api/process', methods=['POST'])
+@jwt_required()
+def process_file():
+    """Run the configured pipeline, adjusted by the frontend settings, on an uploaded file"""
+    payload = request.get_json(silent=True) or {}
+    file_name = secure_filename(os.path.basename(payload.get('file_path') or ''))
+    file_path = Path(current_app.config['UPLOAD_FOLDER']) / file_name
+    if not file_name or not file_path.exists():
+        return jsonify({'error': 'EEG file not found'}), 404
+        
+    try:
+        spec = PipelineSpec.from_settings(payload.get('settings') or {},
+                                          base=PipelineSpec.from_config(get_config()))
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'error': f"Invalid settings: {str(e)}"}), 400
+        
+    REQUESTS.inc()
+    if get_config().get('execution') == 'distributed':
+        job_id = get_job_queue().submit('process', {'file_path': str(file_path), 'spec': spec.to_dict()})
+        return jsonify({'job_id': job_id, 'status_url': f'/api/jobs/{job_id}'}), 202
+    
+    def build():
+        result = analyze_file(str(file_path), spec)
+        if result['downgraded']:
+            # A result degraded under memory pressure is tagged with the spec
+            # that ran and never cached as the requested full-resolution one
+            return http_cache.Variant(result, http_cache.make_etag(digest, result['spec_hash']))
+        return result
+        
+    # Results depend only on the file content and the spec, so identical
+    # requests are served from the serialized response cache
+    try:
+        digest = http_cache.file_digest(file_path)
+        etag = http_cache.make_etag(digest, spec.hash)
+        return http_cache.conditional_response(etag, build, last_modified=http_cache.file_mtime(file_path),
+                                               cache=get_response_cache())
+    except Exception as e:
+        logger.error(f"Error processing {file_name}: {str(e)}")
+        return jsonify({'error': 'Processing failed'}), 500
+
+def get_job_queue():
+    """Job queue on the configured Redis stream"""
+    return job_queue.JobQueue(get_redis(), stream=get_config().get('job_stream', 'eeg:jobs'))
+
+def run_process_job(payload: Dict) -> Dict:
+    """Worker handler for 'process' jobs queued by /api/process"""
+    return analyze_file(payload['file_path'], PipelineSpec.from_dict(payload['spec']),
+                        output_dir=payload.get('output_dir'))
+
+# Node-wide memory budget, created on first use
+_memory_budget = None
+
+def _publish_memory_metrics(usage: Dict):
+    MEMORY_BUDGET.set(usage['budget_bytes'])
+    MEMORY_RESERVED.set(usage['reserved_bytes'])
+    ADMISSION_QUEUE_DEPTH.set(usage['queue_depth'])
+
+def get_memory_budget():
+    """Memory budget shared by all API and worker processes on this node"""
+    global _memory_budget
+    if _memory_budget is None:
+        config = get_config()
+        _memory_budget = memory_budget.MemoryBudget(
+            config.get('memory_ledger', 'cache/memory_ledger.json'),
+            total_bytes=config.get('memory_budget'),
+            degrade_after=config.get('memory_degrade_after', memory_budget.DEFAULT_DEGRADE_AFTER),
+            on_change=_publish_memory_metrics
+        )
+    return _memory_budget
+
+def analyze_file(file_path: str, spec: PipelineSpec, output_dir: Optional[str] = None) -> Dict:
+    """
+    Load and analyze a recording once its estimated peak memory fits the node budget.
+    
+    The estimate is made from the file header before any samples are read.
+    Jobs that cannot fit at full resolution run with ICA fitted on decimated
+    samples and a decimated report TFR.
+    
+    Args:
+        file_path: Recording to analyze
+        spec: Pipeline spec to run
+        output_dir: If given, also export results and the report there
+        
+    Returns:
+        Dict: Hash of the spec that was run, features and whether it was downgraded
+    """
+    shape = memory_budget.read_shape(file_path, time_column=get_config().get('text_time_column', 'Time'))
+    plans = memory_budget.plan_job(shape, spec, report=output_dir is not None)
+    processor = get_processor()
+    budget = get_memory_budget()
+    try:
+        with budget.admit(plans, reclaim=processor.clear_memory_cache) as plan:
+            spec = plan.apply(spec)
+            processor.report_decim = plan.tfr_decim
+            processor.load_eeg_data(file_path)
+            if not processor.run_pipeline(spec):
+                raise RuntimeError(f"Pipeline {spec.hash[:12]} failed on {file_path}")
+            if output_dir is not None:
+                processor.export_results(output_dir)
+    finally:
+        # Recordings the processor keeps cached still occupy the budget
+        budget.set_resident(processor.cached_bytes())
+    return {'spec_hash': spec.hash, 'features': processor.features, 'downgraded': plan.downgraded}
+
+def run_worker(config_path: str = 'config.yaml'):
+    """
+    Run a distributed job worker until interrupted.
+    
+    Start any number of these on any node that shares the Redis instance and
+    the upload folder with the API, e.g.
+    ``python -c "from docs.EEG import run_worker; run_worker()"``.
+    """
+    global _config_path
+    _config_path = config_path
+    configure_logging()
+    job_queue.Worker(get_job_queue(), {'process': run_process_job}).run()
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def job_status(job_id: str):
+    """Status of a queued analysis job, with its result once done"""
+    queue = get_job_queue()
+    status = queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if status['status'] == job_queue.JobStatus.DONE.value:
+        status['result'] = queue.result(job_id)
+    return jsonify(status)
+
+@api.route('/api/memory', methods=['GET'])
+@jwt_required()
+def memory_usage():
+    """Memory budget use and admission queue depth on this node"""
+    usage = get_memory_budget().usage()
+    _publish_memory_metrics(usage)
+    return jsonify(usage)
+
+# This process's response cache, created on first use
+_response_cache = None
+
+def get_response_cache():
+    """Serialized response cache in Redis or under the cache directory, per config"""
+    global _response_cache
+    if _response_cache is None:
+        config = get_config()
+        if config.get('response_cache') == 'redis':
+            _response_cache = http_cache.RedisCache(get_redis())
+        else:
+            # One instance per process, so its write count paces the pruning
+            _response_cache = http_cache.DiskCache(
+                Path(config.get('cache_dir') or 'cache') / 'responses',
+                max_bytes=config.get('response_cache_max_bytes', http_cache.DEFAULT_CACHE_BYTES)
+            )
+    return _response_cache
+
+# Largest batch accepted by the norms conversion endpoint
+MAX_NORMS_BATCH = 100_000
+
+def get_norms():
+    """Norms index from the configured file, built from the reference CSV on first use"""
+    config = get_config()
+    norms_file = config.get('norms_file', 'cache/norms.npz')
+    if not Path(norms_file).exists():
+        logger.info(f"Building norms from {config.get('norms_source')}")
+        norms.build_norms(
+            config.get('norms_source', 'examples/raw_data/psychometric_calculator_data.csv'),
+            norms_file,
+            group_by=config.get('norms_group_by', ['Test_Type'])
+        )
+    return norms.load_norms(norms_file)
+
+@api.route('/api/norms/groups', methods=['GET'])
+@jwt_required()
+def norms_groups():
+    """List the norm groups and their reference sample sizes"""
+    index = get_norms()
+    return jsonify({'group_by': index.group_by, 'groups': index.groups()})
+
+@api.route('/api/norms/convert', methods=['POST'])
+@jwt_required()
+def convert_scores():
+    """
+    Convert a batch of raw scores to percentile, z, T and stanine scores.
+    
+    The body holds ``scores`` plus either one ``group`` for all scores
+    (e.g. {"Test_Type": "Aptitude"}) or a ``groups`` list with one mapping
+    per score.
+    """
+    payload = request.get_json(silent=True) or {}
+    scores = payload.get('scores')
+    if not isinstance(scores, list) or not scores:
+        return jsonify({'error': 'scores must be a non-empty list'}), 400
+    if len(scores) > MAX_NORMS_BATCH:
+        return jsonify({'error': f"At most {MAX_NORMS_BATCH} scores per request"}), 413
+        
+    index = get_norms()
+    try:
+        if payload.get('groups') is not None:
+            converted = index.convert_batch(scores, payload['groups'])
+            norm_group = None
+        else:
+            key, _ = index.table_for(payload.get('group'))
+            converted = index.convert(scores, payload.get('group'))
+            norm_group = dict(zip(index.group_by, key))
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'error': f"Invalid request: {str(e)}"}), 400
+        
+    REQUESTS.inc()
+    result = {name: values.tolist() for name, values in converted.items()}
+    result['norm_group'] = norm_group
+    return jsonify(result)
+
+def get_qeeg_norms():
+    """qEEG norms from the configured file; they are built offline, never per request"""
+    norms_file = get_config().get('qeeg_norms_file', 'cache/qeeg_norms.npz')
+    if not Path(norms_file).exists():
+        raise FileNotFoundError(f"No qEEG norms at {norms_file}; build them with "
+                                f"'python qeeg_norms.py build <feature_dir> {norms_file}'")
+    return qeeg_norms.load_qeeg_norms(norms_file)
+
+@api.route('/api/qeeg/score', methods=['POST'])
+@jwt_required()
+def score_qeeg():
+    """
+    Z-score recordings' band powers and connectivity against age-matched norms.
+    
+    The body holds ``recordings``, a list of {features, age, ch_names}
+    objects, where ``features`` is ``extract_features`` output and
+    ``ch_names`` labels its per-channel lists.
+    """
+    payload = request.get_json(silent=True) or {}
+    recordings = payload.get('recordings')
+    if not isinstance(recordings, list) or not recordings:
+        return jsonify({'error': 'recordings must be a non-empty list'}), 400
+    if len(recordings) > MAX_NORMS_BATCH:
+        return jsonify({'error': f"At most {MAX_NORMS_BATCH} recordings per request"}), 413
+    try:
+        index = get_qeeg_norms()
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 503
+    try:
+        results = [index.score_features(r['features'], float(r['age']), r.get('ch_names'))
+                   for r in recordings]
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'error': f"Invalid request: {str(e)}"}), 400
+        
+    REQUESTS.inc()
+    return jsonify({'results': results})
+
+def get_summary_store():
+    """Incremental dataset summaries under the configured directory"""
+    config = get_config()
+    return summary_sketch.SummaryStore(
+        config.get('summary_dir', 'cache/summaries'),
+        group_by=config.get('summary_group_by', ['Test_Type', 'Testing_Environment'])
+    )
+
+@api.route('/api/summaries/<dataset>', methods=['POST'])
+@jwt_required()
+def update_summary(dataset):
+    """
+    Fold a batch of rows into a dataset's summary sketches.
+    
+    The body holds ``rows``, a list of records (e.g. new test responses);
+    the cost depends on the batch only, not on the rows seen before.
+    """
+    payload = request.get_json(silent=True) or {}
+    rows = payload.get('rows')
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'error': 'rows must be a non-empty list'}), 400
+    if len(rows) > MAX_NORMS_BATCH:
+        return jsonify({'error': f"At most {MAX_NORMS_BATCH} rows per request"}), 413
+    try:
+        summary = get_summary_store().update(dataset, pd.DataFrame.from_records(rows))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f"Invalid request: {str(e)}"}), 400
+        
+    REQUESTS.inc()
+    return jsonify({'dataset': dataset, 'n_rows': summary.n_rows, 'groups': summary.groups()})
+
+@api.route('/api/summaries/<dataset>', methods=['GET'])
+@jwt_required()
+def get_summary(dataset):
+    """
+    Serve a dataset's summary statistics from its sketches.
+    
+    ``?group_by=Test_Type`` returns one summary per value of that column.
+    """
+    try:
+        summary = get_summary_store().get(dataset)
+        result = summary.to_dict(request.args.get('group_by'))
+    except ValueError as e:
+        return jsonify({'error': f"Invalid request: {str(e)}"}), 400
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+        
+    REQUESTS.inc()
+    return jsonify({'dataset': dataset, **result})
+
+# Largest number of rows returned by the feature query endpoint
+MAX_FEATURE_ROWS = 100_000
+
+@api.route('/api/features/query', methods=['POST'])
+@jwt_required()
+def query_features():
+    """
+    Query the cohort feature store.
+    
+    The body may hold ``group``, ``feature``, ``band``, ``channel``,
+    ``participant_id`` and ``session`` predicates, ``where`` predicates on
+    participant attributes and the ``columns`` to return. A predicate is a
+    value, a list of values or an operator mapping, e.g.
+    {"group": "band_powers", "band": "alpha", "channel": "O1",
+     "where": {"Age": {">": 40}}, "columns": ["participant_id", "value"]}.
+    """
+    payload = request.get_json(silent=True) or {}
+    predicates = {name: payload.get(name) for name in
+                  ('group', 'feature', 'band', 'channel', 'participant_id', 'session')}
+    store = feature_store.FeatureStore(get_config().get('feature_store', 'cache/feature_store'))
+    try:
+        rows = store.query(where=payload.get('where'), columns=payload.get('columns'), **predicates)
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'error': f"Invalid query: {str(e)}"}), 400
+    if len(rows) > MAX_FEATURE_ROWS:
+        return jsonify({'error': f"Query matches {len(rows)} rows; at most {MAX_FEATURE_ROWS} are returned"}), 413
+        
+    REQUESTS.inc()
+    return jsonify({'n': len(rows), 'rows': rows.to_dict(orient='records')})
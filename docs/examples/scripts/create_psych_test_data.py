@@ -1,162 +1,244 @@
+"""
+Generate synthetic psychometric test data (personality, cognitive and
+calculator score files) for examples and load tests.
+
+All columns are drawn as whole arrays per chunk and each chunk is written
+as soon as it is generated, so memory stays bounded by the chunk size and
+10M-respondent files take seconds to minutes instead of hours. Output is
+deterministic for a given seed and chunk size.
+
+    python create_psych_test_data.py                      # example-sized files
+    python create_psych_test_data.py --personality 10000000 --format parquet
+"""
+
+import argparse
+import datetime
+import hashlib
+import os
+import sys
+
 import numpy as np
 import pandas as pd
-from scipy import stats
-import os
-import datetime
-from faker import Faker
-
-# Create directories
-os.makedirs('examples/raw_data', exist_ok=True)
-os.makedirs('examples/processed_data', exist_ok=True)
-
-# Set random seed for reproducibility
-np.random.seed(42)
-fake = Faker()
-Faker.seed(42)
-
-def generate_demographics(n_participants):
-    """Generate realistic demographic data"""
-    demographics = []
-    for _ in range(n_participants):
-        age = np.random.normal(35, 12)  # Age distribution centered at 35
-        age = max(18, min(80, int(age)))  # Clip between 18-80
-        gender = np.random.choice(['M', 'F', 'Other'], p=[0.48, 0.48, 0.04])
-        education = np.random.choice([
-            'High School', 'Some College', 'Bachelor\'s', 
-            'Master\'s', 'Doctorate'
-        ], p=[0.25, 0.2, 0.35, 0.15, 0.05])
-        demographics.append({
-            'Age': age,
-            'Gender': gender,
-            'Education': education
-        })
-    return pd.DataFrame(demographics)
-
-def generate_personality_data(n_participants=2000, n_items=100):
-    """Generate Big Five personality inventory data with realistic correlations"""
-    # Define trait clusters (items that should correlate)
-    traits = {
-        'Extraversion': list(range(0, 20)),
-        'Agreeableness': list(range(20, 40)),
-        'Conscientiousness': list(range(40, 60)),
-        'Neuroticism': list(range(60, 80)),
-        'Openness': list(range(80, 100))
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from scipy import special, stats
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from summary_sketch import DatasetSummary  # noqa: E402
+
+GENDERS = np.array(['M', 'F', 'Other'])
+GENDER_P = [0.48, 0.48, 0.04]
+EDUCATION = np.array(['High School', 'Some College', 'Bachelor\'s', 'Master\'s', 'Doctorate'])
+EDUCATION_P = [0.25, 0.2, 0.35, 0.15, 0.05]
+ENVIRONMENTS = np.array(['Lab', 'Remote', 'Clinical'])
+ENVIRONMENT_P = [0.4, 0.4, 0.2]
+TEST_TYPES = np.array(['Aptitude', 'Achievement', 'Placement'])
+TEST_TYPE_P = [0.4, 0.4, 0.2]
+
+# Big Five item clusters (items that should correlate)
+TRAITS = {
+    'Extraversion': range(0, 20),
+    'Agreeableness': range(20, 40),
+    'Conscientiousness': range(40, 60),
+    'Neuroticism': range(60, 80),
+    'Openness': range(80, 100)
+}
+
+# Fixed reference dates so output does not depend on when the script runs
+PERSONALITY_START = np.datetime64('2023-01-01T00:00', 's')
+ADMINISTRATION_END = np.datetime64('2024-01-01', 'D')
+
+# Latent z-scores between these cut points round to the same 1-5 item response
+# (equivalent to round(norm.cdf(z) * 4 + 1) without evaluating the CDF)
+ITEM_CUTS = special.ndtri((np.arange(1, 5) - 0.5) / 4).astype(np.float32)
+
+# Columns with their own summaries next to the whole-dataset one
+SUMMARY_GROUPS = ['Test_Type', 'Testing_Environment']
+
+_HEX = np.array([f'{i:02x}' for i in range(256)], dtype='S2')
+_UUID_DASHES = [8, 13, 18, 23]
+_UUID_HEX_POSITIONS = [i for i in range(36) if i not in _UUID_DASHES]
+
+
+def uuid4_array(rng, n):
+    """Random version-4 UUID strings built from random bytes"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    chars = np.full((n, 36), b'-', dtype='S1')
+    chars[:, _UUID_HEX_POSITIONS] = _HEX[raw].view('S1').reshape(n, 32)
+    return pa.array(chars.view('S36').ravel(), type=pa.binary(36)).cast(pa.string())
+
+
+def categorical(rng, categories, p, n):
+    """Dictionary-encoded categorical draw"""
+    codes = rng.choice(len(categories), size=n, p=p).astype(np.int8)
+    return pa.DictionaryArray.from_arrays(codes, pa.array(categories))
+
+
+def demographics(rng, n):
+    """Age (normal around 35, truncated to 18-80), gender and education"""
+    age = np.clip(np.trunc(rng.normal(35, 12, n)), 18, 80).astype(np.int16)
+    return {
+        'Age': age,
+        'Gender': categorical(rng, GENDERS, GENDER_P, n),
+        'Education': categorical(rng, EDUCATION, EDUCATION_P, n)
     }
-    
-    # Generate base random data
-    data = np.random.normal(0, 1, (n_participants, n_items))
-    
-    # Add correlations within trait clusters
-    for trait_items in traits.values():
-        base = np.random.normal(0, 1, n_participants)
-        for item in trait_items:
-            data[:, item] = 0.7 * base + 0.3 * data[:, item]
-    
-    # Convert to 1-5 scale
-    data = stats.norm.cdf(data) * 4 + 1
-    data = np.round(data)
-    
-    # Create DataFrame
-    columns = [f'Item_{i+1}' for i in range(n_items)]
-    df = pd.DataFrame(data, columns=columns)
-    
-    # Add participant info
-    df['Participant_ID'] = [fake.uuid4() for _ in range(n_participants)]
-    demographics = generate_demographics(n_participants)
-    df = pd.concat([df, demographics], axis=1)
-    
-    # Add timestamp and completion time
-    base_date = datetime.datetime(2023, 1, 1)
-    df['Timestamp'] = [base_date + datetime.timedelta(minutes=i*30) for i in range(n_participants)]
-    df['Completion_Time_Sec'] = np.random.normal(900, 180, n_participants).round()  # ~15 min average
-    
-    return df
-
-def generate_cognitive_data(n_participants=1500):
-    """Generate cognitive test data with realistic patterns and correlations"""
-    # Base cognitive ability factor
-    g_factor = np.random.normal(0, 1, n_participants)
-    
-    # Generate correlated cognitive scores
-    data = {
-        'Participant_ID': [fake.uuid4() for _ in range(n_participants)],
-        'Verbal_Reasoning': (0.7 * g_factor + 0.3 * np.random.normal(0, 1, n_participants)) * 15 + 100,
-        'Numerical_Reasoning': (0.7 * g_factor + 0.3 * np.random.normal(0, 1, n_participants)) * 15 + 100,
-        'Abstract_Reasoning': (0.7 * g_factor + 0.3 * np.random.normal(0, 1, n_participants)) * 15 + 100,
-        'Processing_Speed': (0.5 * g_factor + 0.5 * np.random.normal(0, 1, n_participants)) * 15 + 100,
-        'Working_Memory': (0.6 * g_factor + 0.4 * np.random.normal(0, 1, n_participants)) * 15 + 100
+
+
+def personality_chunk(rng, start, n, n_items=100):
+    """Big Five items on a 1-5 scale with correlated trait clusters"""
+    data = rng.standard_normal((n, n_items), dtype=np.float32)
+    for items in TRAITS.values():
+        base = rng.standard_normal(n, dtype=np.float32)
+        data[:, items] = 0.7 * base[:, None] + 0.3 * data[:, items]
+    items = np.ones((n, n_items), dtype=np.int8)
+    for cut in ITEM_CUTS:
+        items += data > cut
+
+    columns = {f'Item_{i + 1}': items[:, i] for i in range(n_items)}
+    columns['Participant_ID'] = uuid4_array(rng, n)
+    columns.update(demographics(rng, n))
+    columns['Timestamp'] = PERSONALITY_START + (start + np.arange(n)) * np.timedelta64(30, 'm')
+    columns['Completion_Time_Sec'] = np.rint(rng.normal(900, 180, n))  # ~15 min average
+    return pa.table(columns)
+
+
+def cognitive_chunk(rng, start, n):
+    """Cognitive scores sharing a general ability factor"""
+    g_factor = rng.normal(0, 1, n)
+    loadings = {
+        'Verbal_Reasoning': 0.7, 'Numerical_Reasoning': 0.7, 'Abstract_Reasoning': 0.7,
+        'Processing_Speed': 0.5, 'Working_Memory': 0.6
     }
-    
-    df = pd.DataFrame(data)
-    demographics = generate_demographics(n_participants)
-    df = pd.concat([df, demographics], axis=1)
-    
-    # Add response times and error rates
-    df['Mean_Response_Time_ms'] = np.random.gamma(shape=30, scale=20, size=n_participants)
-    df['Error_Rate'] = stats.beta.rvs(2, 12, size=n_participants)
-    
-    # Add testing conditions
-    df['Testing_Environment'] = np.random.choice(
-        ['Lab', 'Remote', 'Clinical'], 
-        size=n_participants, 
-        p=[0.4, 0.4, 0.2]
-    )
-    
-    return df
-
-def generate_psychometric_calculator_data(n_scores=1000):
-    """Generate diverse test score distributions for calculator testing"""
-    # Generate mixture of distributions to simulate different test scenarios
-    distributions = [
-        # Normal distribution (standard case)
-        np.random.normal(75, 10, n_scores // 3),
-        # Bimodal distribution (e.g., distinct groups)
-        np.concatenate([
-            np.random.normal(60, 8, n_scores // 6),
-            np.random.normal(85, 8, n_scores // 6)
-        ]),
-        # Skewed distribution (e.g., ceiling/floor effects)
-        stats.skewnorm.rvs(5, loc=70, scale=15, size=n_scores // 3)
-    ]
-    
-    scores = np.concatenate(distributions)
-    np.random.shuffle(scores)
-    scores = np.clip(scores, 0, 100).round(2)
-    
-    df = pd.DataFrame({
-        'Scores': scores,
-        'Test_Type': np.random.choice(
-            ['Aptitude', 'Achievement', 'Placement'], 
-            size=len(scores),
-            p=[0.4, 0.4, 0.2]
-        ),
-        'Administration_Date': [
-            fake.date_between(start_date='-1y', end_date='today') 
-            for _ in range(len(scores))
-        ]
+    columns = {'Participant_ID': uuid4_array(rng, n)}
+    for name, loading in loadings.items():
+        columns[name] = (loading * g_factor + (1 - loading) * rng.normal(0, 1, n)) * 15 + 100
+    columns.update(demographics(rng, n))
+    columns['Mean_Response_Time_ms'] = rng.gamma(shape=30, scale=20, size=n)
+    columns['Error_Rate'] = rng.beta(2, 12, size=n)
+    columns['Testing_Environment'] = categorical(rng, ENVIRONMENTS, ENVIRONMENT_P, n)
+    return pa.table(columns)
+
+
+def calculator_chunk(rng, start, n):
+    """Scores from a normal/bimodal/skewed mixture for calculator testing"""
+    # Mixture weights match the original n/3 normal, n/6 + n/6 bimodal, n/3 skewed split
+    component = rng.choice(4, size=n, p=[1 / 3, 1 / 6, 1 / 6, 1 / 3])
+    scores = np.empty(n)
+    for label, draw in enumerate([
+        lambda k: rng.normal(75, 10, k),
+        lambda k: rng.normal(60, 8, k),
+        lambda k: rng.normal(85, 8, k),
+        lambda k: stats.skewnorm.rvs(5, loc=70, scale=15, size=k, random_state=rng),
+    ]):
+        mask = component == label
+        scores[mask] = draw(int(mask.sum()))
+    days = rng.integers(0, 366, size=n)
+    return pa.table({
+        'Scores': np.clip(scores, 0, 100).round(2),
+        'Test_Type': categorical(rng, TEST_TYPES, TEST_TYPE_P, n),
+        'Administration_Date': ADMINISTRATION_END - days.astype('timedelta64[D]')
     })
-    
-    return df
-
-# Generate and save all data
-personality_data = generate_personality_data()
-personality_data.to_csv('examples/raw_data/personality_test_data.csv', index=False)
-personality_data.describe().to_csv('examples/processed_data/personality_test_summary.csv')
-
-cognitive_data = generate_cognitive_data()
-cognitive_data.to_csv('examples/raw_data/cognitive_test_data.csv', index=False)
-cognitive_data.describe().to_csv('examples/processed_data/cognitive_test_summary.csv')
-
-calculator_data = generate_psychometric_calculator_data()
-calculator_data.to_csv('examples/raw_data/psychometric_calculator_data.csv', index=False)
-calculator_data.describe().to_csv('examples/processed_data/calculator_data_summary.csv')
-
-print("Psychological test data files have been created:")
-print("\nRaw data files in 'examples/raw_data/':")
-print("- personality_test_data.csv")
-print("- cognitive_test_data.csv") 
-print("- psychometric_calculator_data.csv")
-print("\nSummary statistics in 'examples/processed_data/'")
-print("\nExample scores from psychometric calculator data:")
-print(f"Scores: {', '.join(map(str, calculator_data['Scores'].head(10)))}")
-print("(showing first 10 scores)")
+
+
+class ChunkWriter:
+    """Append tables to one CSV or Parquet file"""
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.file_format = file_format
+        self._writer = None
+
+    def write(self, table):
+        if self.file_format == 'parquet':
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+            return
+        # CSV has no dictionary type; write the category labels
+        table = pa.table({name: column.cast(column.type.value_type)
+                          if pa.types.is_dictionary(column.type) else column
+                          for name, column in zip(table.column_names, table.columns)})
+        if self._writer is None:
+            self._writer = pa_csv.CSVWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def generate(name, make_chunk, n_rows, path, file_format, seed, chunk_size, summary=None):
+    """
+    Write ``n_rows`` rows of one dataset chunk by chunk.
+
+    Each chunk gets its own random stream derived from (seed, dataset, chunk
+    index), so output is reproducible without generating earlier chunks.
+    Chunks are folded into mergeable summary sketches as they are written.
+
+    Returns:
+        pd.DataFrame: Summary statistics of the numeric columns (quartiles
+            from KLL sketches)
+    """
+    writer = ChunkWriter(path, file_format)
+    summary = summary if summary is not None else DatasetSummary(SUMMARY_GROUPS)
+    try:
+        for index, start in enumerate(range(0, n_rows, chunk_size)):
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(name_key(name), index)))
+            table = make_chunk(rng, start, min(chunk_size, n_rows - start))
+            writer.write(table)
+            summary.update(table.to_pandas())
+    finally:
+        writer.close()
+    return summary.describe()
+
+
+def name_key(name):
+    """Stable integer key of a dataset name (digest of the whole name)"""
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'little')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--personality', type=int, default=2000, help='personality respondents')
+    parser.add_argument('--cognitive', type=int, default=1500, help='cognitive test participants')
+    parser.add_argument('--scores', type=int, default=1000, help='calculator scores')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=250_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir', default='examples')
+    args = parser.parse_args()
+
+    raw_dir = os.path.join(args.output_dir, 'raw_data')
+    processed_dir = os.path.join(args.output_dir, 'processed_data')
+    os.makedirs(raw_dir, exist_ok=True)
+    os.makedirs(processed_dir, exist_ok=True)
+
+    datasets = [
+        ('personality_test_data', personality_chunk, args.personality, 'personality_test_summary'),
+        ('cognitive_test_data', cognitive_chunk, args.cognitive, 'cognitive_test_summary'),
+        ('psychometric_calculator_data', calculator_chunk, args.scores, 'calculator_data_summary'),
+    ]
+    for name, make_chunk, n_rows, summary_name in datasets:
+        started = datetime.datetime.now()
+        path = os.path.join(raw_dir, f'{name}.{args.format}')
+        summary = DatasetSummary(SUMMARY_GROUPS)
+        generate(name, make_chunk, n_rows, path, args.format, args.seed, args.chunk_size, summary)
+        summary.describe().to_csv(os.path.join(processed_dir, f'{summary_name}.csv'))
+        for column, values in summary.groups().items():
+            if not values:
+                continue
+            grouped = pd.concat({value: summary.describe((column, value)) for value in values}, axis=1)
+            grouped.to_csv(os.path.join(processed_dir, f'{summary_name}_by_{column}.csv'))
+        # Sketches for appending later batches without rereading the rows
+        summary.save(os.path.join(processed_dir, f'{summary_name}.npz'))
+        elapsed = (datetime.datetime.now() - started).total_seconds()
+        print(f"- {path}: {n_rows} rows in {elapsed:.1f} s")
+
+    print(f"\nSummary statistics (and .npz sketches) in '{processed_dir}/'")
+
+
+if __name__ == '__main__':
+    main()
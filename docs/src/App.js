@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { ThemeProvider } from './contexts/ThemeContext';
 import { ThemeToggle } from './components/ThemeToggle';
 import VisualizationPanel from './components/VisualizationPanel';
@@ -11,10 +11,14 @@ import { styled } from '@mui/material/styles';
 import CloudUploadIcon from '@mui/icons-material/CloudUpload';
 import { BrowserRouter as Router, Route, Switch, Link } from 'react-router-dom';
 import PsychometricCalculator from './components/PsychometricCalculator';
+import { decodeFrame, appendFrame } from './utils/liveFrames';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 const SOCKET_RECONNECTION_ATTEMPTS = 5;
 const SOCKET_RECONNECTION_DELAY = 3000;
+const LIVE_ENCODING = 'delta16';
+const LIVE_FPS = 30;
+const LIVE_WINDOW_SECONDS = 10;
 
 const VisuallyHiddenInput = styled('input')({
   clip: 'rect(0 0 0 0)',
@@ -31,12 +35,14 @@ const VisuallyHiddenInput = styled('input')({
 function AppContent() {
   const [socket, setSocket] = useState(null);
   const [eegData, setEegData] = useState(null);
+  const [liveData, setLiveData] = useState(null);
   const [error, setError] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const [isProcessing, setIsProcessing] = useState(false);
   const [reconnectionAttempts, setReconnectionAttempts] = useState(0);
   const { enqueueSnackbar } = useSnackbar();
   const [activeTab, setActiveTab] = useState(0);
+  const liveChannels = useRef([]);
 
   const initializeSocket = useCallback(() => {
     try {
@@ -49,6 +55,23 @@ function AppContent() {
       newSocket.on('connect', () => {
         enqueueSnackbar('Connected to server', { variant: 'success' });
         setReconnectionAttempts(0);
+        newSocket.emit('subscribe_live', { encoding: LIVE_ENCODING, fps: LIVE_FPS });
+      });
+
+      newSocket.on('eeg_stream_info', (info) => {
+        liveChannels.current = info.ch_names;
+        setLiveData(null);
+      });
+
+      // Binary frames arrive coalesced at LIVE_FPS; no JSON parsing involved
+      newSocket.on('eeg_frame', ({ header, data }) => {
+        try {
+          const channels = decodeFrame(header, data);
+          setLiveData((current) => appendFrame(current, header, channels, liveChannels.current, LIVE_WINDOW_SECONDS));
+          setIsProcessing(false);
+        } catch (err) {
+          console.error('Error decoding live frame:', err);
+        }
       });
 
       newSocket.on('connect_error', (error) => {
@@ -62,15 +85,10 @@ function AppContent() {
         }
       });
 
+      // JSON fallback for connections that are not subscribed to the live stream
       newSocket.on('eeg_data', (data) => {
-        try {
-          const parsedData = typeof data === 'string' ? JSON.parse(data) : data;
-          setEegData(parsedData);
-          setIsProcessing(false);
-        } catch (err) {
-          console.error('Error parsing EEG data:', err);
-          enqueueSnackbar('Error processing EEG data', { variant: 'error' });
-        }
+        setEegData(data);
+        setIsProcessing(false);
       });
 
       newSocket.on('error', (error) => {
@@ -246,6 +264,20 @@ function AppContent() {
                     )}
                   </Box>
                 )}
+
+                {liveData && (
+                  <Box className="mt-6">
+                    <Typography variant="h6" component="h2" className="mb-2">
+                      Live (cleaned)
+                    </Typography>
+                    <ErrorBoundary>
+                      <VisualizationPanel
+                        data={liveData}
+                        isProcessing={false}
+                      />
+                    </ErrorBoundary>
+                  </Box>
+                )}
               </Route>
               <Route path="/psychometric">
                 <PsychometricCalculator />
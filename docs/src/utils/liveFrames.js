@@ -0,0 +1,57 @@
+/**
+ * Decodes a binary live frame sent by the server's FrameEmitter
+ * @param {Object} header - Frame header (encoding, n_channels, n_samples, offset, scale, ...)
+ * @param {ArrayBuffer|Uint8Array} data - Little-endian channel-major payload
+ * @returns {Float64Array[]} One array of samples per channel
+ * @throws {Error} If the encoding is unknown
+ */
+export function decodeFrame(header, data) {
+  const { encoding, n_channels: nChannels, n_samples: nSamples } = header;
+  const bytes = data instanceof Uint8Array ? data : new Uint8Array(data);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const channels = [];
+
+  for (let ch = 0; ch < nChannels; ch++) {
+    const values = new Float64Array(nSamples);
+    const base = ch * nSamples;
+    if (encoding === 'float32') {
+      for (let i = 0; i < nSamples; i++) {
+        values[i] = view.getFloat32((base + i) * 4, true);
+      }
+    } else if (encoding === 'int16' || encoding === 'delta16') {
+      const scale = header.scale[ch];
+      const offset = header.offset[ch];
+      let level = 0;
+      for (let i = 0; i < nSamples; i++) {
+        const q = view.getInt16((base + i) * 2, true);
+        // delta16 carries differences of the quantized samples
+        level = encoding === 'delta16' ? level + q : q;
+        values[i] = level * scale + offset;
+      }
+    } else {
+      throw new Error(`Unknown frame encoding: ${encoding}`);
+    }
+    channels.push(values);
+  }
+  return channels;
+}
+
+/**
+ * Appends a decoded frame to a rolling plot window in the {time, channels} format
+ * @param {Object|null} window - Current window ({time, channels}) or null
+ * @param {Object} header - Frame header (start_sample, sfreq, ...)
+ * @param {Float64Array[]} channels - Decoded samples per channel
+ * @param {string[]} chNames - Channel names from the stream info
+ * @param {number} windowSeconds - Length of the window to keep
+ * @returns {Object} New window
+ */
+export function appendFrame(window, header, channels, chNames, windowSeconds) {
+  const maxSamples = Math.round(windowSeconds * header.sfreq);
+  const times = Array.from({ length: header.n_samples }, (_, i) => (header.start_sample + i) / header.sfreq);
+  const keep = (values) => values.slice(Math.max(0, values.length - maxSamples));
+  const merged = { time: keep([...(window?.time || []), ...times]), channels: {} };
+  chNames.forEach((name, ch) => {
+    merged.channels[name] = keep([...(window?.channels?.[name] || []), ...channels[ch]]);
+  });
+  return merged;
+}
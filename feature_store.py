@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cohort Feature Store
+
+Appends the features of every processed recording to one partitioned
+Parquet dataset instead of isolated ``features.json.gz`` files, so cohort
+questions such as "alpha power at O1 for all participants over 40" read only
+the bytes they need:
+1. Features are stored in long form (participant, session, recording,
+   channel, band, value), hive-partitioned by feature group and feature, so
+   a query on one feature opens only that partition
+2. Within each file rows are sorted by participant, session, channel and
+   band, so Parquet row-group statistics act as an index for predicate
+   pushdown on those columns
+3. Participant attributes (Age, Gender, Education, ...) live in a small
+   separate table; attribute predicates are resolved there first and pushed
+   down to the feature scan as a participant filter
+4. Queries project only the requested columns
+
+Author: MVT Nexus Team
+"""
+
+import logging
+import operator
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ['group', 'feature']
+INDEX_COLUMNS = ['participant_id', 'session', 'channel', 'band']
+
+SCHEMA = pa.schema([
+    ('participant_id', pa.string()),
+    ('session', pa.string()),
+    ('recording_id', pa.string()),
+    ('channel', pa.string()),
+    ('band', pa.string()),
+    ('value', pa.float64()),
+    ('group', pa.string()),
+    ('feature', pa.string()),
+])
+
+_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+              '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+# Filter value: scalar (equality), list (membership) or {operator: value}
+Predicate = Union[Any, List[Any], Dict[str, Any]]
+
+
+def feature_rows(features: Dict, ch_names: Sequence[str]) -> Iterator[Tuple[str, str, str, str, float]]:
+    """
+    Flatten ``extract_features`` output into (group, feature, band, channel, value) rows.
+
+    Band powers become feature 'power' with the band in its own column;
+    other nested keys are joined with '.' into the feature name. Per-channel
+    vectors give one row per channel, channel x channel matrices one row per
+    pair ('Fz-Cz') and scalars one row with an empty channel.
+    """
+    n_channels = len(ch_names)
+
+    def walk(group, name, value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield from walk(group, f'{name}.{key}' if name else str(key), item)
+            return
+        if isinstance(value, (int, float, np.number)):
+            yield group, name, '', '', float(value)
+            return
+        array = np.asarray(value, dtype=np.float64)
+        if array.ndim == 1 and array.size == n_channels:
+            for channel, item in zip(ch_names, array):
+                yield group, name, '', channel, float(item)
+        elif array.ndim == 2 and array.shape == (n_channels, n_channels):
+            for i, j in zip(*np.triu_indices(n_channels, k=1)):
+                yield group, name, '', f'{ch_names[i]}-{ch_names[j]}', float(array[i, j])
+        else:
+            logger.debug(f"Skipping feature {group}.{name} with shape {array.shape}")
+
+    for group, value in features.items():
+        if group == 'band_powers' and isinstance(value, dict):
+            for band, powers in value.items():
+                for row in walk(group, 'power', powers):
+                    yield row[0], row[1], band, row[3], row[4]
+        else:
+            yield from walk(group, '', value)
+
+
+def _expression(column: str, predicate: Predicate) -> ds.Expression:
+    """Arrow filter expression for one column"""
+    field = ds.field(column)
+    if isinstance(predicate, dict):
+        expressions = []
+        for op, value in predicate.items():
+            if op not in _OPERATORS:
+                raise ValueError(f"Unknown operator {op!r} for {column}")
+            expressions.append(_OPERATORS[op](field, value))
+        expression = expressions[0]
+        for other in expressions[1:]:
+            expression = expression & other
+        return expression
+    if isinstance(predicate, (list, tuple, set)):
+        return field.isin(list(predicate))
+    return field == predicate
+
+
+def _to_table(dataset: ds.Dataset, **scan) -> pa.Table:
+    """Scan a dataset, reporting unknown columns and mistyped predicates as ValueError"""
+    try:
+        return dataset.to_table(**scan)
+    except pa.ArrowException as e:
+        raise ValueError(str(e).splitlines()[0]) from e
+
+
+def _combine(filters: Dict[str, Predicate]) -> Optional[ds.Expression]:
+    expression = None
+    for column, predicate in filters.items():
+        if predicate is None:
+            continue
+        part = _expression(column, predicate)
+        expression = part if expression is None else expression & part
+    return expression
+
+
+class FeatureStore:
+    """Partitioned Parquet store of per-recording features for a cohort"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.features_path = self.root / 'features'
+        self.participants_path = self.root / 'participants.parquet'
+
+    def append(self, features: Dict, participant_id: str, ch_names: Sequence[str],
+               session: str = '1', recording_id: Optional[str] = None,
+               attributes: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Add one recording's features.
+
+        Re-appending the same recording replaces its previous files.
+
+        Args:
+            features: ``extract_features`` output
+            participant_id: Participant identifier
+            ch_names: Channel names of the per-channel feature vectors
+            session: Session label
+            recording_id: Unique recording identifier (e.g. the file hash);
+                defaults to '<participant>_<session>'
+            attributes: Participant attributes (Age, Gender, ...) to record
+
+        Returns:
+            int: Number of feature rows written
+        """
+        recording_id = recording_id or f'{participant_id}_{session}'
+        rows = list(feature_rows(features, list(ch_names)))
+        self._remove_recording(recording_id)
+        if not rows:
+            logger.warning(f"No features to store for recording {recording_id}")
+            return 0
+        frame = pd.DataFrame(rows, columns=['group', 'feature', 'band', 'channel', 'value'])
+        frame['participant_id'] = str(participant_id)
+        frame['session'] = str(session)
+        frame['recording_id'] = recording_id
+        frame = frame.sort_values(PARTITION_COLUMNS + INDEX_COLUMNS, kind='stable')
+        table = pa.Table.from_pandas(frame[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+        ds.write_dataset(
+            table, self.features_path, format='parquet',
+            partitioning=ds.partitioning(pa.schema([SCHEMA.field(c) for c in PARTITION_COLUMNS]),
+                                         flavor='hive'),
+            basename_template=f'{recording_id}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        if attributes:
+            self.register_participants(pd.DataFrame([{'participant_id': str(participant_id), **attributes}]))
+        logger.info(f"Stored {len(frame)} feature rows for recording {recording_id}")
+        return len(frame)
+
+    def _remove_recording(self, recording_id: str):
+        """Delete a recording's files from every partition, including ones a new append does not write"""
+        if not self.features_path.exists():
+            return
+        name = re.compile(re.escape(recording_id) + r'-\d+\.parquet')
+        for path in self.features_path.rglob('*.parquet'):
+            if name.fullmatch(path.name):
+                path.unlink()
+
+    def register_participants(self, participants: pd.DataFrame):
+        """
+        Insert or update participant attributes.
+
+        Args:
+            participants: One row per participant with a 'participant_id'
+                column (or index) and attribute columns
+        """
+        participants = participants.reset_index() if 'participant_id' not in participants else participants
+        participants = participants.assign(participant_id=participants['participant_id'].astype(str))
+        if self.participants_path.exists():
+            existing = pd.read_parquet(self.participants_path)
+            participants = pd.concat([existing, participants], ignore_index=True)
+        participants = participants.drop_duplicates('participant_id', keep='last')
+        self.root.mkdir(parents=True, exist_ok=True)
+        participants.sort_values('participant_id').to_parquet(self.participants_path, index=False)
+
+    def participants(self, **filters: Predicate) -> pd.DataFrame:
+        """Participant attributes matching attribute predicates"""
+        if not self.participants_path.exists():
+            return pd.DataFrame(columns=['participant_id'])
+        return _to_table(ds.dataset(self.participants_path), filter=_combine(filters)).to_pandas()
+
+    def _dataset(self) -> ds.Dataset:
+        return ds.dataset(self.features_path, format='parquet', partitioning='hive', schema=SCHEMA)
+
+    def query(self, group: Optional[Predicate] = None, feature: Optional[Predicate] = None,
+              band: Optional[Predicate] = None, channel: Optional[Predicate] = None,
+              participant_id: Optional[Predicate] = None, session: Optional[Predicate] = None,
+              where: Optional[Dict[str, Predicate]] = None,
+              columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Cohort query with predicate pushdown and column projection.
+
+        Each argument takes a scalar (equality), a list (membership) or a
+        mapping of operators to values, e.g. ``{'>': 40}``.
+
+        Args:
+            group: Feature group (e.g. 'band_powers', 'statistical')
+            feature: Feature name (e.g. 'power', 'kurtosis')
+            band: Frequency band (band powers only)
+            channel: Channel name
+            participant_id: Participant identifier(s)
+            session: Session label(s)
+            where: Predicates on participant attributes, e.g. {'Age': {'>': 40}}
+            columns: Columns to return (defaults to all feature columns)
+
+        Returns:
+            pd.DataFrame: Matching feature rows
+        """
+        if not self.features_path.exists():
+            return pd.DataFrame(columns=list(columns or SCHEMA.names))
+        expression = _combine({'group': group, 'feature': feature, 'band': band, 'channel': channel,
+                               'participant_id': participant_id, 'session': session})
+        if where:
+            ids = self.participants(**where)['participant_id'].tolist()
+            cohort = ds.field('participant_id').isin(pa.array(ids, type=pa.string()))
+            expression = cohort if expression is None else expression & cohort
+        table = _to_table(self._dataset(), columns=list(columns) if columns else None,
+                          filter=expression)
+        return table.to_pandas()
+
+    def pivot(self, **query) -> pd.DataFrame:
+        """
+        Participants x features table for a query (e.g. for correlation analysis).
+
+        Columns are named '<group>.<feature>[.<band>][.<channel>]'; multiple
+        sessions of a participant are averaged.
+        """
+        frame = self.query(columns=['participant_id', 'group', 'feature', 'band', 'channel', 'value'],
+                           **query)
+        parts = [frame['group'], frame['feature'], frame['band'], frame['channel']]
+        frame['name'] = ['.'.join(p for p in names if p) for names in zip(*parts)]
+        return frame.pivot_table(index='participant_id', columns='name', values='value', aggfunc='mean')
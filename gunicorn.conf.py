@@ -0,0 +1,29 @@
+# Gunicorn configuration for the EEG services
+#
+#   gunicorn -c gunicorn.conf.py "EEG:create_app()"
+#   gunicorn -c gunicorn.conf.py "docs.EEG:create_app()"
+#
+# The app is imported once in the master with the heavy scientific stack
+# preloaded, so forked workers share those pages and boot without importing
+# mne/scipy themselves. Per-process state (Redis pools, processors) is reset
+# in each worker after the fork.
+
+import sys
+
+from lazy_imports import HEAVY_MODULES, preload
+
+preload_app = True
+worker_class = 'eventlet'
+workers = 2
+bind = '0.0.0.0:5000'
+
+
+def on_starting(server):
+    preload(*HEAVY_MODULES)
+
+
+def post_fork(server, worker):
+    for name in ('EEG', 'docs.EEG'):
+        module = sys.modules.get(name)
+        if module is not None and hasattr(module, 'init_worker'):
+            module.init_worker()
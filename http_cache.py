@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTTP Conditional Caching and Response Compression
+
+Analysis responses are fully determined by the input file's content and the
+request parameters (time window, pipeline spec, ...), so:
+1. ETags are derived from the file content hash and a hash of the parameters,
+   and Last-Modified from the file's modification time; matching conditional
+   GETs are answered with 304 without touching the data
+2. Serialized (and compressed) bodies are kept in a disk or Redis cache keyed
+   by ETag and encoding, so repeated requests skip recomputation
+3. Large bodies are compressed with the best encoding the client accepts
+   (zstd, brotli or gzip, depending on what is installed)
+
+Author: MVT Nexus Team
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Bytes read per step when hashing files
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# Default size limit of a disk response cache, and how many writes pass
+# between two prunes of its directory
+DEFAULT_CACHE_BYTES = 1024 ** 3
+PRUNE_EVERY = 64
+
+_COMPRESSORS = {
+    'gzip': lambda body: gzip.compress(body, compresslevel=6, mtime=0),
+}
+if brotli is not None:
+    _COMPRESSORS['br'] = lambda body: brotli.compress(body, quality=5)
+if zstandard is not None:
+    _COMPRESSORS['zstd'] = lambda body: zstandard.ZstdCompressor(level=3).compress(body)
+
+# Server preference when the client accepts several encodings equally
+ENCODINGS = [name for name in ('zstd', 'br', 'gzip') if name in _COMPRESSORS]
+
+
+@lru_cache(maxsize=256)
+def _digest_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def file_digest(file_path: Union[str, Path]) -> str:
+    """
+    SHA-256 of a file's content.
+
+    Digests are cached by path, modification time and size, so unchanged
+    files are hashed once per process.
+    """
+    stat = os.stat(file_path)
+    return _digest_cached(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def file_mtime(file_path: Union[str, Path]) -> datetime:
+    """Modification time of a file as an aware UTC datetime"""
+    return datetime.fromtimestamp(os.stat(file_path).st_mtime, tz=timezone.utc)
+
+
+def make_etag(content_hash: str, params: Any = None) -> str:
+    """
+    Strong entity tag for a response.
+
+    Args:
+        content_hash: Hash of the input data (e.g. ``file_digest``)
+        params: JSON-serializable request parameters or spec hash
+
+    Returns:
+        str: Unquoted entity tag
+    """
+    key = json.dumps([content_hash, params], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with one of ``ENCODINGS``"""
+    return _COMPRESSORS[encoding](body)
+
+
+class DiskCache:
+    """Serialized responses stored as files in a directory, pruned to a byte limit"""
+
+    def __init__(self, directory: Union[str, Path], max_bytes: Optional[int] = DEFAULT_CACHE_BYTES,
+                 prune_every: int = PRUNE_EVERY):
+        """
+        Args:
+            directory: Directory holding one file per entry
+            max_bytes: Size limit enforced on writes (None for unbounded)
+            prune_every: Writes between two prunes (the first write prunes too)
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._writes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key.replace(':', '.')
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            body = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Hits count as recent use, so pruning evicts the least recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return body
+
+    def set(self, key: str, body: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and rename so readers never see partial bodies
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self._path(key))
+        if self.max_bytes is not None and self._writes % self.prune_every == 0:
+            removed = self.prune(self.max_bytes)
+            if removed:
+                logger.info(f"Pruned {removed} entries from response cache {self.directory}")
+        self._writes += 1
+
+    def prune(self, max_bytes: int) -> int:
+        """Delete the least recently used entries beyond ``max_bytes``; returns entries removed"""
+        entries = []
+        for path in self.directory.glob('*'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Replaced or pruned by another process meanwhile
+                continue
+            if not path.name.startswith('.tmp'):
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        total, removed = 0, 0
+        for _, size, path in entries:
+            total += size
+            if total > max_bytes:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class RedisCache:
+    """Serialized responses stored in Redis with a TTL"""
+
+    def __init__(self, client, prefix: str = 'response:', ttl: int = 24 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, body: bytes):
+        try:
+            self.client.set(self.prefix + key, body, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+
+@dataclass
+class Variant:
+    """
+    Payload built for a request but not the representation its ETag names.
+
+    E.g. a result computed with a degraded spec under memory pressure: it
+    is sent under its own entity tag and kept out of the response cache, so
+    later requests still get (and revalidate against) the full result.
+    """
+    payload: Any
+    etag: str
+
+
+def conditional_response(etag: str, build: Callable[[], Any],
+                         last_modified: Optional[datetime] = None,
+                         cache: Optional[Union[DiskCache, RedisCache]] = None,
+                         mimetype: str = 'application/json') -> Response:
+    """
+    Respond with 304, a cached body or a freshly built one.
+
+    GET and HEAD requests whose If-None-Match (or, without it,
+    If-Modified-Since) matches get an empty 304. Otherwise the JSON body is
+    taken from ``cache`` or built with ``build``, compressed with the
+    negotiated encoding and stored back.
+
+    Args:
+        etag: Entity tag from ``make_etag``
+        build: Returns the JSON-serializable payload on a cache miss, or a
+            ``Variant`` that is sent under its own ETag and not cached
+        last_modified: Modification time of the underlying data
+        cache: Optional response cache
+        mimetype: Content type of the body
+
+    Returns:
+        flask.Response: Response with ETag, Last-Modified and Vary headers
+    """
+    if request.method in ('GET', 'HEAD'):
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = (last_modified is not None and request.if_modified_since is not None
+                            and last_modified.replace(microsecond=0) <= request.if_modified_since)
+        if not_modified:
+            response = Response(status=304)
+            _set_validators(response, etag, last_modified)
+            return response
+
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    body = cache.get(f'{etag}:{encoding}') if cache is not None and encoding else None
+    if body is None:
+        identity = cache.get(f'{etag}:identity') if cache is not None else None
+        if identity is None:
+            payload = build()
+            if isinstance(payload, Variant):
+                etag, payload, cache = payload.etag, payload.payload, None
+            identity = current_app.json.dumps(payload).encode()
+            if cache is not None:
+                cache.set(f'{etag}:identity', identity)
+        if encoding and len(identity) >= MIN_COMPRESS_BYTES:
+            body = compress(identity, encoding)
+            if cache is not None:
+                cache.set(f'{etag}:{encoding}', body)
+        else:
+            body, encoding = identity, None
+
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    _set_validators(response, etag, last_modified)
+    return response
+
+
+def _set_validators(response: Response, etag: str, last_modified: Optional[datetime]):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Clients may store the body but must revalidate before reuse
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept-Encoding')
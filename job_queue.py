@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Distributed Job Queue on Redis Streams
+
+Moves analysis out of the web process onto any number of stateless worker
+processes and nodes that share one Redis:
+1. The API appends jobs to a stream (XADD) and records their status in a
+   per-job hash
+2. Workers read new jobs through a consumer group (XREADGROUP), so each job
+   is delivered to exactly one worker at a time
+3. While a job runs, its worker heartbeats by re-claiming the entry for
+   itself (XCLAIM JUSTID), which resets the entry's idle time; a worker
+   whose entry was taken over meanwhile stops and drops its result
+4. Entries idle longer than ``claim_idle_ms`` belong to dead workers and are
+   taken over by the next worker that polls (XAUTOCLAIM); jobs delivered
+   more than ``max_attempts`` times are marked failed
+5. Results are written to a shared store (Redis keys with a TTL) and the
+   entry is acknowledged
+
+Any redis-py compatible client works, including ``fakeredis`` for tests.
+
+Author: MVT Nexus Team
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM = 'eeg:jobs'
+DEFAULT_GROUP = 'eeg-workers'
+
+# Jobs whose worker has not heartbeated for this long are re-queued
+DEFAULT_CLAIM_IDLE_MS = 60_000
+DEFAULT_HEARTBEAT_INTERVAL = 10.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RESULT_TTL = 7 * 24 * 3600
+
+
+class JobStatus(Enum):
+    """Lifecycle of a queued job"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+@dataclass
+class Job:
+    """A job claimed by a worker"""
+    id: str
+    task: str
+    payload: Dict[str, Any]
+    entry_id: str
+    attempt: int
+
+
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class JobQueue:
+    """Job stream, consumer group, status hashes and result store"""
+
+    def __init__(self, client, stream: str = DEFAULT_STREAM, group: str = DEFAULT_GROUP,
+                 claim_idle_ms: int = DEFAULT_CLAIM_IDLE_MS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 result_ttl: int = DEFAULT_RESULT_TTL):
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.claim_idle_ms = claim_idle_ms
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        self._group_ready = False
+
+    def _status_key(self, job_id: str) -> str:
+        return f'{self.stream}:status:{job_id}'
+
+    def _result_key(self, job_id: str) -> str:
+        return f'{self.stream}:result:{job_id}'
+
+    def ensure_group(self):
+        """Create the stream and consumer group if they do not exist"""
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def submit(self, task: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """
+        Enqueue a job.
+
+        Args:
+            task: Name of the worker handler
+            payload: JSON-serializable handler arguments
+            job_id: Job identifier; a random one is generated if None
+
+        Returns:
+            str: Job identifier
+        """
+        self.ensure_group()
+        job_id = job_id or uuid.uuid4().hex
+        pipe = self.client.pipeline()
+        pipe.hset(self._status_key(job_id), mapping={
+            'status': JobStatus.QUEUED.value, 'task': task, 'attempts': 0, 'submitted': time.time()
+        })
+        pipe.expire(self._status_key(job_id), self.result_ttl)
+        pipe.xadd(self.stream, {'job_id': job_id, 'task': task, 'payload': json.dumps(payload)})
+        pipe.execute()
+        logger.info(f"Queued {task} job {job_id}")
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, str]]:
+        """Status hash of a job (status, task, attempts, worker, heartbeat, error, ...)"""
+        fields = self.client.hgetall(self._status_key(job_id))
+        if not fields:
+            return None
+        return {_text(k): _text(v) for k, v in fields.items()}
+
+    def result(self, job_id: str) -> Optional[Any]:
+        """Result of a finished job, or None"""
+        value = self.client.get(self._result_key(job_id))
+        return json.loads(value) if value is not None else None
+
+    def wait(self, job_id: str, timeout: float = 60.0, poll_interval: float = 0.1) -> Any:
+        """
+        Block until a job finishes.
+
+        Raises:
+            RuntimeError: If the job failed
+            TimeoutError: If it did not finish within ``timeout`` seconds
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = self.status(job_id) or {}
+            if status.get('status') == JobStatus.DONE.value:
+                return self.result(job_id)
+            if status.get('status') == JobStatus.FAILED.value:
+                raise RuntimeError(f"Job {job_id} failed: {status.get('error')}")
+            time.sleep(poll_interval)
+        raise TimeoutError(f"Job {job_id} did not finish within {timeout} s")
+
+    def claim(self, consumer: str, block_ms: int = 5000) -> Optional[Job]:
+        """
+        Take the next job: first one abandoned by a dead worker, else a new one.
+
+        Args:
+            consumer: Unique worker name
+            block_ms: How long to wait for a new job
+
+        Returns:
+            Optional[Job]: Claimed job, or None if there was nothing to do
+        """
+        self.ensure_group()
+        _, entries, *_ = self.client.xautoclaim(self.stream, self.group, consumer,
+                                                min_idle_time=self.claim_idle_ms, start_id='0-0', count=1)
+        if entries:
+            logger.warning(f"{consumer} reclaimed abandoned entry {_text(entries[0][0])}")
+        else:
+            response = self.client.xreadgroup(self.group, consumer, {self.stream: '>'},
+                                              count=1, block=block_ms)
+            entries = response[0][1] if response else []
+        for entry_id, fields in entries:
+            if not fields:
+                # Entry was deleted while pending
+                self.client.xack(self.stream, self.group, entry_id)
+                continue
+            fields = {_text(k): _text(v) for k, v in fields.items()}
+            job_id = fields['job_id']
+            attempt = self.client.hincrby(self._status_key(job_id), 'attempts', 1)
+            job = Job(job_id, fields['task'], json.loads(fields['payload']), _text(entry_id), attempt)
+            if attempt > self.max_attempts:
+                self._finish(job, JobStatus.FAILED, error=f"Gave up after {self.max_attempts} attempts")
+                continue
+            self.client.hset(self._status_key(job_id), mapping={
+                'status': JobStatus.RUNNING.value, 'worker': consumer, 'heartbeat': time.time()
+            })
+            return job
+        return None
+
+    def _pending_idle(self, job: Job, consumer: str) -> Optional[int]:
+        """Idle time in ms of the job's entry if it is still pending for ``consumer``, else None"""
+        pending = self.client.xpending_range(self.stream, self.group, min=job.entry_id, max=job.entry_id,
+                                             count=1, consumername=consumer)
+        return int(pending[0]['time_since_delivered']) if pending else None
+
+    def owns(self, job: Job, consumer: str) -> bool:
+        """Whether ``consumer`` still holds the job (it was not reclaimed by another worker)"""
+        return self._pending_idle(job, consumer) is not None
+
+    def heartbeat(self, job: Job, consumer: str) -> bool:
+        """
+        Reset the job's idle time so it is not reclaimed while it runs.
+
+        Returns:
+            bool: False if another worker has taken the job over
+        """
+        idle = self._pending_idle(job, consumer)
+        if idle is None:
+            return False
+        # Only claim an entry idle at least as long as just seen: if another
+        # worker claimed it in between, its idle time restarted and this is a no-op
+        claimed = self.client.xclaim(self.stream, self.group, consumer, min_idle_time=idle,
+                                     message_ids=[job.entry_id], justid=True)
+        if not claimed:
+            return False
+        self.client.hset(self._status_key(job.id), 'heartbeat', time.time())
+        return True
+
+    def complete(self, job: Job, result: Any, consumer: Optional[str] = None) -> bool:
+        """
+        Store a job's result and acknowledge it.
+
+        Args:
+            job: Finished job
+            result: JSON-serializable result
+            consumer: Worker that ran the job; if given, the result is
+                dropped when the job was reclaimed by another worker
+
+        Returns:
+            bool: Whether the result was stored
+        """
+        if consumer is not None and not self.owns(job, consumer):
+            logger.warning(f"{consumer} lost job {job.id} to another worker, dropping its result")
+            return False
+        self.client.set(self._result_key(job.id), json.dumps(result), ex=self.result_ttl)
+        self._finish(job, JobStatus.DONE)
+        return True
+
+    def fail(self, job: Job, error: str, consumer: Optional[str] = None) -> bool:
+        """
+        Re-queue a failed job, or mark it failed after ``max_attempts``.
+
+        Returns:
+            bool: False if ``consumer`` no longer holds the job (nothing is changed)
+        """
+        if consumer is not None and not self.owns(job, consumer):
+            logger.warning(f"{consumer} lost job {job.id} to another worker, dropping its failure")
+            return False
+        if job.attempt < self.max_attempts:
+            logger.warning(f"Job {job.id} attempt {job.attempt} failed, re-queuing: {error}")
+            pipe = self.client.pipeline()
+            pipe.hset(self._status_key(job.id), mapping={'status': JobStatus.QUEUED.value, 'error': error})
+            pipe.xadd(self.stream, {'job_id': job.id, 'task': job.task, 'payload': json.dumps(job.payload)})
+            pipe.xack(self.stream, self.group, job.entry_id)
+            pipe.xdel(self.stream, job.entry_id)
+            pipe.execute()
+        else:
+            self._finish(job, JobStatus.FAILED, error=error)
+        return True
+
+    def _finish(self, job: Job, status: JobStatus, error: Optional[str] = None):
+        mapping = {'status': status.value, 'finished': time.time()}
+        if error:
+            mapping['error'] = error
+            logger.error(f"Job {job.id} failed: {error}")
+        pipe = self.client.pipeline()
+        pipe.hset(self._status_key(job.id), mapping=mapping)
+        pipe.expire(self._status_key(job.id), self.result_ttl)
+        pipe.xack(self.stream, self.group, job.entry_id)
+        pipe.xdel(self.stream, job.entry_id)
+        pipe.execute()
+
+
+class Worker:
+    """Stateless job consumer; run one per process on any number of nodes"""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 consumer: Optional[str] = None,
+                 heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL):
+        self.queue = queue
+        self.handlers = handlers
+        self.consumer = consumer or f'{socket.gethostname()}-{os.getpid()}'
+        self.heartbeat_interval = heartbeat_interval
+
+    def _heartbeat(self, job: Job, done: threading.Event):
+        while not done.wait(self.heartbeat_interval):
+            try:
+                if not self.queue.heartbeat(job, self.consumer):
+                    logger.warning(f"{self.consumer} lost job {job.id} to another worker")
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job.id} failed: {str(e)}")
+
+    def run_once(self, block_ms: int = 5000) -> bool:
+        """
+        Claim and run at most one job.
+
+        Returns:
+            bool: Whether a job was run
+        """
+        job = self.queue.claim(self.consumer, block_ms)
+        if job is None:
+            return False
+        handler = self.handlers.get(job.task)
+        if handler is None:
+            self.queue.fail(job, f"No handler for task {job.task!r}")
+            return True
+
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, done), daemon=True)
+        beat.start()
+        try:
+            result = handler(job.payload)
+        except Exception as e:
+            self.queue.fail(job, str(e), consumer=self.consumer)
+        else:
+            if self.queue.complete(job, result, consumer=self.consumer):
+                logger.info(f"{self.consumer} finished job {job.id}")
+        finally:
+            done.set()
+            beat.join()
+        return True
+
+    def run(self, stop: Optional[threading.Event] = None, block_ms: int = 5000):
+        """Process jobs until ``stop`` is set"""
+        stop = stop or threading.Event()
+        logger.info(f"Worker {self.consumer} consuming {self.queue.stream}/{self.queue.group}")
+        while not stop.is_set():
+            try:
+                self.run_once(block_ms)
+            except Exception as e:
+                logger.error(f"Worker {self.consumer} error: {str(e)}")
+                stop.wait(1.0)
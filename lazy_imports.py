@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lazy Imports for Heavy Scientific Libraries
+
+The web services only need mne, scipy and numpy once a request actually
+processes data. ``lazy_import`` returns a placeholder module that performs the
+real import on first attribute access, so importing a service module (worker
+boot, test collection, CLI tools) stays fast. ``preload`` imports modules
+eagerly, e.g. in a gunicorn master before workers fork so they share the
+loaded pages.
+
+Author: MVT Nexus Team
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+_import_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """Module placeholder that imports the real module on first use"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_lazy_module'] or importlib.import_module(self.__name__)
+                self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Return a module that is imported on first attribute access.
+
+    Args:
+        name: Absolute module name (e.g. 'mne' or 'scipy.signal')
+
+    Returns:
+        types.ModuleType: The real module if it is already imported,
+        otherwise a LazyModule placeholder
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def preload(*names: str):
+    """Import modules eagerly (e.g. before forking worker processes)"""
+    for name in names:
+        importlib.import_module(name)
+
+
+HEAVY_MODULES = ('numpy', 'scipy', 'scipy.signal', 'scipy.stats', 'mne')
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Binary Live Frames for Socket.IO
+
+Pushes live multichannel EEG to many viewers without JSON:
+1. Sample blocks are sent as binary Socket.IO attachments (float32, or int16
+   quantized per channel, or int16 deltas of 15-bit quantized samples that
+   compress well under permessage-deflate) with a small JSON header
+2. Producers ``push`` blocks into a shared ring buffer; a background task
+   coalesces everything new since each client's last frame into one frame at
+   that client's target frame rate
+3. Clients due at the same tick with the same position and encoding share
+   one encoded frame, so encoding cost grows with the number of distinct
+   settings rather than the number of viewers
+4. Clients that fall behind by more than the ring buffer skip ahead and are
+   told how many samples were dropped
+
+Author: MVT Nexus Team
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = ('float32', 'int16', 'delta16')
+
+# Quantization range; delta16 keeps 15 bits so sample differences fit in int16
+_QUANT_MAX = {'int16': 32767, 'delta16': 16383}
+
+DEFAULT_FPS = 30.0
+MAX_FPS = 60.0
+DEFAULT_BUFFER_SECONDS = 10.0
+
+
+def encode_block(data: np.ndarray, encoding: str = 'float32') -> Tuple[Dict, bytes]:
+    """
+    Encode a (channels x samples) block.
+
+    Args:
+        data: Sample block
+        encoding: 'float32', 'int16' (per-channel linear quantization) or
+            'delta16' (quantized, then differenced along time)
+
+    Returns:
+        Tuple[Dict, bytes]: Header with shape, dtype and per-channel
+        ``offset``/``scale`` (quantized encodings), and the little-endian
+        channel-major payload
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n_channels, n_samples = data.shape
+    header = {'encoding': encoding, 'n_channels': n_channels, 'n_samples': n_samples}
+    if encoding == 'float32':
+        return header, data.astype('<f4').tobytes()
+    if encoding not in _QUANT_MAX:
+        raise ValueError(f"Unknown frame encoding: {encoding}")
+
+    quant_max = _QUANT_MAX[encoding]
+    if n_samples:
+        lo, hi = data.min(axis=1), data.max(axis=1)
+    else:
+        lo = hi = np.zeros(n_channels)
+    offset = (hi + lo) / 2.0
+    scale = (hi - lo) / (2.0 * quant_max)
+    scale[scale == 0] = 1.0
+    quantized = np.rint((data - offset[:, None]) / scale[:, None]).astype(np.int16)
+    if encoding == 'delta16':
+        quantized[:, 1:] = np.diff(quantized, axis=1)
+    header['offset'] = offset.tolist()
+    header['scale'] = scale.tolist()
+    return header, quantized.astype('<i2').tobytes()
+
+
+def decode_block(header: Dict, payload: bytes) -> np.ndarray:
+    """Inverse of ``encode_block`` (reference for the browser decoder)"""
+    shape = (header['n_channels'], header['n_samples'])
+    if header['encoding'] == 'float32':
+        return np.frombuffer(payload, dtype='<f4').reshape(shape).astype(np.float64)
+    quantized = np.frombuffer(payload, dtype='<i2').reshape(shape).astype(np.int64)
+    if header['encoding'] == 'delta16':
+        quantized = np.cumsum(quantized, axis=1)
+    scale = np.asarray(header['scale'])[:, None]
+    offset = np.asarray(header['offset'])[:, None]
+    return quantized * scale + offset
+
+
+@dataclass
+class LiveClient:
+    """Frame settings and position of one viewer"""
+    sid: str
+    encoding: str
+    fps: float
+    cursor: int
+    next_due: float = 0.0
+    seq: int = 0
+
+
+class FrameEmitter:
+    """Coalescing binary frame emitter for a Flask-SocketIO server"""
+
+    def __init__(self, socketio, event: str = 'eeg_frame', info_event: str = 'eeg_stream_info',
+                 namespace: Optional[str] = None, tick_fps: float = MAX_FPS):
+        self.socketio = socketio
+        self.event = event
+        self.info_event = info_event
+        self.namespace = namespace
+        self.tick_fps = tick_fps
+        self.clients: Dict[str, LiveClient] = {}
+        self.ch_names: List[str] = []
+        self.sfreq = None
+        self._buffer = None
+        self._head = 0
+        self._lock = threading.Lock()
+        self._running = False
+
+    @property
+    def info(self) -> Dict:
+        return {'ch_names': self.ch_names, 'sfreq': self.sfreq, 'encodings': list(ENCODINGS)}
+
+    def open(self, ch_names: Sequence[str], sfreq: float,
+             buffer_seconds: float = DEFAULT_BUFFER_SECONDS):
+        """
+        Start a new live stream and announce it to subscribed clients.
+
+        Args:
+            ch_names: Channel names
+            sfreq: Sampling frequency
+            buffer_seconds: How far a slow client may fall behind before samples are dropped
+        """
+        with self._lock:
+            self.ch_names = list(ch_names)
+            self.sfreq = float(sfreq)
+            self._buffer = np.zeros((len(self.ch_names), max(1, int(buffer_seconds * sfreq))),
+                                    dtype=np.float32)
+            self._head = 0
+            for client in self.clients.values():
+                client.cursor = 0
+        self.socketio.emit(self.info_event, self.info, namespace=self.namespace)
+
+    def add_client(self, sid: str, encoding: str = 'float32', fps: float = DEFAULT_FPS):
+        """Subscribe a client from the current position on"""
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown frame encoding: {encoding}")
+        fps = float(min(max(fps, 1.0), self.tick_fps))
+        with self._lock:
+            self.clients[sid] = LiveClient(sid, encoding, fps, cursor=self._head)
+        if self._buffer is not None:
+            self.socketio.emit(self.info_event, self.info, to=sid, namespace=self.namespace)
+
+    def remove_client(self, sid: str):
+        with self._lock:
+            self.clients.pop(sid, None)
+
+    def push(self, block: np.ndarray):
+        """Append a (channels x samples) block to the ring buffer"""
+        if self._buffer is None:
+            raise RuntimeError("Call open() before pushing samples")
+        block = np.asarray(block, dtype=np.float32)
+        n_samples = block.shape[1]
+        capacity = self._buffer.shape[1]
+        with self._lock:
+            # Only the newest ``capacity`` samples of an oversized block are kept
+            kept = min(n_samples, capacity)
+            positions = (self._head + n_samples - kept + np.arange(kept)) % capacity
+            self._buffer[:, positions] = block[:, n_samples - kept:]
+            self._head += n_samples
+
+    def _read(self, start: int, stop: int) -> np.ndarray:
+        return self._buffer[:, np.arange(start, stop) % self._buffer.shape[1]]
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """
+        Send one frame to every client that is due and has new samples.
+
+        Returns:
+            int: Number of frames emitted
+        """
+        now = time.monotonic() if now is None else now
+        groups: Dict[Tuple[int, str], List[LiveClient]] = {}
+        with self._lock:
+            if self._buffer is None:
+                return 0
+            head, capacity = self._head, self._buffer.shape[1]
+            for client in self.clients.values():
+                if client.next_due > now or client.cursor >= head:
+                    continue
+                groups.setdefault((client.cursor, client.encoding), []).append(client)
+            blocks = {key: self._read(max(key[0], head - capacity), head) for key in groups}
+
+        emitted = 0
+        for (cursor, encoding), clients in groups.items():
+            start = max(cursor, head - capacity)
+            header, payload = encode_block(blocks[(cursor, encoding)], encoding)
+            header.update(start_sample=start, sfreq=self.sfreq, dropped=start - cursor)
+            for client in clients:
+                self.socketio.emit(self.event, {'header': dict(header, seq=client.seq), 'data': payload},
+                                   to=client.sid, namespace=self.namespace)
+                client.seq += 1
+                client.cursor = head
+                client.next_due = now + 1.0 / client.fps
+                emitted += 1
+        return emitted
+
+    def _run(self):
+        while self._running:
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error emitting live frames: {str(e)}")
+            self.socketio.sleep(1.0 / self.tick_fps)
+
+    def start(self):
+        """Run ``flush`` in a Socket.IO background task"""
+        if not self._running:
+            self._running = True
+            self.socketio.start_background_task(self._run)
+
+    def stop(self):
+        self._running = False
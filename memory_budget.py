@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Memory-Aware Admission Control for Analysis Jobs
+
+Keeps concurrent analyses on a node within a memory budget instead of
+letting the kernel OOM-kill workers:
+1. The peak memory of every pipeline stage is estimated from the recording
+   header alone, as channels x samples x bytes per sample x the number of
+   full-size copies the stage holds (preloading, ``raw.copy()``, float64
+   upcasts, forward-backward filtering, ICA fitting, the report TFR)
+2. Jobs reserve their estimated peak in a ledger file shared by every
+   process on the node (gunicorn workers and queue workers alike) and wait
+   in FIFO order while it does not fit
+3. Jobs that can never fit, or that have waited longer than
+   ``degrade_after`` seconds, run a downgraded plan instead: ICA fitted on
+   decimated samples and a decimated report time-frequency map
+4. Reservations of processes that died are dropped, and queue depth and
+   reserved bytes are reported for metrics
+
+Author: MVT Nexus Team
+"""
+
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from pipeline_spec import PipelineSpec, StageSpec
+from text_ingest import TEXT_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Full-size float64 working copies each stage holds at its peak, on top of
+# the loaded recording and the filtered copy
+STAGE_COPIES: Dict[str, float] = {
+    'resample': 3.0,          # upcast, FFT buffers, resampled output
+    'bandpass': 3.0,          # upcast block, padded forward and backward passes
+    'notch': 3.0,
+    'line_noise': 3.0,
+    'bad_channels': 2.0,      # upcast and detection windows (interpolation is chunked)
+    'spatial': 1.0,           # EEG picks (operators are applied in chunks)
+    'asr': 2.0,               # calibration window statistics (cleaning is chunked)
+    'ica': 2.0,               # upcast and sources (plus the fit, see ICA_FIT_COPIES)
+    'muscle_artifacts': 2.0,  # upcast and EOG epochs
+}
+DEFAULT_STAGE_COPIES = 2.0
+
+# Copies of the fit data made by ICA (data, whitened data, PCA scores),
+# divided by the fit decimation
+ICA_FIT_COPIES = 3.0
+
+# Welch/epoch copies made during feature extraction
+FEATURE_COPIES = 2.0
+
+# Report time-frequency map: complex128 coefficients plus float64 power
+# per channel, frequency and (decimated) sample
+REPORT_TFR_FREQS = 50
+TFR_BYTES_PER_POINT = 24
+
+# Interpreter, MNE and plotting state per job
+JOB_OVERHEAD_BYTES = 128 * 1024 ** 2
+
+# (ICA fit decimation, report TFR decimation), from full resolution down
+DOWNGRADE_LEVELS = ((1, 1), (2, 4), (4, 16))
+
+# Fraction of the node's memory given to analysis jobs by default
+DEFAULT_BUDGET_FRACTION = 0.75
+DEFAULT_DEGRADE_AFTER = 30.0
+
+
+@dataclass
+class RecordingShape:
+    """Size of a recording as read from its header"""
+    n_channels: int
+    n_times: int
+    sfreq: Optional[float] = None
+
+
+@dataclass
+class MemoryPlan:
+    """Estimated peak bytes per stage at one resolution level"""
+    stage_bytes: Dict[str, int] = field(default_factory=dict)
+    ica_decim: int = 1
+    tfr_decim: int = 1
+
+    @property
+    def peak_bytes(self) -> int:
+        return max(self.stage_bytes.values(), default=0)
+
+    @property
+    def peak_stage(self) -> Optional[str]:
+        return max(self.stage_bytes, key=self.stage_bytes.get) if self.stage_bytes else None
+
+    @property
+    def downgraded(self) -> bool:
+        return self.ica_decim > 1 or self.tfr_decim > 1
+
+    def apply(self, spec: PipelineSpec) -> PipelineSpec:
+        """Spec with the plan's ICA fit decimation (a distinct spec hash when downgraded)"""
+        if self.ica_decim == 1 or spec.stage('ica') is None:
+            return spec
+        stages = [StageSpec(s.name, {**s.params, 'decim': self.ica_decim}) if s.name == 'ica' else s
+                  for s in spec.stages]
+        return PipelineSpec(stages=stages, bands=spec.bands, precision=spec.precision,
+                            spectral_params=spec.spectral_params)
+
+
+def _text_shape(file_path: Path, time_column: Optional[str], sample_bytes: int = 1024 ** 2) -> RecordingShape:
+    """Estimate the shape of a text export from its header and the first lines"""
+    with open(file_path, 'rb') as f:
+        head = f.read(sample_bytes)
+    lines = head.decode(errors='replace').splitlines()
+    if len(head) == sample_bytes and len(lines) > 2:
+        lines = lines[:-1]  # drop the partial last line
+    header = lines[0]
+    delimiter = next((d for d in ('\t', ';', ',') if d in header), ',')
+    columns = [c.strip() for c in header.split(delimiter)]
+    rows = lines[1:]
+    if not rows:
+        return RecordingShape(len(columns), 0)
+    # Rows are assumed to be about as long as the sampled ones
+    row_bytes = (len('\n'.join(rows).encode()) + 1) / len(rows)
+    n_times = int(np.ceil((file_path.stat().st_size - len(header.encode()) - 1) / row_bytes))
+    sfreq = None
+    if time_column in columns:
+        index = columns.index(time_column)
+        times = np.array([float(row.split(delimiter)[index]) for row in rows[:1000]])
+        if len(times) > 1 and np.median(np.diff(times)) > 0:
+            sfreq = float(1.0 / np.median(np.diff(times)))
+        columns.remove(time_column)
+    return RecordingShape(len(columns), n_times, sfreq)
+
+
+def read_shape(file_path: Union[str, Path], time_column: Optional[str] = 'Time') -> RecordingShape:
+    """
+    Read the number of channels and samples of a recording without loading samples.
+
+    Args:
+        file_path: Any format MNE reads, or a CSV/TSV/TXT export
+        time_column: Time column of text exports
+
+    Returns:
+        RecordingShape: Channels, samples and sampling frequency
+    """
+    file_path = Path(file_path)
+    if file_path.suffix.lower() in TEXT_EXTENSIONS:
+        return _text_shape(file_path, time_column)
+    import mne
+    raw = mne.io.read_raw(file_path, preload=False, verbose=False)
+    return RecordingShape(len(raw.ch_names), raw.n_times, float(raw.info['sfreq']))
+
+
+def estimate_plan(shape: RecordingShape, spec: PipelineSpec, report: bool = False,
+                  ica_decim: int = 1, tfr_decim: int = 1) -> MemoryPlan:
+    """
+    Estimate the peak memory of each stage of a job.
+
+    Args:
+        shape: Recording shape from ``read_shape``
+        spec: Pipeline spec the job runs
+        report: Whether the job also exports the HTML report (with its TFR)
+        ica_decim: Decimation of the samples ICA is fitted on
+        tfr_decim: Decimation of the report time-frequency map
+
+    Returns:
+        MemoryPlan: Peak bytes per stage
+    """
+    itemsize = np.dtype(spec.precision).itemsize
+    n_channels, n_times = shape.n_channels, shape.n_times
+    # MNE preloads float64; the cast to the working precision briefly holds both
+    resident = n_channels * n_times * itemsize
+    stage_bytes = {'load': n_channels * n_times * (8 + (itemsize if itemsize != 8 else 0))}
+    for stage in spec.stages:
+        if stage.name == 'resample' and shape.sfreq:
+            # The resample itself holds the longer of both lengths; later stages the new one
+            resampled = int(np.ceil(n_times * stage.params['sfreq'] / shape.sfreq))
+            working = n_channels * max(n_times, resampled) * 8
+            stage_bytes['resample'] = int(resident + working * STAGE_COPIES['resample'])
+            n_times = resampled
+            continue
+        working = n_channels * n_times * 8
+        copies = STAGE_COPIES.get(stage.name, DEFAULT_STAGE_COPIES)
+        extra = working * ICA_FIT_COPIES / ica_decim if stage.name == 'ica' else 0
+        stage_bytes[stage.name] = int(resident + n_channels * n_times * itemsize + working * copies + extra)
+    filtered = resident + n_channels * n_times * itemsize
+    stage_bytes['features'] = int(filtered + n_channels * n_times * 8 * FEATURE_COPIES)
+    if report:
+        tfr_times = int(np.ceil(n_times / tfr_decim))
+        stage_bytes['report'] = int(filtered + n_channels * REPORT_TFR_FREQS * tfr_times * TFR_BYTES_PER_POINT)
+    stage_bytes = {name: value + JOB_OVERHEAD_BYTES for name, value in stage_bytes.items()}
+    return MemoryPlan(stage_bytes, ica_decim=ica_decim, tfr_decim=tfr_decim)
+
+
+def plan_job(shape: RecordingShape, spec: PipelineSpec, report: bool = False,
+             levels: Sequence = DOWNGRADE_LEVELS) -> List[MemoryPlan]:
+    """Plans from full resolution to the most downgraded level"""
+    return [estimate_plan(shape, spec, report, ica_decim, tfr_decim) for ica_decim, tfr_decim in levels]
+
+
+def node_memory_bytes() -> int:
+    """Physical memory of the node, or the container's cgroup limit if lower"""
+    total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    for limit_file in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            limit = Path(limit_file).read_text().strip()
+        except OSError:
+            continue
+        if limit.isdigit():
+            total = min(total, int(limit))
+    return total
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MemoryBudget:
+    """Node-wide memory reservations shared by processes through a locked ledger file"""
+
+    def __init__(self, ledger_path: Union[str, Path], total_bytes: Optional[int] = None,
+                 degrade_after: float = DEFAULT_DEGRADE_AFTER, poll_interval: float = 0.2,
+                 on_change: Optional[Callable[[Dict], None]] = None):
+        """
+        Args:
+            ledger_path: JSON ledger shared by all processes on the node
+            total_bytes: Budget; defaults to 75% of the node's memory
+            degrade_after: Seconds a job waits for a full-resolution slot before
+                accepting a downgraded plan that fits
+            poll_interval: Seconds between admission checks while queued
+            on_change: Called with ``usage()`` after every admission and release
+        """
+        self.ledger_path = Path(ledger_path)
+        self.total_bytes = int(total_bytes or node_memory_bytes() * DEFAULT_BUDGET_FRACTION)
+        self.degrade_after = degrade_after
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _ledger(self) -> Iterator[Dict]:
+        """Locked read-modify-write of the ledger, dropping entries of dead processes"""
+        with open(self.ledger_path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                text = f.read()
+                state = json.loads(text) if text.strip() else {'reservations': {}, 'queue': []}
+                state['reservations'] = {k: v for k, v in state['reservations'].items() if _alive(v['pid'])}
+                state['queue'] = [entry for entry in state['queue'] if _alive(entry['pid'])]
+                yield state
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _usage(state: Dict, total_bytes: int) -> Dict:
+        reserved = sum(r['bytes'] for r in state['reservations'].values())
+        return {
+            'budget_bytes': total_bytes,
+            'reserved_bytes': reserved,
+            'available_bytes': total_bytes - reserved,
+            'running': sum(1 for r in state['reservations'].values() if r.get('job')),
+            'queue_depth': len(state['queue']),
+        }
+
+    def usage(self) -> Dict:
+        """Budget, reserved and available bytes, running jobs and queue depth"""
+        with self._ledger() as state:
+            return self._usage(state, self.total_bytes)
+
+    def _changed(self, state: Dict):
+        if self.on_change is not None:
+            try:
+                self.on_change(self._usage(state, self.total_bytes))
+            except Exception as e:
+                logger.warning(f"Memory metrics callback failed: {str(e)}")
+
+    def set_resident(self, nbytes: int):
+        """Record memory this process keeps between jobs (e.g. in-memory caches)"""
+        key = f'resident:{os.getpid()}'
+        with self._ledger() as state:
+            if nbytes > 0:
+                state['reservations'][key] = {'pid': os.getpid(), 'bytes': int(nbytes)}
+            else:
+                state['reservations'].pop(key, None)
+            self._changed(state)
+
+    @contextmanager
+    def admit(self, plans: Sequence[MemoryPlan], timeout: Optional[float] = None,
+              reclaim: Optional[Callable[[], None]] = None) -> Iterator[MemoryPlan]:
+        """
+        Wait for a slot and reserve the memory of the best plan that fits.
+
+        Args:
+            plans: Candidate plans, best resolution first (see ``plan_job``)
+            timeout: Seconds to wait before giving up; None waits indefinitely
+            reclaim: Frees this process's resident memory; called when the job
+                would fit without it and no other job of this process (e.g.
+                another green thread sharing the processor) is running
+
+        Yields:
+            MemoryPlan: The admitted plan; its memory is released on exit
+
+        Raises:
+            MemoryError: If even the most downgraded plan exceeds the budget
+            TimeoutError: If no slot freed up within ``timeout``
+        """
+        feasible = [plan for plan in plans if plan.peak_bytes <= self.total_bytes]
+        if not feasible:
+            smallest = min(plan.peak_bytes for plan in plans)
+            raise MemoryError(f"Job needs at least {smallest / 1024 ** 3:.2f} GiB, "
+                              f"more than the {self.total_bytes / 1024 ** 3:.2f} GiB memory budget")
+        ticket = uuid.uuid4().hex
+        resident_key = f'resident:{os.getpid()}'
+        queued = time.monotonic()
+        with self._ledger() as state:
+            state['queue'].append({'ticket': ticket, 'pid': os.getpid()})
+            self._changed(state)
+
+        plan = None
+        try:
+            while plan is None:
+                waited = time.monotonic() - queued
+                candidates = feasible if waited >= self.degrade_after else feasible[:1]
+                must_reclaim = False
+                with self._ledger() as state:
+                    if state['queue'] and state['queue'][0]['ticket'] == ticket:
+                        available = self._usage(state, self.total_bytes)['available_bytes']
+                        plan = next((p for p in candidates if p.peak_bytes <= available), None)
+                        if plan is not None:
+                            state['queue'].pop(0)
+                            state['reservations'][ticket] = {'pid': os.getpid(), 'bytes': plan.peak_bytes,
+                                                             'job': True}
+                            self._changed(state)
+                        elif (reclaim is not None and resident_key in state['reservations']
+                              and not any(r.get('job') and r['pid'] == os.getpid()
+                                          for r in state['reservations'].values())):
+                            own = state['reservations'][resident_key]['bytes']
+                            must_reclaim = candidates[-1].peak_bytes <= available + own
+                if must_reclaim:
+                    logger.info("Releasing cached recordings to admit the next job")
+                    reclaim()
+                    self.set_resident(0)
+                    continue
+                if plan is None:
+                    if timeout is not None and waited > timeout:
+                        raise TimeoutError(f"No memory for a {feasible[-1].peak_bytes / 1024 ** 3:.2f} GiB "
+                                           f"job within {timeout} s")
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            with self._ledger() as state:
+                state['queue'] = [entry for entry in state['queue'] if entry['ticket'] != ticket]
+                self._changed(state)
+            raise
+
+        if plan.downgraded:
+            logger.warning(f"Admitted job with downgraded plan (ICA decim {plan.ica_decim}, "
+                           f"TFR decim {plan.tfr_decim}) after {time.monotonic() - queued:.1f} s")
+        else:
+            logger.info(f"Admitted job needing {plan.peak_bytes / 1024 ** 3:.2f} GiB "
+                        f"(peak in {plan.peak_stage}) after {time.monotonic() - queued:.1f} s")
+        try:
+            yield plan
+        finally:
+            with self._ledger() as state:
+                state['reservations'].pop(ticket, None)
+                self._changed(state)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Multimodal Time Alignment
+
+Aligns EEG, eye tracking, face heat map and vitals streams recorded with
+different sampling rates and clock offsets onto one common timeline, as
+described in multi-modal-analysis/documentation/README.md. Every stream is
+consumed in chunks and written straight into a columnar store (one .npy file
+per column plus metadata), so hours of data per participant never have to be
+held in memory or in one pandas frame:
+1. Regularly sampled streams (EEG, continuous heart rate) are brought to the
+   target rate with polyphase resampling over overlapping chunks, which gives
+   the same samples as resampling the whole recording at once
+2. Samples are joined onto the target grid with vectorized as-of joins
+   (last observation, optionally limited by a staleness tolerance) or linear
+   interpolation between neighbouring samples
+
+Author: MVT Nexus Team
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from fractions import Fraction
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+logger = logging.getLogger(__name__)
+
+# A chunk of a stream: sorted timestamps (n,) in seconds and values (n, n_columns)
+Chunk = Tuple[np.ndarray, np.ndarray]
+
+JOIN_METHODS = ('asof', 'linear')
+
+
+@dataclass
+class Stream:
+    """
+    One input stream, read as a sequence of time-ordered chunks.
+
+    Attributes:
+        name: Prefix for the aligned column names (e.g. 'eeg', 'eye')
+        columns: Names of the value columns
+        chunks: Callable returning a fresh iterator of (timestamps, values) chunks
+        start: First timestamp (stream clock), if known without scanning
+        stop: Last timestamp (stream clock), if known without scanning
+        sfreq: Nominal sampling rate of regularly sampled streams; these are
+            polyphase-resampled to the target rate. None for irregular streams
+        clock_offset: Seconds added to stream timestamps to obtain the
+            reference clock
+        join: 'linear' (interpolate between samples) or 'asof' (last sample)
+        tolerance: Largest age in seconds of an as-of sample, or largest gap
+            between samples bridged by linear interpolation; beyond -> NaN
+    """
+    name: str
+    columns: List[str]
+    chunks: Callable[[], Iterator[Chunk]]
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    sfreq: Optional[float] = None
+    clock_offset: float = 0.0
+    join: str = 'asof'
+    tolerance: Optional[float] = None
+
+    def __post_init__(self):
+        if self.join not in JOIN_METHODS:
+            raise ValueError(f"Unknown join method: {self.join} (expected one of {JOIN_METHODS})")
+
+    @classmethod
+    def from_arrays(cls, name: str, timestamps: np.ndarray, values: np.ndarray,
+                    columns: Sequence[str], chunk_size: int = 100_000, **kwargs) -> 'Stream':
+        """Stream over in-memory arrays (values shaped (n, n_columns))"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values).reshape(len(timestamps), -1)
+
+        def chunks():
+            for i in range(0, len(timestamps), chunk_size):
+                yield timestamps[i:i + chunk_size], values[i:i + chunk_size]
+        return cls(name, list(columns), chunks, float(timestamps[0]), float(timestamps[-1]), **kwargs)
+
+    @classmethod
+    def from_raw(cls, name: str, raw, chunk_seconds: float = 60.0, picks=None,
+                 **kwargs) -> 'Stream':
+        """
+        Stream over an MNE Raw object, read chunk by chunk (preload not required).
+
+        Timestamps are seconds since the Unix epoch when the recording has a
+        measurement date, otherwise seconds since the start of the recording.
+        """
+        picks = raw.ch_names if picks is None else list(picks)
+        sfreq = raw.info['sfreq']
+        meas_date = raw.info['meas_date']
+        origin = (meas_date.timestamp() if meas_date is not None else 0.0) + raw.first_time
+        chunk = max(1, int(round(chunk_seconds * sfreq)))
+
+        def chunks():
+            for start in range(0, raw.n_times, chunk):
+                stop = min(start + chunk, raw.n_times)
+                data = raw.get_data(picks=picks, start=start, stop=stop)
+                yield origin + np.arange(start, stop) / sfreq, data.T
+        kwargs.setdefault('join', 'linear')
+        return cls(name, list(picks), chunks, origin, origin + (raw.n_times - 1) / sfreq,
+                   sfreq=sfreq, **kwargs)
+
+    @classmethod
+    def from_csv(cls, name: str, file_path: Union[str, Path], time_column: str = 'timestamp',
+                 columns: Optional[Sequence[str]] = None, chunksize: int = 100_000,
+                 **kwargs) -> 'Stream':
+        """
+        Stream over a CSV (or tab-separated) file with a time column in seconds.
+
+        The file is read with ``chunksize`` rows at a time; only the time
+        column is scanned to find the time range. Rows must be sorted by
+        time: the chunks are not reordered, and a timestamp earlier than the
+        one before it raises ValueError while the stream is read.
+        """
+        sep = '\t' if Path(file_path).suffix in ('.tsv', '.tab') else ','
+        if columns is None:
+            header = pd.read_csv(file_path, sep=sep, nrows=0).columns
+            columns = [c for c in header if c != time_column]
+        columns = list(columns)
+
+        def chunks():
+            reader = pd.read_csv(file_path, sep=sep, usecols=[time_column] + columns,
+                                 chunksize=chunksize)
+            last = -np.inf
+            for frame in reader:
+                times = frame[time_column].to_numpy(dtype=np.float64)
+                if len(times) and (times[0] < last or np.any(np.diff(times) < 0)):
+                    row = frame.index[np.argmax(np.diff(times, prepend=last) < 0)]
+                    raise ValueError(f"{file_path} is not sorted by {time_column} (data row {row})")
+                last = times[-1] if len(times) else last
+                yield times, frame[columns].to_numpy(dtype=np.float64)
+
+        start, stop = np.inf, -np.inf
+        for frame in pd.read_csv(file_path, sep=sep, usecols=[time_column], chunksize=chunksize):
+            times = frame[time_column].to_numpy(dtype=np.float64)
+            start, stop = min(start, np.nanmin(times)), max(stop, np.nanmax(times))
+        return cls(name, columns, chunks, float(start), float(stop), **kwargs)
+
+    def time_range(self) -> Tuple[float, float]:
+        """First and last timestamp on the reference clock"""
+        if self.start is None or self.stop is None:
+            first, last = np.inf, -np.inf
+            for timestamps, _ in self.chunks():
+                if len(timestamps):
+                    first, last = min(first, timestamps[0]), max(last, timestamps[-1])
+            self.start, self.stop = float(first), float(last)
+        return self.start + self.clock_offset, self.stop + self.clock_offset
+
+
+def resample_poly_chunks(chunks: Iterable[np.ndarray], up: int, down: int) -> Iterator[np.ndarray]:
+    """
+    Polyphase resampling of a chunked signal (time along axis 0).
+
+    Each block is resampled with enough neighbouring input to cover the
+    anti-aliasing filter, and block boundaries fall on multiples of ``down``,
+    so the concatenated output equals ``signal.resample_poly`` of the whole
+    signal.
+
+    Args:
+        chunks: Consecutive (n_i, n_columns) input blocks
+        up: Upsampling factor
+        down: Downsampling factor
+
+    Yields:
+        np.ndarray: Consecutive resampled blocks
+    """
+    # resample_poly's default filter spans 10 * max(up, down) upsampled samples per side
+    context = -(-10 * max(up, down) // up)
+    context = (-(-context // down) + 1) * down
+    buffer = None
+    buffer_start = 0      # global input index of buffer[0]
+    emitted = 0           # next input index whose output has not been emitted
+
+    def process(lo, hi, final=False):
+        # Resample input [lo - pre, hi + post) and keep the outputs of [lo, hi)
+        pre = min(context, lo)
+        seg_end = buffer_start + len(buffer) if final else hi + context
+        segment = buffer[lo - pre - buffer_start:seg_end - buffer_start]
+        out = signal.resample_poly(segment, up, down, axis=0)
+        first = pre * up // down
+        if final:
+            return out[first:]
+        return out[first:first + (hi - lo) * up // down]
+
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype=np.float64)
+        buffer = chunk if buffer is None else np.concatenate([buffer, chunk])
+        available = buffer_start + len(buffer) - context
+        hi = (available // down) * down
+        if hi > emitted:
+            yield process(emitted, hi)
+            emitted = hi
+            keep_from = max(0, emitted - context)
+            buffer = buffer[keep_from - buffer_start:]
+            buffer_start = keep_from
+    if buffer is not None and buffer_start + len(buffer) > emitted:
+        yield process(emitted, None, final=True)
+
+
+def _rational(ratio: float, max_denominator: int = 1000) -> Tuple[int, int]:
+    fraction = Fraction(ratio).limit_denominator(max_denominator)
+    return fraction.numerator, fraction.denominator
+
+
+def _resampled_chunks(stream: Stream, sfreq: float) -> Iterator[Chunk]:
+    """Chunks of a regular stream polyphase-resampled to ``sfreq``"""
+    up, down = _rational(sfreq / stream.sfreq)
+    rate = stream.sfreq * up / down
+    origin = None
+
+    def values():
+        nonlocal origin
+        for timestamps, block in stream.chunks():
+            if origin is None and len(timestamps):
+                origin = timestamps[0]
+            yield block
+
+    produced = 0
+    for block in resample_poly_chunks(values(), up, down):
+        yield origin + (produced + np.arange(len(block))) / rate, block
+        produced += len(block)
+
+
+class _GridJoiner:
+    """Joins (timestamps, values) chunks onto a regular target grid"""
+
+    def __init__(self, start: float, sfreq: float, n_samples: int, method: str,
+                 tolerance: Optional[float]):
+        self.start, self.sfreq, self.n = start, sfreq, n_samples
+        self.method, self.tolerance = method, tolerance
+        self.next_index = 0
+        self.carry = None
+
+    def _grid(self, limit_time: float, inclusive: bool) -> np.ndarray:
+        """Target indices from next_index up to limit_time"""
+        position = min((limit_time - self.start) * self.sfreq, self.n)
+        last = int(np.floor(position)) if inclusive else int(np.ceil(position)) - 1
+        last = min(last, self.n - 1)
+        return np.arange(self.next_index, max(self.next_index, last + 1))
+
+    def _values_at(self, indices: np.ndarray, times: np.ndarray, values: np.ndarray) -> np.ndarray:
+        targets = self.start + indices / self.sfreq
+        left = np.searchsorted(times, targets, side='right') - 1
+        out = np.full((len(indices), values.shape[1]), np.nan)
+        valid = left >= 0
+        if self.method == 'linear':
+            right = np.minimum(left + 1, len(times) - 1)
+            exact = valid & (times[np.maximum(left, 0)] == targets)
+            valid &= right > left
+            if self.tolerance is not None:
+                valid &= times[right] - times[np.maximum(left, 0)] <= self.tolerance
+            lv, rv = values[left[valid]], values[right[valid]]
+            weight = ((targets[valid] - times[left[valid]])
+                      / (times[right[valid]] - times[left[valid]]))[:, None]
+            out[valid] = lv + weight * (rv - lv)
+            out[exact] = values[left[exact]]
+        else:
+            if self.tolerance is not None:
+                valid &= targets - times[np.maximum(left, 0)] <= self.tolerance
+            out[valid] = values[left[valid]]
+        return out
+
+    def feed(self, times: np.ndarray, values: np.ndarray, final: bool = False):
+        """
+        Consume the next chunk and return newly resolved grid rows.
+
+        Returns:
+            Tuple[int, np.ndarray]: First grid index and (n, n_columns) values
+        """
+        if self.carry is not None:
+            times = np.concatenate([self.carry[0], times])
+            values = np.concatenate([self.carry[1], values])
+        if len(times) == 0:
+            return self.next_index, np.empty((0, values.shape[1]))
+        if final:
+            # As-of values persist past the last sample; interpolation stops there
+            limit = np.inf if self.method == 'asof' else times[-1]
+            indices = self._grid(limit, inclusive=True)
+        else:
+            indices = self._grid(times[-1], inclusive=False)
+        first = self.next_index
+        rows = self._values_at(indices, times, values)
+        self.next_index += len(indices)
+        self.carry = (times[-1:], values[-1:])
+        return first, rows
+
+
+@dataclass
+class AlignedStore:
+    """Columnar store of streams aligned onto one regular timeline"""
+    path: Path
+    start: float
+    sfreq: float
+    n_samples: int
+    columns: List[str]
+    files: Dict[str, str] = field(default_factory=dict)
+    streams: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> 'AlignedStore':
+        """Open a store written by ``align_streams``"""
+        path = Path(path)
+        with open(path / 'meta.json') as f:
+            meta = json.load(f)
+        return cls(path, meta['start'], meta['sfreq'], meta['n_samples'], meta['columns'],
+                   meta['files'], meta.get('streams', {}))
+
+    def column(self, name: str) -> np.ndarray:
+        """Memory-mapped values of one column"""
+        return np.load(self.path / self.files[name], mmap_mode='r')
+
+    def times(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Reference-clock timestamps of grid samples [start, stop)"""
+        stop = self.n_samples if stop is None else min(stop, self.n_samples)
+        return self.start + np.arange(start, stop) / self.sfreq
+
+    def index_of(self, time: float) -> int:
+        """Grid index at or after a reference-clock time"""
+        return int(np.clip(np.ceil((time - self.start) * self.sfreq - 1e-9), 0, self.n_samples))
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None, tmin: Optional[float] = None,
+                 tmax: Optional[float] = None) -> pd.DataFrame:
+        """
+        Load a time window of selected columns into a DataFrame.
+
+        Args:
+            columns: Column names (defaults to all)
+            tmin: Window start on the reference clock (defaults to the start)
+            tmax: Window end, exclusive (defaults to the end)
+
+        Returns:
+            pd.DataFrame: Aligned values indexed by timestamp
+        """
+        start = 0 if tmin is None else self.index_of(tmin)
+        stop = self.n_samples if tmax is None else self.index_of(tmax)
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame({name: np.asarray(self.column(name)[start:stop]) for name in columns},
+                            index=pd.Index(self.times(start, stop), name='timestamp'))
+
+
+def _file_name(column: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', column) + '.npy'
+
+
+def align_streams(streams: Sequence[Stream], output_dir: Union[str, Path], sfreq: float,
+                  start: Optional[float] = None, stop: Optional[float] = None,
+                  span: str = 'intersection', dtype=np.float32) -> AlignedStore:
+    """
+    Align streams onto a regular timeline and write them to a columnar store.
+
+    Args:
+        streams: Input streams
+        output_dir: Directory for the store (one .npy file per column)
+        sfreq: Sampling rate of the common timeline in Hz
+        start: Timeline start on the reference clock (default from span)
+        stop: Timeline end on the reference clock (default from span)
+        span: 'intersection' (where all streams overlap) or 'union'
+        dtype: Storage dtype of the aligned values
+
+    Returns:
+        AlignedStore: The written store
+    """
+    ranges = np.array([stream.time_range() for stream in streams])
+    if span == 'intersection':
+        default_start, default_stop = ranges[:, 0].max(), ranges[:, 1].min()
+    elif span == 'union':
+        default_start, default_stop = ranges[:, 0].min(), ranges[:, 1].max()
+    else:
+        raise ValueError(f"Unknown span: {span}")
+    start = default_start if start is None else start
+    stop = default_stop if stop is None else stop
+    if stop <= start:
+        raise ValueError(f"Empty timeline: streams do not overlap ({start} >= {stop})")
+    n_samples = int(np.floor((stop - start) * sfreq)) + 1
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    store = AlignedStore(output_dir, float(start), float(sfreq), n_samples, [])
+    for stream in streams:
+        names = [f'{stream.name}.{column}' for column in stream.columns]
+        arrays = []
+        for name in names:
+            store.files[name] = _file_name(name)
+            array = np.lib.format.open_memmap(output_dir / store.files[name], mode='w+',
+                                              dtype=dtype, shape=(n_samples,))
+            array[:] = np.nan
+            arrays.append(array)
+        store.columns.extend(names)
+
+        chunks = _resampled_chunks(stream, sfreq) if stream.sfreq else stream.chunks()
+        joiner = _GridJoiner(start, sfreq, n_samples, stream.join, stream.tolerance)
+
+        def write(first, rows):
+            for column, array in enumerate(arrays):
+                array[first:first + len(rows)] = rows[:, column]
+
+        for timestamps, values in chunks:
+            write(*joiner.feed(timestamps + stream.clock_offset,
+                               np.asarray(values, dtype=np.float64).reshape(len(timestamps), -1)))
+        write(*joiner.feed(np.empty(0), np.empty((0, len(names))), final=True))
+        for array in arrays:
+            array.flush()
+        store.streams[stream.name] = {'sfreq': stream.sfreq, 'clock_offset': stream.clock_offset,
+                                      'join': stream.join, 'tolerance': stream.tolerance}
+        logger.info(f"Aligned stream {stream.name} ({len(names)} columns) onto {n_samples} samples")
+
+    with open(output_dir / 'meta.json', 'w') as f:
+        json.dump({'start': store.start, 'sfreq': store.sfreq, 'n_samples': n_samples,
+                   'columns': store.columns, 'files': store.files, 'streams': store.streams},
+                  f, indent=2)
+    return store
+
+
+def align_participants(participants: Dict[str, Sequence[Stream]], output_root: Union[str, Path],
+                       sfreq: float, **kwargs) -> Dict[str, AlignedStore]:
+    """Align each participant's streams into output_root/<participant_id>/"""
+    stores = {}
+    for participant_id, streams in participants.items():
+        try:
+            stores[participant_id] = align_streams(streams, Path(output_root) / participant_id,
+                                                   sfreq, **kwargs)
+        except Exception as e:
+            logger.error(f"Error aligning participant {participant_id}: {str(e)}")
+            raise
+    return stores
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Psychometric Norms Index
+
+Builds sorted reference score arrays per norm group (e.g. ``Test_Type`` and
+optionally demographic columns) once, persists them, and converts batches of
+raw scores to percentile ranks, z, T and stanine scores with ``searchsorted``
+lookups. Groups form a hierarchy: tables exist for every prefix of the
+grouping columns, so a sparse group (e.g. Aptitude/Other) falls back to its
+parent (Aptitude) and finally to the overall norms.
+
+Author: MVT Nexus Team
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Upper percentile bounds of stanines 1-8 (4-7-12-17-20-17-12-7-4 % bands)
+STANINE_CUTS = np.array([4.0, 11.0, 23.0, 40.0, 60.0, 77.0, 89.0, 96.0])
+
+# Groups with fewer reference scores fall back to their parent group
+DEFAULT_MIN_GROUP_SIZE = 30
+
+
+@dataclass
+class NormsTable:
+    """Sorted reference scores of one norm group"""
+    values: np.ndarray
+    mean: float
+    std: float
+
+    @classmethod
+    def from_scores(cls, scores: np.ndarray) -> 'NormsTable':
+        """Table from unsorted reference scores (NaNs are dropped)"""
+        values = np.sort(np.asarray(scores, dtype=np.float64))
+        return cls.from_sorted(values[~np.isnan(values)])
+
+    @classmethod
+    def from_sorted(cls, values: np.ndarray) -> 'NormsTable':
+        """Table from already sorted reference scores"""
+        return cls(values, float(values.mean()), float(values.std(ddof=1)) if values.size > 1 else np.nan)
+
+    @property
+    def n(self) -> int:
+        return int(self.values.size)
+
+    def percentile(self, scores: np.ndarray) -> np.ndarray:
+        """Mid-rank percentile: % of reference scores below plus half of ties"""
+        below = np.searchsorted(self.values, scores, side='left')
+        at_or_below = np.searchsorted(self.values, scores, side='right')
+        return 100.0 * (below + 0.5 * (at_or_below - below)) / self.n
+
+    def convert(self, scores: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Convert raw scores against this group.
+
+        Args:
+            scores: Raw scores (any shape)
+
+        Returns:
+            Dict[str, np.ndarray]: percentile, z, t and stanine arrays
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        percentile = self.percentile(scores)
+        z = (scores - self.mean) / self.std
+        return {
+            'percentile': percentile,
+            'z': z,
+            't': 50.0 + 10.0 * z,
+            'stanine': np.searchsorted(STANINE_CUTS, percentile, side='right') + 1
+        }
+
+
+class NormsIndex:
+    """Norm tables for every prefix of a list of grouping columns"""
+
+    def __init__(self, group_by: Sequence[str], tables: Dict[Tuple[str, ...], NormsTable],
+                 min_group_size: int = DEFAULT_MIN_GROUP_SIZE):
+        self.group_by = list(group_by)
+        self.tables = tables
+        self.min_group_size = min_group_size
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, score_column: str = 'Scores',
+                   group_by: Sequence[str] = ('Test_Type',),
+                   min_group_size: int = DEFAULT_MIN_GROUP_SIZE) -> 'NormsIndex':
+        """
+        Build norms from a reference sample.
+
+        Args:
+            df: Reference data, one row per score
+            score_column: Column holding the raw scores
+            group_by: Grouping columns, coarsest first (e.g. Test_Type, Gender)
+            min_group_size: Smallest group used before falling back to its parent
+
+        Returns:
+            NormsIndex: Index with one table per group prefix
+        """
+        group_by = list(group_by)
+        tables = {(): NormsTable.from_scores(df[score_column].to_numpy())}
+        for depth in range(1, len(group_by) + 1):
+            columns = group_by[:depth]
+            for key, scores in df.groupby(columns, observed=True)[score_column]:
+                key = key if isinstance(key, tuple) else (key,)
+                tables[tuple(str(k) for k in key)] = NormsTable.from_scores(scores.to_numpy())
+        logger.info(f"Built {len(tables)} norm tables over {len(df)} scores grouped by {group_by}")
+        return cls(group_by, tables, min_group_size)
+
+    @classmethod
+    def from_csv(cls, file_path: Union[str, Path], **kwargs) -> 'NormsIndex':
+        """Build norms from a CSV such as psychometric_calculator_data.csv"""
+        return cls.from_frame(pd.read_csv(file_path), **kwargs)
+
+    def save(self, file_path: Union[str, Path]):
+        """Persist all tables to a single .npz file"""
+        keys = list(self.tables)
+        lengths = np.array([self.tables[key].n for key in keys])
+        meta = {'group_by': self.group_by, 'keys': [list(key) for key in keys],
+                'min_group_size': self.min_group_size}
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'wb') as f:
+            np.savez(f, values=np.concatenate([self.tables[key].values for key in keys]),
+                     offsets=np.concatenate([[0], np.cumsum(lengths)]),
+                     meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> 'NormsIndex':
+        """Load tables written by ``save``"""
+        with np.load(file_path) as npz:
+            meta = json.loads(str(npz['meta']))
+            values, offsets = npz['values'], npz['offsets']
+        tables = {
+            tuple(key): NormsTable.from_sorted(values[offsets[i]:offsets[i + 1]])
+            for i, key in enumerate(meta['keys'])
+        }
+        return cls(meta['group_by'], tables, meta['min_group_size'])
+
+    def groups(self) -> List[Dict[str, str]]:
+        """All groups with their sizes"""
+        return [dict(zip(self.group_by, key), n=table.n) for key, table in self.tables.items()]
+
+    def table_for(self, group: Optional[Dict[str, str]] = None) -> Tuple[Tuple[str, ...], NormsTable]:
+        """
+        Most specific table with enough reference scores for a group.
+
+        Args:
+            group: Values of (a prefix of) the grouping columns
+
+        Returns:
+            Tuple: Key of the table used and the table
+        """
+        group = group or {}
+        key = []
+        for column in self.group_by:
+            if column not in group:
+                break
+            key.append(str(group[column]))
+        for depth in range(len(key), -1, -1):
+            table = self.tables.get(tuple(key[:depth]))
+            if table is not None and (table.n >= self.min_group_size or depth == 0):
+                return tuple(key[:depth]), table
+        raise KeyError(f"No norms for group {group}")
+
+    def convert(self, scores: Sequence[float],
+                group: Optional[Dict[str, str]] = None) -> Dict[str, np.ndarray]:
+        """Convert a batch of scores that share one norm group"""
+        _, table = self.table_for(group)
+        return table.convert(np.asarray(scores, dtype=np.float64))
+
+    def convert_batch(self, scores: Sequence[float],
+                      groups: Sequence[Dict[str, str]]) -> Dict[str, np.ndarray]:
+        """
+        Convert scores that each carry their own norm group.
+
+        Scores are bucketed by group so each table is searched once with all
+        of its scores.
+
+        Args:
+            scores: Raw scores
+            groups: One group mapping per score
+
+        Returns:
+            Dict[str, np.ndarray]: percentile, z, t and stanine arrays in input order
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(groups) != scores.size:
+            raise ValueError("Need one group per score")
+        group_keys = pd.Series([tuple(g.get(column) for column in self.group_by) for g in groups],
+                               dtype=object)
+        inverse, unique = pd.factorize(group_keys)
+        result = {'percentile': np.empty(scores.size), 'z': np.empty(scores.size),
+                  't': np.empty(scores.size), 'stanine': np.empty(scores.size, dtype=np.int64)}
+        for i, key in enumerate(unique):
+            rows = np.flatnonzero(inverse == i)
+            group = {column: value for column, value in zip(self.group_by, key) if value is not None}
+            converted = self.convert(scores[rows], group)
+            for name, values in converted.items():
+                result[name][rows] = values
+        return result
+
+
+@lru_cache(maxsize=8)
+def _load_cached(file_path: str, mtime_ns: int, size: int) -> NormsIndex:
+    logger.info(f"Loading norms from {file_path}")
+    return NormsIndex.load(file_path)
+
+
+def load_norms(file_path: Union[str, Path]) -> NormsIndex:
+    """
+    Load a persisted norms index through an LRU cache.
+
+    The cache is keyed by path, modification time and size, so rebuilt
+    norms files are picked up without a restart.
+    """
+    stat = os.stat(file_path)
+    return _load_cached(str(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def build_norms(source_csv: Union[str, Path], output_path: Union[str, Path],
+                **kwargs) -> NormsIndex:
+    """Build norms from a reference CSV and persist them"""
+    index = NormsIndex.from_csv(source_csv, **kwargs)
+    index.save(output_path)
+    return index
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Multi-Resolution Overview Pyramid
+
+Precomputed min/max/mean pyramid for plotting long EEG recordings. Level 0
+holds the samples themselves; level k holds bins of 2**k samples. All levels
+are stored per channel as float32 arrays (about twice the size of the data
+itself in total), so any time span can be served at a bounded number of
+points per channel by slicing a single level.
+
+Author: MVT Nexus Team
+"""
+
+import logging
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_POINTS = 2000
+
+
+class OverviewPyramid:
+    """Power-of-two min/max/mean decimation pyramid over channel data"""
+
+    def __init__(self, data: np.ndarray, sfreq: float, ch_names: Sequence[str],
+                 min_bins: int = 1):
+        """
+        Build all pyramid levels from (n_channels, n_times) data.
+
+        Args:
+            data: Channel data, any float dtype
+            sfreq: Sampling frequency in Hz
+            ch_names: Channel names matching the rows of data
+            min_bins: Stop adding levels once a level has this many bins or fewer
+        """
+        if data.ndim != 2 or data.shape[0] != len(ch_names):
+            raise ValueError("Data must be (n_channels, n_times) and match ch_names")
+
+        self.sfreq = float(sfreq)
+        self.ch_names = list(ch_names)
+        self.n_times = data.shape[1]
+        self.base = np.ascontiguousarray(data, dtype=np.float32)
+        self.mins: List[np.ndarray] = [self.base]
+        self.maxs: List[np.ndarray] = [self.base]
+        self.means: List[np.ndarray] = [self.base]
+
+        counts = np.ones(self.n_times, dtype=np.int64)
+        while self.mins[-1].shape[1] > max(min_bins, 1):
+            counts = self._add_level(counts)
+        logger.debug(f"Built overview pyramid with {self.n_levels} levels")
+
+    def _add_level(self, counts: np.ndarray) -> np.ndarray:
+        """Reduce the top level by pairs; returns the per-bin sample counts"""
+        lo, hi, mean = self.mins[-1], self.maxs[-1], self.means[-1]
+        if lo.shape[1] % 2:
+            # Odd length: pad with an empty bin that cannot win min/max or move the mean
+            lo = np.concatenate([lo, lo[:, -1:]], axis=1)
+            hi = np.concatenate([hi, hi[:, -1:]], axis=1)
+            mean = np.concatenate([mean, mean[:, -1:]], axis=1)
+            counts = np.append(counts, 0)
+
+        left, right = counts[0::2], counts[1::2]
+        merged = left + right
+        self.mins.append(np.minimum(lo[:, 0::2], lo[:, 1::2]))
+        self.maxs.append(np.maximum(hi[:, 0::2], hi[:, 1::2]))
+        weighted = (mean[:, 0::2] * (left / merged).astype(np.float32)
+                    + mean[:, 1::2] * (right / merged).astype(np.float32))
+        self.means.append(weighted.astype(np.float32, copy=False))
+        return merged
+
+    @property
+    def n_levels(self) -> int:
+        return len(self.mins)
+
+    @property
+    def duration(self) -> float:
+        return self.n_times / self.sfreq
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by all levels (level 0 stored once)"""
+        return self.base.nbytes + sum(
+            a.nbytes for arrays in (self.mins, self.maxs, self.means) for a in arrays[1:]
+        )
+
+    def select_level(self, n_samples: int, max_points: int) -> int:
+        """
+        Lowest level that shows n_samples in at most max_points bins.
+
+        Args:
+            n_samples: Number of raw samples in the requested span
+            max_points: Maximum number of points per channel (e.g. pixel width)
+
+        Returns:
+            int: Pyramid level index
+        """
+        if n_samples <= max_points or max_points <= 0:
+            return 0
+        level = math.ceil(math.log2(n_samples / max_points))
+        return min(level, self.n_levels - 1)
+
+    def query(self, tmin: Optional[float] = None, tmax: Optional[float] = None,
+              max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+        """
+        Serve a time span at the resolution needed for a given pixel width.
+
+        Args:
+            tmin: Start of the span in seconds (defaults to recording start)
+            tmax: End of the span in seconds (defaults to recording end)
+            max_points: Maximum number of points per channel
+
+        Returns:
+            Dict: Bin start times, per-channel means under ``channels`` (the
+            shape the visualization panel expects) plus ``min``/``max``
+            envelopes, the selected level and its bin width in seconds
+        """
+        start = 0 if tmin is None else int(np.clip(math.floor(tmin * self.sfreq), 0, self.n_times))
+        stop = self.n_times if tmax is None else int(np.clip(math.ceil(tmax * self.sfreq), start, self.n_times))
+
+        level = self.select_level(stop - start, max_points)
+        bin_size = 1 << level
+        first_bin = start // bin_size
+        last_bin = -(-stop // bin_size)
+
+        lo = self.mins[level][:, first_bin:last_bin]
+        hi = self.maxs[level][:, first_bin:last_bin]
+        mean = self.means[level][:, first_bin:last_bin]
+        times = (first_bin + np.arange(mean.shape[1])) * (bin_size / self.sfreq)
+
+        return {
+            'time': times.tolist(),
+            'channels': {ch: mean[i].tolist() for i, ch in enumerate(self.ch_names)},
+            'min': {ch: lo[i].tolist() for i, ch in enumerate(self.ch_names)},
+            'max': {ch: hi[i].tolist() for i, ch in enumerate(self.ch_names)},
+            'level': level,
+            'bin_seconds': bin_size / self.sfreq,
+            'sampling_rate': self.sfreq,
+            'duration': self.duration
+        }
+
+    def save(self, file_path: Union[str, Path]):
+        """Persist all levels to an uncompressed .npz archive"""
+        arrays = {'base': self.base}
+        for level in range(1, self.n_levels):
+            arrays[f'min_{level}'] = self.mins[level]
+            arrays[f'max_{level}'] = self.maxs[level]
+            arrays[f'mean_{level}'] = self.means[level]
+        np.savez(file_path, sfreq=self.sfreq, ch_names=np.array(self.ch_names), **arrays)
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> 'OverviewPyramid':
+        """Load a pyramid written by ``save`` without recomputing any level"""
+        with np.load(file_path) as archive:
+            pyramid = cls.__new__(cls)
+            pyramid.sfreq = float(archive['sfreq'])
+            pyramid.ch_names = archive['ch_names'].tolist()
+            pyramid.base = archive['base']
+            pyramid.n_times = pyramid.base.shape[1]
+            pyramid.mins, pyramid.maxs, pyramid.means = [pyramid.base], [pyramid.base], [pyramid.base]
+            level = 1
+            while f'min_{level}' in archive:
+                pyramid.mins.append(archive[f'min_{level}'])
+                pyramid.maxs.append(archive[f'max_{level}'])
+                pyramid.means.append(archive[f'mean_{level}'])
+                level += 1
+        return pyramid
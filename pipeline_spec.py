@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Declarative Preprocessing Pipeline Specification
+
+A pipeline spec selects and parameterizes the preprocessing stages and the
+feature bands. Specs can be written inline in ``config.yaml`` under
+``pipeline``, kept in a separate YAML/JSON file, built from the frontend
+analysis settings, or read from the example parameter CSVs. Every spec has a
+stable content hash that keys result caching.
+
+Example (config.yaml)::
+
+    pipeline:
+      stages:
+        - name: bandpass
+          params: {l_freq: 1.0, h_freq: 40.0}
+        - name: notch
+          params: {freqs: 50.0}
+        - name: line_noise
+          params: {method: comb}
+      precision: float32
+      features:
+        bands: {alpha: [8, 13], beta: [13, 30]}
+        spectral_params: {fmin: 1.0, fmax: 40.0, window: 2.0, step: 1.0}
+
+Author: MVT Nexus Team
+"""
+
+import copy
+import csv
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Stage names in their default execution order, with default parameters
+STAGE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    'resample': {'sfreq': 256.0},
+    'bandpass': {'l_freq': 1.0, 'h_freq': 40.0, 'method': 'iir', 'order': 4},
+    'notch': {'freqs': 50.0},
+    'bad_channels': {'method': 'auto', 'interpolate': True},
+    'spatial': {'reference': 'average', 'laplacian': None, 'n_neighbors': 4},
+    'asr': {'cutoff': 20.0, 'window': 0.5, 'calibration_start': None, 'calibration_end': None},
+    'ica': {'n_components': 0.95, 'method': 'fastica', 'random_state': 42,
+            'eog': True, 'ecg': True, 'muscle': True},
+    'muscle_artifacts': {},
+    'line_noise': {'base_freq': 50.0, 'method': 'comb'},
+}
+
+# Parameters that are only present when set, so default specs keep their hash
+# (ICA fit decimation is chosen by memory admission control, see memory_budget.py)
+OPTIONAL_STAGE_PARAMS: Dict[str, set] = {'ica': {'decim'}}
+
+# Parameters given in Hz; ints and floats are treated as equivalent
+FREQUENCY_PARAMS = {'sfreq', 'l_freq', 'h_freq', 'freqs', 'base_freq'}
+
+DEFAULT_BANDS: Dict[str, List[float]] = {
+    'delta': [1.0, 4.0],
+    'theta': [4.0, 8.0],
+    'alpha': [8.0, 13.0],
+    'beta': [13.0, 30.0],
+    'gamma': [30.0, 40.0]
+}
+
+# Stages of the historical hardcoded pipeline, in order
+DEFAULT_STAGES = ['bandpass', 'notch', 'bad_channels', 'ica', 'muscle_artifacts', 'line_noise']
+
+# Working precisions for the sample data; float32 halves memory (see precision.py)
+PRECISIONS = ('float64', 'float32')
+
+# Settings accepted under features.spectral_params (see spectral_params.py);
+# window/step enable the sliding-window fits
+SPECTRAL_PARAM_KEYS = {'fmin', 'fmax', 'max_peaks', 'peak_threshold', 'min_peak_height',
+                       'peak_width_limits', 'n_iter', 'window', 'step'}
+
+
+@dataclass
+class StageSpec:
+    """One enabled pipeline stage and its parameters"""
+    name: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.name not in STAGE_DEFAULTS:
+            raise ValueError(f"Unknown pipeline stage: {self.name}")
+        unknown = (set(self.params) - set(STAGE_DEFAULTS[self.name])
+                   - OPTIONAL_STAGE_PARAMS.get(self.name, set()))
+        if unknown:
+            raise ValueError(f"Unknown parameters for stage {self.name}: {sorted(unknown)}")
+        # Normalize frequencies so equivalent specs hash identically
+        for key in FREQUENCY_PARAMS.intersection(self.params):
+            value = self.params[key]
+            if value is None:
+                continue
+            try:
+                self.params[key] = ([float(v) for v in value] if isinstance(value, (list, tuple))
+                                    else float(value))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid frequency for {self.name}.{key}: {value!r}") from None
+        self.params = {**STAGE_DEFAULTS[self.name], **self.params}
+
+
+@dataclass
+class PipelineSpec:
+    """Ordered preprocessing stages plus feature extraction settings"""
+    stages: List[StageSpec] = field(default_factory=lambda: [StageSpec(n) for n in DEFAULT_STAGES])
+    bands: Dict[str, List[float]] = field(default_factory=lambda: copy.deepcopy(DEFAULT_BANDS))
+    precision: str = 'float64'
+    spectral_params: Optional[Dict[str, Any]] = None
+
+    def __post_init__(self):
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {self.precision} (expected one of {PRECISIONS})")
+        if self.spectral_params is not None:
+            unknown = set(self.spectral_params) - SPECTRAL_PARAM_KEYS
+            if unknown:
+                raise ValueError(f"Unknown spectral_params settings: {sorted(unknown)}")
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'PipelineSpec':
+        """
+        Build a spec from its dictionary form.
+
+        Args:
+            spec: Mapping with ``stages`` (list of names or {name, params,
+                enabled} mappings), optional ``features.bands``, optional
+                ``features.spectral_params`` (a settings mapping, or true for
+                the defaults) and optional ``precision`` ('float64' or 'float32')
+
+        Returns:
+            PipelineSpec: Validated spec with defaults filled in
+        """
+        stages = []
+        for entry in spec.get('stages', DEFAULT_STAGES):
+            if isinstance(entry, str):
+                entry = {'name': entry}
+            if not entry.get('enabled', True):
+                continue
+            stages.append(StageSpec(entry['name'], dict(entry.get('params') or {})))
+        features = spec.get('features') or {}
+        bands = features.get('bands') or DEFAULT_BANDS
+        spectral = features.get('spectral_params')
+        if spectral is True:
+            spectral = {}
+        return cls(stages=stages, bands={k: [float(v[0]), float(v[1])] for k, v in bands.items()},
+                   precision=spec.get('precision', 'float64'),
+                   spectral_params=dict(spectral) if spectral not in (None, False) else None)
+
+    @classmethod
+    def from_file(cls, file_path: Union[str, Path]) -> 'PipelineSpec':
+        """Load a spec from a .json, .yaml or .yml file"""
+        file_path = Path(file_path)
+        with open(file_path, 'r') as f:
+            if file_path.suffix == '.json':
+                spec = json.load(f)
+            else:
+                spec = yaml.safe_load(f)
+        return cls.from_dict(spec or {})
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'PipelineSpec':
+        """
+        Build the spec configured under ``pipeline`` in the loaded config.
+
+        The value may be an inline mapping or a path to a spec file; when it
+        is missing the historical default pipeline is used.
+        """
+        pipeline = config.get('pipeline')
+        if pipeline is None:
+            return cls()
+        if isinstance(pipeline, (str, Path)):
+            return cls.from_file(pipeline)
+        return cls.from_dict(pipeline)
+
+    @classmethod
+    def from_settings(cls, settings: Dict, base: Optional['PipelineSpec'] = None) -> 'PipelineSpec':
+        """
+        Apply the analysis settings sent by the frontend controls.
+
+        Args:
+            settings: ``settings`` object from AnalysisControls.js
+            base: Spec to start from (defaults to the default pipeline)
+
+        Returns:
+            PipelineSpec: New spec reflecting the settings
+        """
+        spec = copy.deepcopy(base) if base is not None else cls()
+        advanced = settings.get('advancedSettings') or {}
+        stages = {stage.name: stage for stage in spec.stages}
+
+        if settings.get('analysisType') == 'quick':
+            # Quick analysis skips the expensive artifact stages entirely
+            for name in ('bad_channels', 'ica', 'muscle_artifacts'):
+                stages.pop(name, None)
+        if settings.get('applyICA') is False:
+            stages.pop('ica', None)
+        if advanced.get('interpolateChannels') is False:
+            stages.pop('bad_channels', None)
+
+        if 'bandpass' in stages:
+            params = stages['bandpass'].params
+            if settings.get('filterRange'):
+                params['l_freq'], params['h_freq'] = (float(v) for v in settings['filterRange'])
+            if advanced.get('filterOrder'):
+                params['order'] = int(advanced['filterOrder'])
+            if advanced.get('filterType'):
+                params['method'] = 'iir' if advanced['filterType'] == 'butterworth' else 'fir'
+        if settings.get('notchFreq'):
+            notch_freq = float(settings['notchFreq'])
+            if 'notch' in stages:
+                stages['notch'].params['freqs'] = notch_freq
+            if 'line_noise' in stages:
+                stages['line_noise'].params['base_freq'] = notch_freq
+        if 'ica' in stages and advanced.get('icaComponents'):
+            stages['ica'].params['n_components'] = int(advanced['icaComponents'])
+
+        if settings.get('customBands'):
+            spec.bands = parse_bands(settings['customBands'])
+        if advanced.get('precision'):
+            if advanced['precision'] not in PRECISIONS:
+                raise ValueError(f"Unknown precision: {advanced['precision']}")
+            spec.precision = advanced['precision']
+
+        spec.stages = [stage for stage in spec.stages if stage.name in stages]
+        return spec
+
+    @classmethod
+    def from_param_files(cls, preprocessing_csv: Optional[Union[str, Path]] = None,
+                         feature_csv: Optional[Union[str, Path]] = None) -> 'PipelineSpec':
+        """
+        Build a spec from preprocessing_params.csv and feature_params.csv.
+
+        Args:
+            preprocessing_csv: CSV with Parameter,Value,Unit rows
+                (lowcut, highcut, notch_freq, resample_freq)
+            feature_csv: CSV with Feature,Min_Freq,Max_Freq,Method rows
+
+        Returns:
+            PipelineSpec: Default stages parameterized from the files
+        """
+        spec = cls()
+        if preprocessing_csv:
+            with open(preprocessing_csv, newline='') as f:
+                params = {row['Parameter']: float(row['Value']) for row in csv.DictReader(f)}
+            stages = {stage.name: stage for stage in spec.stages}
+            if 'resample_freq' in params:
+                spec.stages.insert(0, StageSpec('resample', {'sfreq': params['resample_freq']}))
+            if 'lowcut' in params:
+                stages['bandpass'].params['l_freq'] = params['lowcut']
+            if 'highcut' in params:
+                stages['bandpass'].params['h_freq'] = params['highcut']
+            if 'notch_freq' in params:
+                stages['notch'].params['freqs'] = params['notch_freq']
+                stages['line_noise'].params['base_freq'] = params['notch_freq']
+        if feature_csv:
+            with open(feature_csv, newline='') as f:
+                spec.bands = {
+                    row['Feature']: [float(row['Min_Freq']), float(row['Max_Freq'])]
+                    for row in csv.DictReader(f)
+                    if row.get('Method', 'bandpower') == 'bandpower'
+                }
+        return spec
+
+    def to_dict(self) -> Dict:
+        """Canonical dictionary form (round-trips through ``from_dict``)"""
+        features = {'bands': self.bands}
+        if self.spectral_params is not None:
+            # Omitted when disabled so existing spec hashes stay unchanged
+            features['spectral_params'] = self.spectral_params
+        return {
+            'stages': [{'name': s.name, 'params': s.params} for s in self.stages],
+            'features': features,
+            'precision': self.precision
+        }
+
+    @property
+    def hash(self) -> str:
+        """Stable SHA-256 of the canonical spec, used as a cache key"""
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def stage(self, name: str) -> Optional[StageSpec]:
+        """Return the named stage if it is enabled"""
+        return next((s for s in self.stages if s.name == name), None)
+
+
+def parse_bands(text: str) -> Dict[str, List[float]]:
+    """Parse 'band:start-end,band:start-end' as entered in the custom bands field"""
+    bands = {}
+    for item in text.split(','):
+        name, _, limits = item.strip().partition(':')
+        low, _, high = limits.partition('-')
+        try:
+            bands[name.strip()] = [float(low), float(high)]
+        except ValueError:
+            raise ValueError(f"Invalid band definition: {item!r}")
+    return bands
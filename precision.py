@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Float32 Processing Mode
+
+EEG amplifiers deliver about 24 bits, so float32 (24-bit mantissa) holds the
+recorded signal without loss while halving the memory and bandwidth of every
+copy. MNE keeps preloaded data in ``raw._data`` as float64; this module casts
+it to the pipeline's working precision and temporarily restores float64 for
+the MNE routines that require it (resampling, interpolation, ICA).
+
+Numerical tolerances of the float32 mode, relative to the float64 pipeline
+(checked in tests/test_precision.py):
+
+==================  =============================================
+Stage               Tolerance
+==================  =============================================
+FIR filtering       max abs error <= 1e-4 x channel RMS
+IIR filtering       max abs error <= 1e-5 x channel RMS
+                    (computed in float64 per channel block)
+Welch band power    relative error <= 1e-4
+Statistics          relative error <= 1e-4 (variance, kurtosis,
+                    skewness, RMS); zero crossings exact except
+                    for samples within float32 resolution of 0
+==================  =============================================
+
+Author: MVT Nexus Team
+"""
+
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from pipeline_spec import PRECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Documented float32 tolerances (see module docstring)
+FLOAT32_TOLERANCES: Dict[str, float] = {
+    'fir_filter': 1e-4,
+    'iir_filter': 1e-5,
+    'band_power': 1e-4,
+    'statistics': 1e-4,
+}
+
+# Pipeline stages that call MNE routines requiring float64 data
+FLOAT64_STAGES = ('resample', 'bad_channels', 'ica', 'muscle_artifacts')
+
+
+def resolve_dtype(precision) -> np.dtype:
+    """
+    Map a precision name ('float64' or 'float32') or dtype to a numpy dtype.
+
+    Raises:
+        ValueError: For any other precision
+    """
+    dtype = np.dtype(precision)
+    if dtype.name not in PRECISIONS:
+        raise ValueError(f"Unsupported precision: {precision} (expected one of {PRECISIONS})")
+    return dtype
+
+
+def cast_raw(raw, precision):
+    """
+    Convert the preloaded data of an MNE Raw object to the given precision in place.
+
+    Args:
+        raw: Preloaded mne.io.Raw
+        precision: 'float64', 'float32' or a numpy dtype
+
+    Returns:
+        mne.io.Raw: The same object, for chaining
+    """
+    dtype = resolve_dtype(precision)
+    if raw._data.dtype != dtype:
+        logger.debug(f"Casting {raw._data.shape} samples to {dtype.name}")
+        raw._data = raw._data.astype(dtype)
+    return raw
+
+
+def copy_raw(raw, precision):
+    """
+    Copy an MNE Raw object with its data in the given precision.
+
+    The source keeps its own dtype, and the samples are copied once (a
+    ``raw.copy()`` followed by ``cast_raw`` would copy them twice). Data
+    backed by a file-based memory map (text recordings) gets a
+    copy-on-write map instead: pages only reach RAM when a stage writes
+    them.
+
+    Args:
+        raw: Preloaded mne.io.Raw
+        precision: 'float64', 'float32' or a numpy dtype
+
+    Returns:
+        mne.io.Raw: Independent copy in the requested precision
+    """
+    dtype = resolve_dtype(precision)
+    data = raw._data
+    # Copy the metadata around an empty array, then the samples in one cast
+    raw._data = np.empty((data.shape[0], 0), dtype=dtype)
+    try:
+        copied = raw.copy()
+    finally:
+        raw._data = data
+    if isinstance(data, np.memmap) and getattr(data, 'filename', None) and data.flags.c_contiguous:
+        copied._data = _copy_on_write(data, dtype)
+    else:
+        copied._data = data.astype(dtype)
+    return copied
+
+
+def _copy_on_write(data: np.memmap, dtype: np.dtype, chunk_size: int = 1_000_000) -> np.memmap:
+    """Private copy-on-write map of a memory-mapped array, cast via a sibling file if needed"""
+    path = Path(data.filename)
+    offset = data.offset
+    if data.dtype != dtype:
+        cast_path = path.with_name(f'{path.name}.{dtype.name}')
+        if not cast_path.exists() or cast_path.stat().st_mtime < path.stat().st_mtime:
+            logger.debug(f"Casting {data.shape} memory-mapped samples to {dtype.name}")
+            tmp_path = cast_path.with_name(f'{cast_path.name}.tmp')
+            cast = np.memmap(tmp_path, dtype=dtype, mode='w+', shape=data.shape)
+            for start in range(0, data.shape[1], chunk_size):
+                cast[:, start:start + chunk_size] = data[:, start:start + chunk_size]
+            cast.flush()
+            del cast
+            os.replace(tmp_path, cast_path)
+        path, offset = cast_path, 0
+    return np.memmap(path, dtype=dtype, mode='c', shape=data.shape, offset=offset)
+
+
+@contextmanager
+def float64_data(raw):
+    """
+    Run MNE routines that require float64 on a float32 Raw object.
+
+    The data is upcast on entry and cast back to its original precision on
+    exit, including when the routine replaced ``raw._data`` (e.g. resample).
+    """
+    dtype = raw._data.dtype
+    if dtype == np.float64:
+        yield raw
+        return
+    raw._data = raw._data.astype(np.float64)
+    try:
+        yield raw
+    finally:
+        raw._data = raw._data.astype(dtype, copy=False)
@@ -0,0 +1,505 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+qEEG Normative Database
+
+Compares a recording's band powers and connectivity with a reference
+population of the same age:
+1. Exported ``features.json.gz`` files (see ``EEGProcessor.export_results``)
+   are flattened into one feature vector per recording; band powers are
+   log10-transformed and correlations Fisher z-transformed so the reference
+   distributions are close to normal
+2. Per age bin (and overall) the feature means, standard deviations and a
+   Ledoit-Wolf shrunk correlation matrix per feature group are computed;
+   with far fewer recordings than features the matrix is a scaled identity
+   plus a low-rank term, so its inverse is stored as the eigenvectors of
+   that term and their weights (k x p numbers for k <= min(n, p)) and a
+   Mahalanobis distance is two products with the basis
+3. The sorted leave-one-out Mahalanobis distances of the reference
+   recordings are kept per bin and group, giving each new distance a
+   percentile and an empirical p-value (the chi-square law does not hold
+   for shrunk covariances estimated from few recordings per feature);
+   they come from rank one updates of the bin's eigendecomposition, never
+   from refitting the bin once per recording
+4. Everything is saved as float32 arrays in one .npz file; scoring a batch
+   of recordings is a gather of the bin statistics plus one vectorized
+   z-score and one product with the basis per bin and group
+
+Norms are built offline (``python qeeg_norms.py build <feature_dir> <out>``
+or ``build_qeeg_norms``); the API only loads them.
+
+Age bins with fewer reference recordings than ``min_bin_size`` fall back
+to the overall norms, as sparse groups do in norms.py.
+
+Author: MVT Nexus Team
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from correlation_engine import flatten_features
+
+logger = logging.getLogger(__name__)
+
+# Age bin edges in years (bins are [low, high))
+DEFAULT_AGE_BINS = (0.0, 6.0, 10.0, 14.0, 18.0, 25.0, 35.0, 50.0, 65.0, 120.0)
+
+# Feature groups taken from extract_features output, and their transforms
+FEATURE_TRANSFORMS: Dict[str, str] = {'band_powers': 'log', 'connectivity': 'fisher'}
+
+# Age bins with fewer reference recordings fall back to the overall norms
+DEFAULT_MIN_BIN_SIZE = 30
+
+# Reference recordings per bin whose leave-one-out distances are kept
+MAX_REFERENCE_DISTANCES = 200
+
+# Exported feature files and the participant attributes written beside them
+FEATURES_FILE = 'features.json.gz'
+ATTRIBUTES_FILE = 'attributes.json'
+
+# Bounds keeping transformed features finite, and the ridge keeping
+# correlation matrices of constant features invertible
+_LOG_FLOOR = 1e-30
+_RIDGE = 1e-6
+_FISHER_CLIP = 1.0 - 1e-7
+
+# Eigenvalues below this fraction of the largest are treated as zero
+_EIGEN_TOL = 1e-10
+
+
+def transform_features(values: np.ndarray, transforms: Sequence[str]) -> np.ndarray:
+    """
+    Apply the per-feature transforms to raw feature values.
+
+    Args:
+        values: (..., n_features) raw values
+        transforms: 'log', 'fisher' or 'none' per feature
+
+    Returns:
+        np.ndarray: Transformed float64 values
+    """
+    values = np.array(values, dtype=np.float64)
+    transforms = np.asarray(transforms)
+    log, fisher = transforms == 'log', transforms == 'fisher'
+    values[..., log] = np.log10(np.clip(values[..., log], _LOG_FLOOR, None))
+    values[..., fisher] = np.arctanh(np.clip(values[..., fisher], -_FISHER_CLIP, _FISHER_CLIP))
+    return values
+
+
+def feature_vector(features: Dict, ch_names: Optional[Sequence[str]] = None,
+                   groups: Sequence[str] = tuple(FEATURE_TRANSFORMS)) -> Dict[str, float]:
+    """Flattened features of the selected groups (e.g. ``band_powers.alpha.O1``)"""
+    return flatten_features({group: features[group] for group in groups if group in features}, ch_names)
+
+
+def _shrinkage(trace: float, frobenius: float, fourth: float, n: int, p: int) -> Tuple[float, float]:
+    """
+    Ledoit-Wolf shrinkage of a correlation matrix from its spectrum sums.
+
+    The sample correlation ``S = Z'Z / n`` of n standardized rows is shrunk
+    towards ``trace(S) / p * I``. The estimator only needs the sums below,
+    which follow from the rows and the Gram matrix ``ZZ'``, so it never
+    forms a p x p matrix.
+
+    Args:
+        trace: Sum of squared row norms of ``Z`` (the trace of ``Z'Z``)
+        frobenius: Squared Frobenius norm of ``Z'Z``
+        fourth: Sum of the squared row norms squared
+        n: Number of rows
+        p: Number of features
+
+    Returns:
+        Tuple: ``(a, b)`` with the shrunk, ridged correlation ``a * I + b * Z'Z``
+    """
+    target = trace / (n * p)
+    delta = frobenius / (n * n * p) - target ** 2
+    beta = (fourth - frobenius / n) / (n * n * p)
+    shrinkage = float(np.clip(beta / delta, 0.0, 1.0)) if delta > 0 else 1.0
+    return shrinkage * target + _RIDGE, (1.0 - shrinkage) / n
+
+
+def _eigen(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nonzero eigenpairs of ``Z'Z`` from whichever of ``Z'Z`` and ``ZZ'`` is smaller.
+
+    Returns:
+        Tuple: (k,) eigenvalues and the (k, p) orthonormal eigenvectors as rows
+    """
+    n, p = z.shape
+    if n < p:
+        eigenvalues, vectors = np.linalg.eigh(z @ z.T)
+        keep = eigenvalues > _EIGEN_TOL * max(eigenvalues[-1], 0.0)
+        eigenvalues = eigenvalues[keep]
+        return eigenvalues, (vectors[:, keep].T @ z) / np.sqrt(eigenvalues)[:, None]
+    eigenvalues, vectors = np.linalg.eigh(z.T @ z)
+    keep = eigenvalues > _EIGEN_TOL * max(eigenvalues[-1], 0.0)
+    return eigenvalues[keep], vectors[:, keep].T
+
+
+def _precision(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Low-rank-plus-shrinkage inverse of the shrunk correlation of ``z``.
+
+    The inverse of ``a * I + b * V diag(l) V'`` is
+    ``V diag(1 / (a + b * l)) V' + (I - VV') / a``, which takes k x p
+    numbers for k <= min(n, p) instead of p x p.
+
+    Returns:
+        Tuple: (k, p) basis ``V``, (k,) weights ``1 / (a + b * l)`` and the
+            weight ``1 / a`` of the residual outside the basis
+    """
+    eigenvalues, basis = _eigen(z)
+    row_norms = np.einsum('ij,ij->i', z, z)
+    a, b = _shrinkage(row_norms.sum(), np.sum(eigenvalues ** 2), np.sum(row_norms ** 2), *z.shape)
+    return basis, 1.0 / (a + b * eigenvalues), 1.0 / a
+
+
+def _mahalanobis(z: np.ndarray, basis: np.ndarray, weights: np.ndarray, residual: float) -> np.ndarray:
+    """Squared Mahalanobis distances of (m, p) standardized rows under a ``_precision`` factorization"""
+    projected = z @ basis.T
+    outside = z - projected @ basis
+    return np.sum(projected ** 2 * weights, axis=1) + residual * np.sum(outside ** 2, axis=1)
+
+
+def _leave_one_out(z: np.ndarray, held_out: np.ndarray) -> np.ndarray:
+    """
+    Squared distances of rows of ``z`` to norms built without them.
+
+    Removing row ``k`` from centered data changes the scatter matrix by the
+    rank one term ``n / (n - 1) * z_k z_k'`` and moves ``z_k`` to
+    ``n / (n - 1) * z_k`` from the new mean, so with the shrinkage ``(a, b)``
+    recomputed for the reduced sample the distance follows from
+    ``h = z_k' (a * I + b * Z'Z)^-1 z_k`` by Sherman-Morrison as
+    ``c^2 * h / (1 - b * c * h)`` with ``c = n / (n - 1)``. Only the
+    eigenpairs of the full sample and one Gram column per row are needed;
+    the features stay scaled by the standard deviations of the full sample.
+
+    Args:
+        z: (n, p) standardized, centered reference rows
+        held_out: Indices of the rows to score
+
+    Returns:
+        np.ndarray: Squared distance per held-out row
+    """
+    n, p = z.shape
+    c = n / (n - 1)
+    eigenvalues, basis = _eigen(z)
+    row_norms = np.einsum('ij,ij->i', z, z)
+    trace, frobenius = row_norms.sum(), np.sum(eigenvalues ** 2)
+    d2 = np.empty(len(held_out))
+    for i, k in enumerate(held_out):
+        gram = z @ z[k]
+        # Squared norms of the other rows around their own mean, and the
+        # spectrum sums of their scatter matrix after the rank one downdate
+        others = np.delete(row_norms + 2.0 * gram / (n - 1) + row_norms[k] / (n - 1) ** 2, k)
+        loo_trace = trace - c * row_norms[k]
+        loo_frobenius = frobenius - 2.0 * c * np.sum(gram ** 2) + c * c * row_norms[k] ** 2
+        a, b = _shrinkage(loo_trace, loo_frobenius, np.sum(others ** 2), n - 1, p)
+        h = _mahalanobis(z[k][None, :], basis, 1.0 / (a + b * eigenvalues), 1.0 / a)[0]
+        d2[i] = c * c * h / (1.0 - b * c * h)
+    return d2
+
+
+@dataclass
+class QEEGNorms:
+    """Age-binned means, SDs and low-rank inverse correlations of transformed features"""
+    feature_names: List[str]
+    transforms: List[str]
+    groups: Dict[str, np.ndarray]
+    age_bins: np.ndarray
+    n: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    basis: Dict[str, np.ndarray]
+    weights: Dict[str, np.ndarray]
+    residual: Dict[str, np.ndarray]
+    reference_d2: Dict[str, List[np.ndarray]]
+    min_bin_size: int = DEFAULT_MIN_BIN_SIZE
+
+    @classmethod
+    def from_vectors(cls, vectors: pd.DataFrame, ages: Sequence[float],
+                     age_bins: Sequence[float] = DEFAULT_AGE_BINS,
+                     min_bin_size: int = DEFAULT_MIN_BIN_SIZE) -> 'QEEGNorms':
+        """
+        Build norms from raw feature vectors of the reference recordings.
+
+        Row 0 of the statistics holds the overall norms and row ``i + 1``
+        the bin ``[age_bins[i], age_bins[i + 1])``.
+
+        Args:
+            vectors: One row per recording, one column per flattened feature
+                (columns with missing values are dropped)
+            ages: Age in years per row
+            age_bins: Increasing bin edges
+            min_bin_size: Smallest bin used before falling back to the overall norms
+
+        Returns:
+            QEEGNorms: Norms over the complete feature columns
+        """
+        complete = vectors.columns[vectors.notna().all(axis=0)]
+        if len(complete) < len(vectors.columns):
+            logger.warning(f"Dropping {len(vectors.columns) - len(complete)} features missing "
+                           f"from some reference recordings")
+        names = list(complete)
+        transforms = [FEATURE_TRANSFORMS.get(name.split('.', 1)[0], 'none') for name in names]
+        values = transform_features(vectors[names].to_numpy(), transforms)
+        ages = np.asarray(ages, dtype=np.float64)
+        age_bins = np.asarray(age_bins, dtype=np.float64)
+        bin_index = np.digitize(ages, age_bins) - 1
+        group_names = [name.split('.', 1)[0] for name in names]
+        groups = {g: np.flatnonzero(np.array(group_names) == g) for g in dict.fromkeys(group_names)}
+
+        n_rows, n_features = len(age_bins), len(names)
+        n = np.zeros(n_rows, dtype=np.int64)
+        mean = np.full((n_rows, n_features), np.nan)
+        std = np.full((n_rows, n_features), np.nan)
+        factors = {g: [None] * n_rows for g in groups}
+        reference_d2 = {g: [np.empty(0)] * n_rows for g in groups}
+        for row in range(n_rows):
+            members = np.ones(len(ages), dtype=bool) if row == 0 else bin_index == row - 1
+            n[row] = np.count_nonzero(members)
+            if n[row] < 2:
+                continue
+            sample = values[members]
+            mean[row], std[row] = sample.mean(axis=0), sample.std(axis=0, ddof=1)
+            z = (sample - mean[row]) / np.where(std[row] > 0, std[row], 1.0)
+            # Leave-one-out distances, so reference recordings are scored
+            # like new ones (in-sample distances are biased low when the
+            # bin has few recordings per feature)
+            held_out = np.arange(len(sample))
+            if held_out.size > MAX_REFERENCE_DISTANCES:
+                held_out = np.random.default_rng(row).choice(held_out, MAX_REFERENCE_DISTANCES, replace=False)
+            for g, idx in groups.items():
+                factors[g][row] = _precision(z[:, idx])
+                if n[row] > 2:
+                    reference_d2[g][row] = np.sort(_leave_one_out(z[:, idx], held_out))
+
+        basis, weights, residual = {}, {}, {}
+        for g, idx in groups.items():
+            rank = max((f[1].size for f in factors[g] if f is not None), default=0)
+            basis[g] = np.zeros((n_rows, rank, len(idx)))
+            weights[g] = np.zeros((n_rows, rank))
+            residual[g] = np.full(n_rows, np.nan)
+            for row, factor in enumerate(factors[g]):
+                if factor is not None:
+                    k = factor[1].size
+                    basis[g][row, :k], weights[g][row, :k], residual[g][row] = factor
+        logger.info(f"Built qEEG norms over {len(ages)} recordings and {n_features} features "
+                    f"({', '.join(f'{g}: {len(idx)}' for g, idx in groups.items())})")
+        return cls(names, transforms, groups, age_bins, n, mean, std, basis, weights, residual,
+                   reference_d2, min_bin_size)
+
+    @classmethod
+    def from_directory(cls, feature_dir: Union[str, Path],
+                       ages: Optional[Union[Dict[str, float], str, Path]] = None,
+                       ch_names: Optional[Sequence[str]] = None,
+                       **kwargs) -> 'QEEGNorms':
+        """
+        Build norms from every exported ``features.json.gz`` below a directory.
+
+        Each recording is identified by the path of its directory relative
+        to ``feature_dir``; its age comes from ``ages`` or else from the
+        ``attributes.json`` written beside the features on export, which
+        also holds the channel names.
+
+        Args:
+            feature_dir: Directory searched recursively
+            ages: Mapping or CSV (``participant_id``, ``Age`` columns) of ages
+                per recording ID
+            ch_names: Channel names labelling per-channel features
+                (default: those in ``attributes.json``)
+            **kwargs: Passed on to ``from_vectors``
+
+        Returns:
+            QEEGNorms: Norms over the recordings with a known age
+        """
+        feature_dir = Path(feature_dir)
+        if isinstance(ages, (str, Path)):
+            table = pd.read_csv(ages, dtype={'participant_id': str})
+            ages = dict(zip(table['participant_id'], table['Age']))
+        ages = ages or {}
+        rows, row_ages = {}, []
+        for path in sorted(feature_dir.rglob(FEATURES_FILE)):
+            recording_id = path.parent.relative_to(feature_dir).as_posix()
+            attributes = {}
+            if (path.parent / ATTRIBUTES_FILE).exists():
+                with open(path.parent / ATTRIBUTES_FILE) as f:
+                    attributes = json.load(f)
+            age = ages.get(recording_id, attributes.get('Age'))
+            if age is None:
+                logger.warning(f"Skipping {path}: no age for recording {recording_id}")
+                continue
+            with gzip.open(path, 'rt') as f:
+                rows[recording_id] = feature_vector(json.load(f), ch_names or attributes.get('ch_names'))
+            row_ages.append(float(age))
+        if not rows:
+            raise ValueError(f"No exported features with known ages under {feature_dir}")
+        return cls.from_vectors(pd.DataFrame.from_dict(rows, orient='index'), row_ages, **kwargs)
+
+    def save(self, file_path: Union[str, Path]):
+        """Persist the norms as float32 arrays in a single .npz file"""
+        meta = {'feature_names': self.feature_names, 'transforms': self.transforms,
+                'groups': list(self.groups), 'min_bin_size': self.min_bin_size}
+        arrays = {'age_bins': self.age_bins, 'n': self.n,
+                  'mean': self.mean.astype(np.float32), 'std': self.std.astype(np.float32)}
+        for i, g in enumerate(self.groups):
+            arrays[f'group_{i}'] = self.groups[g]
+            arrays[f'basis_{i}'] = self.basis[g].astype(np.float32)
+            arrays[f'weights_{i}'] = self.weights[g].astype(np.float32)
+            arrays[f'residual_{i}'] = self.residual[g].astype(np.float32)
+            lengths = [d2.size for d2 in self.reference_d2[g]]
+            arrays[f'reference_d2_{i}'] = np.concatenate(self.reference_d2[g]).astype(np.float32)
+            arrays[f'reference_offsets_{i}'] = np.concatenate([[0], np.cumsum(lengths)])
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> 'QEEGNorms':
+        """Load norms written by ``save``"""
+        with np.load(file_path) as npz:
+            meta = json.loads(str(npz['meta']))
+            groups, basis, weights, residual, reference_d2 = {}, {}, {}, {}, {}
+            for i, g in enumerate(meta['groups']):
+                groups[g] = npz[f'group_{i}']
+                basis[g], weights[g] = npz[f'basis_{i}'], npz[f'weights_{i}']
+                residual[g] = npz[f'residual_{i}']
+                values, offsets = npz[f'reference_d2_{i}'], npz[f'reference_offsets_{i}']
+                reference_d2[g] = [values[offsets[j]:offsets[j + 1]] for j in range(len(offsets) - 1)]
+            return cls(meta['feature_names'], meta['transforms'], groups, npz['age_bins'], npz['n'],
+                       npz['mean'], npz['std'], basis, weights, residual, reference_d2,
+                       meta['min_bin_size'])
+
+    def rows_for(self, ages: Sequence[float]) -> np.ndarray:
+        """Statistics row per age: its bin when large enough, else the overall norms (row 0)"""
+        ages = np.asarray(ages, dtype=np.float64)
+        rows = np.digitize(ages, self.age_bins)
+        valid = (rows >= 1) & (rows < len(self.age_bins)) & np.isfinite(ages)
+        rows = np.where(valid, rows, 0)
+        return np.where(self.n[rows] >= self.min_bin_size, rows, 0)
+
+    def vectorize(self, features: Sequence[Dict], ch_names: Optional[Sequence[str]] = None) -> np.ndarray:
+        """(n_recordings, n_features) raw values in norm feature order (NaN where missing)"""
+        index = {name: i for i, name in enumerate(self.feature_names)}
+        values = np.full((len(features), len(index)), np.nan)
+        for row, recording in enumerate(features):
+            for name, value in feature_vector(recording, ch_names, self.groups).items():
+                column = index.get(name)
+                if column is not None:
+                    values[row, column] = value
+        return values
+
+    def score(self, values: np.ndarray, ages: Sequence[float]) -> Dict:
+        """
+        Z-score feature vectors against the norms of their age.
+
+        Args:
+            values: (n_recordings, n_features) raw values in ``feature_names``
+                order, e.g. from ``vectorize``
+            ages: Age in years per recording
+
+        Returns:
+            Dict: ``z`` (n_recordings, n_features), the statistics ``row`` and
+                age bin used per recording, and per feature group the
+                squared Mahalanobis distance ``d2``, its ``percentile``
+                among the reference recordings and the empirical
+                ``p_value`` of a distance at least as large (NaN where a
+                feature of the group is missing)
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        rows = self.rows_for(ages)
+        std = self.std[rows].astype(np.float64)
+        z = (transform_features(values, self.transforms) - self.mean[rows]) / np.where(std > 0, std, np.nan)
+        result = {
+            'z': z, 'row': rows,
+            'age_bin': [None if r == 0 else (float(self.age_bins[r - 1]), float(self.age_bins[r])) for r in rows],
+            'mahalanobis': {}
+        }
+        for g, idx in self.groups.items():
+            d2 = np.empty(len(rows))
+            for r in np.unique(rows):
+                selected = rows == r
+                d2[selected] = _mahalanobis(z[np.ix_(selected, idx)], self.basis[g][r].astype(np.float64),
+                                            self.weights[g][r].astype(np.float64), float(self.residual[g][r]))
+            below = np.array([np.searchsorted(self.reference_d2[g][r], d, side='right') for r, d in zip(rows, d2)])
+            n_reference = np.array([self.reference_d2[g][r].size for r in rows])
+            missing = ~np.isfinite(d2) | (n_reference == 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentile = np.where(missing, np.nan, 100.0 * below / n_reference)
+            result['mahalanobis'][g] = {
+                'd2': d2,
+                'p_value': np.where(missing, np.nan, (n_reference - below + 1.0) / (n_reference + 1.0)),
+                'percentile': percentile
+            }
+        return result
+
+    def score_features(self, features: Dict, age: float, ch_names: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Score one ``extract_features`` result in JSON-ready form.
+
+        Returns:
+            Dict: ``z`` by feature name, the age bin used and per-group
+                Mahalanobis summaries
+        """
+        scored = self.score(self.vectorize([features], ch_names), [age])
+        z = scored['z'][0]
+        return {
+            'z': {name: (None if np.isnan(v) else float(v)) for name, v in zip(self.feature_names, z)},
+            'age_bin': scored['age_bin'][0],
+            'n_reference': int(self.n[scored['row'][0]]),
+            'mahalanobis': {
+                g: {name: (None if np.isnan(v[0]) else float(v[0])) for name, v in summary.items()}
+                for g, summary in scored['mahalanobis'].items()
+            }
+        }
+
+
+@lru_cache(maxsize=4)
+def _load_cached(file_path: str, mtime_ns: int, size: int) -> QEEGNorms:
+    logger.info(f"Loading qEEG norms from {file_path}")
+    return QEEGNorms.load(file_path)
+
+
+def load_qeeg_norms(file_path: Union[str, Path]) -> QEEGNorms:
+    """Load persisted qEEG norms through an LRU cache keyed by path, mtime and size"""
+    stat = os.stat(file_path)
+    return _load_cached(str(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def build_qeeg_norms(feature_dir: Union[str, Path], output_path: Union[str, Path],
+                     **kwargs) -> QEEGNorms:
+    """Build qEEG norms from a directory of exported features and persist them"""
+    norms = QEEGNorms.from_directory(feature_dir, **kwargs)
+    norms.save(output_path)
+    return norms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Build norms from a directory of exported features')
+    build.add_argument('feature_dir', help='Directory searched recursively for features.json.gz files')
+    build.add_argument('output', help='Norms file to write (.npz)')
+    build.add_argument('--ages', help='CSV with participant_id and Age columns')
+    build.add_argument('--age-bins', type=float, nargs='+', default=DEFAULT_AGE_BINS)
+    build.add_argument('--min-bin-size', type=int, default=DEFAULT_MIN_BIN_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    norms = build_qeeg_norms(args.feature_dir, args.output, ages=args.ages,
+                             age_bins=args.age_bins, min_bin_size=args.min_bin_size)
+    print(f"Wrote norms over {norms.n[0]} recordings and {len(norms.feature_names)} features to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
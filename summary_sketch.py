@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Incremental Mergeable Summary Statistics
+
+Keeps ``DataFrame.describe()``-style summaries of growing tabular datasets
+(e.g. psychometric responses) without revisiting old rows:
+1. Per column, count/mean/M2/min/max moments merge exactly with the
+   pairwise update of Chan et al.
+2. Per column, a KLL quantile sketch (Karnin, Lang & Liberty, 2016) keeps
+   O(k log n) weighted items; quartiles have a rank error of about
+   ``1.7 / k`` and sketches of separate batches or workers merge
+3. Sketches exist for the whole dataset and for every value of each
+   grouping column (e.g. Test_Type, Testing_Environment), so updates cost
+   O(batch) and summaries are read without touching the data
+4. Summaries persist to one .npz per dataset; ``SummaryStore`` updates them
+   under a file lock so several workers can ingest batches concurrently
+
+Author: MVT Nexus Team
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# KLL accuracy parameter: capacity of the top compactor
+DEFAULT_K = 200
+
+# Capacity ratio between consecutive compactor levels
+KLL_DECAY = 2.0 / 3.0
+
+# Rows of a summary, as in DataFrame.describe()
+SUMMARY_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+# Key of the whole-dataset summary (grouped summaries are (column, value))
+OVERALL = ('', '')
+
+_DATASET_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+class KLLSketch:
+    """Mergeable quantile sketch: level ``h`` holds items of weight ``2 ** h``"""
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        return max(2, int(np.ceil(self.k * KLL_DECAY ** (len(self.levels) - 1 - level))))
+
+    def _compress(self):
+        """Compact full levels, promoting every other sorted item with doubled weight"""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size <= self._capacity(level):
+                level += 1
+                continue
+            items = np.sort(items)
+            # An odd item stays behind so weights are conserved exactly
+            keep = items[-1:] if items.size % 2 else items[:0]
+            pairs = items[:items.size - keep.size]
+            promoted = pairs[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Adding a level lowers the capacities below it
+            level = 0 if level + 2 == len(self.levels) else level + 1
+
+    def update(self, values: np.ndarray) -> 'KLLSketch':
+        """Add a batch of values (NaNs are ignored)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += values.size
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Add the items of another sketch (same ``k``)"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: Union[float, Sequence[float]]) -> np.ndarray:
+        """
+        Approximate quantiles (exact until the first compaction).
+
+        Args:
+            q: Quantile(s) in [0, 1]
+
+        Returns:
+            np.ndarray: Quantiles interpolated between retained items by
+                weighted rank (NaN for an empty sketch)
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        # Each item sits at the centre of the ranks it stands for; with unit
+        # weights this is pandas' linear interpolation
+        ranks = cumulative - (weights[order] + 1.0) / 2.0
+        return np.interp(q * (cumulative[-1] - 1.0), ranks, items[order])
+
+    def state(self) -> Tuple[Dict, np.ndarray]:
+        """JSON-ready metadata and the concatenated items"""
+        meta = {'k': self.k, 'n': self.n, 'sizes': [len(l) for l in self.levels],
+                'rng': self._rng.bit_generator.state}
+        return meta, np.concatenate(self.levels)
+
+    @classmethod
+    def from_state(cls, meta: Dict, items: np.ndarray) -> 'KLLSketch':
+        """Rebuild a sketch saved with ``state``"""
+        sketch = cls(meta['k'])
+        sketch.n = meta['n']
+        offsets = np.concatenate([[0], np.cumsum(meta['sizes'])])
+        sketch.levels = [items[offsets[i]:offsets[i + 1]].copy() for i in range(len(meta['sizes']))]
+        sketch._rng.bit_generator.state = meta['rng']
+        return sketch
+
+
+@dataclass
+class ColumnSketch:
+    """Exact moments and a quantile sketch of one column"""
+    count: int
+    mean: float
+    m2: float
+    minimum: float
+    maximum: float
+    quantiles: KLLSketch
+
+    @classmethod
+    def empty(cls, k: int = DEFAULT_K, seed: Optional[int] = None) -> 'ColumnSketch':
+        return cls(0, 0.0, 0.0, np.inf, -np.inf, KLLSketch(k, seed))
+
+    def merge_moments(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        """Combine with the moments of another batch (Chan et al.)"""
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.minimum, self.maximum = min(self.minimum, minimum), max(self.maximum, maximum)
+
+    def merge(self, other: 'ColumnSketch') -> 'ColumnSketch':
+        """Combine with the sketch of other rows"""
+        self.merge_moments(other.count, other.mean, other.m2, other.minimum, other.maximum)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def describe(self) -> List[float]:
+        """Values in ``SUMMARY_INDEX`` order (sample standard deviation)"""
+        if self.count == 0:
+            return [0] + [np.nan] * 7
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        return [self.count, self.mean, std, self.minimum, *self.quantiles.quantile([0.25, 0.5, 0.75]),
+                self.maximum]
+
+
+class DatasetSummary:
+    """Column sketches for a whole dataset and for each value of its grouping columns"""
+
+    def __init__(self, group_by: Sequence[str] = (), columns: Optional[Sequence[str]] = None,
+                 k: int = DEFAULT_K, seed: int = 0):
+        """
+        Args:
+            group_by: Columns whose values get their own summaries
+            columns: Numeric columns to summarize (default: every numeric
+                column of the batches except the grouping columns)
+            k: KLL accuracy parameter
+            seed: Seed of the sketch compaction coins
+        """
+        self.group_by = list(group_by)
+        self.columns = list(columns) if columns is not None else None
+        self.k = k
+        self.seed = seed
+        self.sketches: Dict[Tuple[str, str], Dict[str, ColumnSketch]] = {}
+        self.n_rows = 0
+
+    def _sketch(self, key: Tuple[str, str], column: str) -> ColumnSketch:
+        sketches = self.sketches.setdefault(key, {})
+        if column not in sketches:
+            # Deterministic per-sketch coins, so equal inputs give equal summaries
+            seed = [self.seed, len(self.sketches), len(sketches)]
+            sketches[column] = ColumnSketch.empty(self.k, np.random.SeedSequence(seed).generate_state(1)[0])
+        return sketches[column]
+
+    def _numeric_columns(self, batch: pd.DataFrame) -> List[str]:
+        if self.columns is not None:
+            return [c for c in self.columns if c in batch.columns]
+        return [c for c in batch.select_dtypes(include='number').columns if c not in self.group_by]
+
+    def _add(self, key: Tuple[str, str], columns: List[str], values: np.ndarray):
+        """Fold a (rows, columns) block into the sketches of one group"""
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nansum(values, axis=0) / count
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+            minimum, maximum = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        for i, column in enumerate(columns):
+            sketch = self._sketch(key, column)
+            if count[i]:
+                sketch.merge_moments(int(count[i]), mean[i], m2[i], minimum[i], maximum[i])
+                sketch.quantiles.update(values[valid[:, i], i])
+
+    def update(self, batch: pd.DataFrame) -> 'DatasetSummary':
+        """
+        Add a batch of rows.
+
+        Args:
+            batch: New rows; grouping columns may be of any type
+
+        Returns:
+            DatasetSummary: self
+        """
+        columns = self._numeric_columns(batch)
+        if not len(batch) or not columns:
+            return self
+        values = batch[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        self._add(OVERALL, columns, values)
+        for group_column in self.group_by:
+            if group_column not in batch.columns:
+                continue
+            codes, uniques = pd.factorize(batch[group_column])
+            for code, value in enumerate(uniques):
+                self._add((group_column, str(value)), columns, values[codes == code])
+        self.n_rows += len(batch)
+        return self
+
+    def merge(self, other: 'DatasetSummary') -> 'DatasetSummary':
+        """Add the summaries of other rows (e.g. from another worker)"""
+        if other.group_by != self.group_by:
+            raise ValueError("Cannot merge summaries with different grouping columns")
+        for key, sketches in other.sketches.items():
+            for column, sketch in sketches.items():
+                self._sketch(key, column).merge(sketch)
+        self.n_rows += other.n_rows
+        return self
+
+    def groups(self) -> Dict[str, List[str]]:
+        """Values seen per grouping column"""
+        return {column: [value for c, value in self.sketches if c == column] for column in self.group_by}
+
+    def describe(self, group: Optional[Tuple[str, str]] = None) -> pd.DataFrame:
+        """
+        Summary in the layout of ``DataFrame.describe()``.
+
+        Args:
+            group: (grouping column, value), or None for the whole dataset
+
+        Returns:
+            pd.DataFrame: One column per summarized column
+        """
+        sketches = self.sketches.get(group or OVERALL)
+        if sketches is None:
+            raise KeyError(f"No rows for group {group}")
+        return pd.DataFrame({column: sketch.describe() for column, sketch in sketches.items()},
+                            index=SUMMARY_INDEX)
+
+    def to_dict(self, group_by: Optional[str] = None) -> Dict:
+        """JSON-ready summaries of the whole dataset, or of every value of one grouping column"""
+        def table(key):
+            frame = self.describe(key).astype(object).where(self.describe(key).notna(), None)
+            return frame.to_dict()
+        if group_by is None:
+            return {'n_rows': self.n_rows, 'summary': table(OVERALL)}
+        if group_by not in self.group_by:
+            raise KeyError(f"Not a grouping column: {group_by}")
+        return {'n_rows': self.n_rows, 'group_by': group_by,
+                'groups': {value: table((group_by, value)) for value in self.groups()[group_by]}}
+
+    def save(self, file_path: Union[str, Path]):
+        """Persist all sketches to a single .npz file"""
+        entries, items = [], []
+        for (group_column, value), sketches in self.sketches.items():
+            for column, sketch in sketches.items():
+                kll_meta, kll_items = sketch.quantiles.state()
+                entries.append({'group': [group_column, value], 'column': column, 'kll': kll_meta,
+                                'moments': [sketch.count, sketch.mean, sketch.m2, sketch.minimum, sketch.maximum]})
+                items.append(kll_items)
+        meta = {'group_by': self.group_by, 'columns': self.columns, 'k': self.k, 'seed': self.seed,
+                'n_rows': self.n_rows, 'entries': entries}
+        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f'{file_path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)),
+                     items=np.concatenate(items) if items else np.empty(0),
+                     offsets=np.concatenate([[0], np.cumsum([i.size for i in items])]))
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: Union[str, Path]) -> 'DatasetSummary':
+        """Load sketches written by ``save``"""
+        with np.load(file_path) as npz:
+            meta = json.loads(str(npz['meta']))
+            items, offsets = npz['items'], npz['offsets']
+        summary = cls(meta['group_by'], meta['columns'], meta['k'], meta['seed'])
+        summary.n_rows = meta['n_rows']
+        for i, entry in enumerate(meta['entries']):
+            count, mean, m2, minimum, maximum = entry['moments']
+            quantiles = KLLSketch.from_state(entry['kll'], items[offsets[i]:offsets[i + 1]])
+            summary.sketches.setdefault(tuple(entry['group']), {})[entry['column']] = ColumnSketch(
+                int(count), mean, m2, minimum, maximum, quantiles)
+        return summary
+
+
+@lru_cache(maxsize=16)
+def _load_cached(file_path: str, mtime_ns: int, size: int) -> DatasetSummary:
+    return DatasetSummary.load(file_path)
+
+
+class SummaryStore:
+    """Persisted dataset summaries under one directory, updated under a file lock"""
+
+    def __init__(self, directory: Union[str, Path], group_by: Sequence[str] = (), k: int = DEFAULT_K):
+        """
+        Args:
+            directory: Directory holding one ``<dataset>.npz`` per dataset
+            group_by: Grouping columns of newly created datasets
+            k: KLL accuracy parameter of newly created datasets
+        """
+        self.directory = Path(directory)
+        self.group_by = list(group_by)
+        self.k = k
+
+    def path(self, dataset: str) -> Path:
+        if not _DATASET_NAME.match(dataset):
+            raise ValueError(f"Invalid dataset name: {dataset!r}")
+        return self.directory / f'{dataset}.npz'
+
+    @contextmanager
+    def _locked(self, dataset: str) -> Iterator[Path]:
+        path = self.path(dataset)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(f'{path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield path
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def update(self, dataset: str, batch: pd.DataFrame) -> DatasetSummary:
+        """Fold a batch of rows into a dataset's summary (created on first use)"""
+        with self._locked(dataset) as path:
+            summary = (DatasetSummary.load(path) if path.exists()
+                       else DatasetSummary(self.group_by, k=self.k))
+            summary.update(batch)
+            summary.save(path)
+        logger.info(f"Added {len(batch)} rows to summary {dataset} ({summary.n_rows} rows)")
+        return summary
+
+    def get(self, dataset: str) -> DatasetSummary:
+        """Current summary of a dataset (cached until the file changes)"""
+        path = self.path(dataset)
+        if not path.exists():
+            raise KeyError(f"No summary for dataset {dataset}")
+        stat = os.stat(path)
+        return _load_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+    def datasets(self) -> List[str]:
+        """Names of the summarized datasets"""
+        return sorted(p.stem for p in self.directory.glob('*.npz'))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from artifact_index import Annotation, ArtifactIndex
+
+EXAMPLE_CSV = 'docs/examples/artifacts.csv'
+
+@pytest.fixture
+def index():
+    return ArtifactIndex.from_csv(EXAMPLE_CSV)
+
+def test_from_csv_loads_all_rows(index):
+    assert len(index) == 3
+    assert index.channels == ['All', 'C3', 'Fp1']
+
+def test_overlaps_by_channel(index):
+    assert index.overlaps(0.8, 0.9, 'Fp1')
+    assert not index.overlaps(0.8, 0.9, 'C3')
+    # Global "All" spans hit every channel
+    assert index.overlaps(2.9, 3.5, 'O2')
+    # Intervals are half-open
+    assert not index.overlaps(1.0, 2.5)
+
+def test_windows_overlap_matches_brute_force():
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 100, 200)
+    ends = starts + rng.uniform(0.01, 2, 200)
+    index = ArtifactIndex(Annotation(s, e, 'Cz') for s, e in zip(starts, ends))
+
+    tmins = rng.uniform(0, 100, 500)
+    tmaxs = tmins + rng.uniform(0.01, 1, 500)
+    expected = [np.any((starts < b) & (ends > a)) for a, b in zip(tmins, tmaxs)]
+    np.testing.assert_array_equal(index.windows_overlap(tmins, tmaxs, 'Cz'), expected)
+    assert not index.windows_overlap(tmins, tmaxs, 'Fz').any()
+
+def test_query_returns_overlapping_annotations(index):
+    hits = index.query(0.0, 3.0)
+    assert [a.type for a in hits] == ['Blink', 'Movement']
+    assert [a.type for a in index.query(0.0, 5.0, 'C3')] == ['Movement', 'Muscle']
+
+def test_sample_mask(index):
+    mask = index.sample_mask(n_times=1500, sfreq=256, ch_names=['Fp1', 'O1'])
+    times = np.arange(1500) / 256
+    np.testing.assert_array_equal(
+        mask[0], ((times >= 0.5) & (times < 1.0)) | ((times >= 2.5) & (times < 3.0)))
+    np.testing.assert_array_equal(mask[1], (times >= 2.5) & (times < 3.0))
+    any_channel = index.sample_mask(1500, 256)
+    np.testing.assert_array_equal(any_channel, mask[0] | ((times >= 4.5) & (times < 5.0)))
+
+def test_clean_windows_skip_contaminated(index):
+    starts = index.clean_windows(n_times=6 * 256, sfreq=256, window_samples=256)
+    np.testing.assert_array_equal(starts // 256, [1, 3, 5])
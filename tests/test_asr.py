@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from asr import ASR, find_clean_segment
+from pipeline_spec import PipelineSpec
+
+SFREQ = 256
+
+
+@pytest.fixture(scope='module')
+def recording():
+    rng = np.random.default_rng(0)
+    n_channels, n_times = 16, SFREQ * 60
+    eeg = rng.standard_normal((n_channels, n_channels)) @ rng.standard_normal((n_channels, n_times)) * 10
+    data = eeg.copy()
+    bursts = np.zeros(n_times, dtype=bool)
+    pattern = rng.standard_normal(n_channels)
+    for start in range(SFREQ * 30, n_times, SFREQ * 10):
+        data[:, start:start + 128] += np.outer(pattern, 400 * np.hanning(128))
+        bursts[start:start + 128] = True
+    return eeg, data, bursts
+
+
+@pytest.fixture(scope='module')
+def cleaner(recording):
+    _, data, _ = recording
+    return ASR(SFREQ).calibrate(find_clean_segment(data, SFREQ))
+
+
+def test_calibration_segment_skips_bursts(recording):
+    _, data, bursts = recording
+    reference = find_clean_segment(data, SFREQ)
+    assert reference.shape[1] == SFREQ * 60 - SFREQ * 3
+    masked = find_clean_segment(data, SFREQ, mask=np.arange(data.shape[1]) < SFREQ * 10)
+    assert masked.shape[1] == reference.shape[1] - SFREQ * 10
+
+
+def test_bursts_are_removed_and_clean_data_kept(recording, cleaner):
+    eeg, data, bursts = recording
+    cleaned = cleaner.clean(data)
+    error = lambda x, mask: np.sqrt(np.mean((x - eeg)[:, mask] ** 2))
+    assert error(cleaned, bursts) < 0.1 * error(data, bursts)
+    far = ~np.convolve(bursts, np.ones(SFREQ), mode='same').astype(bool)
+    np.testing.assert_allclose(cleaned[:, far], data[:, far])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000])
+def test_output_independent_of_block_size_and_in_place(recording, cleaner, chunk_size):
+    _, data, _ = recording
+    expected = cleaner.clean(data, chunk_size=4096)
+    in_place = data.copy()
+    cleaner.clean(in_place, chunk_size=chunk_size, out=in_place)
+    np.testing.assert_allclose(in_place, expected, atol=1e-9)
+
+
+def test_online_stream_releases_whole_updates(recording):
+    _, data, _ = recording
+    online = ASR(SFREQ, lookahead=0).calibrate(find_clean_segment(data, SFREQ))
+    released = [online.transform(data[:, start:start + 100]) for start in range(0, 1000, 100)]
+    assert all(block.shape[1] % online.step == 0 for block in released)
+    stream = np.concatenate(released + [online.flush()], axis=1)
+    np.testing.assert_allclose(stream, online.clean(data[:, :1000]), atol=1e-9)
+
+
+def test_errors_and_pipeline_stage():
+    with pytest.raises(RuntimeError):
+        ASR(SFREQ).transform(np.zeros((4, 10)))
+    with pytest.raises(ValueError):
+        ASR(SFREQ).calibrate(np.zeros((4, 100)))
+    spec = PipelineSpec.from_dict({'stages': ['bandpass', {'name': 'asr', 'params': {'cutoff': 10}}]})
+    assert spec.stage('asr').params == {'cutoff': 10, 'window': 0.5, 'calibration_start': None,
+                                        'calibration_end': None}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from bad_channels import find_bad_channels_eeg, interpolation_matrix
+
+SFREQ = 256.0
+N_CHANNELS = 32
+
+def _sphere_positions(n):
+    # Upper hemisphere, roughly uniform (Fibonacci lattice)
+    i = np.arange(n) + 0.5
+    z = i / n
+    theta = np.pi * (1 + 5 ** 0.5) * i
+    r = np.sqrt(1 - z ** 2)
+    return 0.09 * np.column_stack([r * np.cos(theta), r * np.sin(theta), z])
+
+@pytest.fixture
+def recording():
+    rng = np.random.default_rng(0)
+    pos = _sphere_positions(N_CHANNELS)
+    n_times = int(60 * SFREQ)
+    # Spatially smooth sources so neighbouring channels are predictable
+    mixing = np.column_stack([np.ones(N_CHANNELS), pos * 10, (pos[:, 0] * pos[:, 1]) * 100])
+    data = mixing @ rng.standard_normal((5, n_times))
+    data += 0.05 * rng.standard_normal(data.shape)
+    data[3] = 0.0                                   # flat
+    data[7] *= 25                                   # deviant amplitude
+    data[12] = rng.standard_normal(n_times)         # uncorrelated with neighbours
+    ch_names = [f'E{i}' for i in range(N_CHANNELS)]
+    return data * 1e-5, ch_names, pos
+
+def test_detects_each_kind_of_bad_channel(recording):
+    data, ch_names, pos = recording
+    report = find_bad_channels_eeg(data, SFREQ, ch_names, pos=pos)
+    assert report.flat == ['E3']
+    assert 'E7' in report.deviation
+    assert 'E12' in report.correlation
+    assert report.ransac == ['E12']
+    assert report.bads == ['E3', 'E7', 'E12']
+
+def test_window_subsampling_is_deterministic(recording):
+    data, ch_names, pos = recording
+    first = find_bad_channels_eeg(data, SFREQ, ch_names, pos=pos, max_windows=20)
+    second = find_bad_channels_eeg(data, SFREQ, ch_names, pos=pos, max_windows=20)
+    assert first == second
+    assert 'E12' in first.bads
+
+def test_interpolation_matrix_is_cached_and_reproduces_smooth_fields():
+    pos = _sphere_positions(N_CHANNELS)
+    from_idx, to_idx = np.arange(0, N_CHANNELS, 2), np.arange(1, N_CHANNELS, 2)
+    matrix = interpolation_matrix(pos, from_idx, to_idx)
+    assert interpolation_matrix(pos, from_idx, to_idx) is matrix
+    field = 1.0 + pos[:, 0] * 10
+    np.testing.assert_allclose(matrix @ field[from_idx], field[to_idx], atol=0.05)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from channel_covariance import ChannelCovariance, CovarianceAccumulator, compute_channel_covariance
+
+BANDS = {'alpha': (8.0, 13.0), 'beta': (13.0, 30.0)}
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((6, 6)) @ rng.standard_normal((6, 20_011)) + 5.0
+
+
+def test_matches_numpy_and_merges_in_any_order(data):
+    acc = compute_channel_covariance(data, chunk_size=1000)
+    np.testing.assert_allclose(acc.covariance(), np.cov(data, bias=True), atol=1e-12)
+    np.testing.assert_allclose(acc.correlation(), np.corrcoef(data), atol=1e-12)
+    halves = ChannelCovariance.from_chunk(data[:, 7000:]).merge(ChannelCovariance.from_chunk(data[:, :7000]))
+    np.testing.assert_allclose(halves.covariance(ddof=1), np.cov(data), atol=1e-12)
+
+
+def test_mask_and_windows(data):
+    mask = np.zeros(data.shape[1], dtype=bool)
+    mask[3000:4500] = True
+    acc = compute_channel_covariance(data, window=1000, mask=mask, chunk_size=777)
+    np.testing.assert_allclose(acc.covariance(), np.cov(data[:, ~mask], bias=True), atol=1e-12)
+    # Fully masked windows are not reported
+    assert [index for index, _ in acc.windows[None]] == [0, 1, 2, *range(4, 21)]
+    assert acc.windows[None][3][1].n == 500 and acc.windows[None][-1][1].n == 11
+    np.testing.assert_allclose(acc.window_correlations()[0], np.corrcoef(data[:, :1000]), atol=1e-12)
+
+
+def test_parallel_ranges_match_sequential_pass(data):
+    sequential = compute_channel_covariance(data, 256.0, BANDS, window=512, chunk_size=1000)
+    parallel = compute_channel_covariance(data, 256.0, BANDS, window=512, chunk_size=1000, n_jobs=4)
+    np.testing.assert_allclose(parallel.covariance(), sequential.covariance(), atol=1e-12)
+    for band in BANDS:
+        np.testing.assert_allclose(parallel.correlation(band), sequential.correlation(band), atol=1e-4)
+    assert parallel.window_correlations('beta').shape == sequential.window_correlations('beta').shape
+
+
+def test_band_correlations_separate_sources():
+    t = np.arange(256 * 60) / 256.0
+    rng = np.random.default_rng(1)
+    alpha, beta = np.sin(2 * np.pi * 10 * t), np.sin(2 * np.pi * 20 * t + 1)
+    data = np.stack([alpha + beta, alpha - beta, alpha]) + 0.05 * rng.standard_normal((3, t.size))
+    windows = []
+    acc = CovarianceAccumulator(3, 256.0, BANDS, window=256, on_window=lambda *args: windows.append(args))
+    for start in range(0, t.size, 1000):
+        acc.update(data[:, start:start + 1000])
+    acc.finish()
+    assert acc.correlation('alpha')[0, 1] > 0.95 and acc.correlation('beta')[0, 1] < -0.95
+    assert len(windows) == 60 * 3 and not acc.windows[None]
+
+
+def test_flat_channels_and_errors():
+    corr = ChannelCovariance.from_chunk(np.vstack([np.arange(10.0), np.zeros(10)])).correlation()
+    np.testing.assert_array_equal(corr, np.eye(2))
+    with pytest.raises(ValueError):
+        ChannelCovariance.empty(2).correlation()
+    with pytest.raises(ValueError):
+        CovarianceAccumulator(2, bands=BANDS)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from scipy import stats
+from channel_stats import ChannelMoments, compute_channel_moments
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(3)
+    return rng.gamma(2.0, size=(4, 10_007)) - 1.5
+
+def _reference(data):
+    return {
+        'variance': np.var(data, axis=1),
+        'peak_to_peak': np.ptp(data, axis=1),
+        'zero_crossings': np.sum(np.diff(np.signbit(data), axis=1), axis=1),
+        'kurtosis': stats.kurtosis(data, axis=1),
+        'skewness': stats.skew(data, axis=1),
+        'rms': np.sqrt(np.mean(np.square(data), axis=1))
+    }
+
+@pytest.mark.parametrize('chunk_size', [1, 333, 4096, 20_000])
+def test_chunked_pass_matches_full_array_statistics(data, chunk_size):
+    features = compute_channel_moments(data, chunk_size=chunk_size).to_features()
+    for name, expected in _reference(data).items():
+        np.testing.assert_allclose(features[name], expected, rtol=1e-9, atol=1e-12, err_msg=name)
+
+def test_float32_working_precision(data):
+    features = compute_channel_moments(data.astype(np.float32), dtype=np.float32).to_features()
+    for name, expected in _reference(data).items():
+        np.testing.assert_allclose(features[name], expected, rtol=1e-4, atol=1e-4, err_msg=name)
+
+def test_memmap_input(data, tmp_path):
+    mm = np.lib.format.open_memmap(tmp_path / 'data.npy', mode='w+', dtype=data.dtype, shape=data.shape)
+    mm[:] = data
+    features = compute_channel_moments(mm, chunk_size=1000).to_features()
+    np.testing.assert_allclose(features['kurtosis'], stats.kurtosis(data, axis=1), rtol=1e-9)
+
+def test_merge_of_windows_equals_whole(data):
+    left = ChannelMoments.from_chunk(data[:, :5000])
+    right = ChannelMoments.from_chunk(data[:, 5000:])
+    merged = left.merge(right).to_features()
+    whole = ChannelMoments.from_chunk(data).to_features()
+    for name in whole:
+        np.testing.assert_allclose(merged[name], whole[name], rtol=1e-9, err_msg=name)
+
+def test_empty_accumulator_raises():
+    with pytest.raises(ValueError, match='Empty data array'):
+        ChannelMoments.empty(3).to_features()
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from correlation_engine import (correlate, covariate_matrix, fdr_correction,
+                                feature_table, flatten_features)
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(11)
+    n = 120
+    covariates = pd.DataFrame({'Age': rng.uniform(18, 80, n),
+                               'Gender': rng.choice(['F', 'M'], n)})
+    features = pd.DataFrame(rng.standard_normal((n, 30)), columns=[f'f{i}' for i in range(30)])
+    features['f0'] += 0.05 * covariates['Age']
+    measures = pd.DataFrame(rng.standard_normal((n, 4)), columns=['Verbal', 'Memory', 'Speed', 'Openness'])
+    measures['Verbal'] += 0.8 * features['f1']
+    measures['Memory'] += 0.05 * covariates['Age']
+    return features, measures, covariates
+
+def test_matches_pairwise_pearson_and_spearman(data):
+    features, measures, _ = data
+    pearson = correlate(features, measures, n_permutations=0)
+    spearman = correlate(features, measures, method='spearman', n_permutations=0)
+    for f in ('f0', 'f1', 'f7'):
+        for m in measures:
+            r, p = stats.pearsonr(features[f], measures[m])
+            assert pearson.r.loc[f, m] == pytest.approx(r)
+            assert pearson.p.loc[f, m] == pytest.approx(p, rel=1e-6)
+            assert spearman.r.loc[f, m] == pytest.approx(stats.spearmanr(features[f], measures[m])[0])
+
+def test_partial_correlation_removes_shared_covariate(data):
+    features, measures, covariates = data
+    design = covariate_matrix(covariates, ['Age', 'Gender'])
+    plain = correlate(features, measures, n_permutations=0)
+    partial = correlate(features, measures, covariates=design, n_permutations=0)
+    assert abs(plain.r.loc['f0', 'Memory']) > 0.3
+    assert abs(partial.r.loc['f0', 'Memory']) < 0.2
+    assert partial.df == len(features) - 2 - 2
+    # Reference: correlation of OLS residuals
+    c = np.column_stack([np.ones(len(design)), design.to_numpy()])
+    residual = lambda v: v - c @ np.linalg.lstsq(c, v, rcond=None)[0]
+    expected = np.corrcoef(residual(features['f0'].to_numpy()), residual(measures['Memory'].to_numpy()))[0, 1]
+    assert partial.r.loc['f0', 'Memory'] == pytest.approx(expected)
+
+def test_max_statistic_permutation_controls_family_wise_error(data):
+    features, measures, covariates = data
+    result = correlate(features, measures, covariates=covariate_matrix(covariates, ['Age', 'Gender']),
+                       n_permutations=500, random_state=1)
+    assert result.p_fwer.loc['f1', 'Verbal'] == pytest.approx(1 / 501)
+    assert (result.p_fwer >= result.p).all().all()
+    significant = result.significant(correction='fwer')
+    assert list(significant[['feature', 'measure']].itertuples(index=False, name=None)) == [('f1', 'Verbal')]
+
+def test_fdr_matches_scipy():
+    p = np.random.default_rng(2).uniform(size=(20, 5)) ** 3
+    np.testing.assert_allclose(fdr_correction(p), stats.false_discovery_control(p.ravel()).reshape(p.shape))
+    np.testing.assert_allclose(fdr_correction(p, 'by'),
+                               stats.false_discovery_control(p.ravel(), method='by').reshape(p.shape))
+
+def test_feature_table_flattens_extract_features_output():
+    features = {'band_powers': {'alpha': [1.0, 2.0]}, 'statistical': {'kurtosis': [0.1, 0.2]}}
+    assert flatten_features(features, ['Fz', 'Cz']) == {
+        'band_powers.alpha.Fz': 1.0, 'band_powers.alpha.Cz': 2.0,
+        'statistical.kurtosis.Fz': 0.1, 'statistical.kurtosis.Cz': 0.2}
+    table = feature_table({'p1': features, 'p2': features}, ['Fz', 'Cz'])
+    assert table.shape == (2, 4) and table.index.name == 'Participant_ID'
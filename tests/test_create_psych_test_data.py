@@ -0,0 +1,59 @@
+import importlib.util
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+SCRIPT = 'docs/examples/scripts/create_psych_test_data.py'
+
+
+@pytest.fixture(scope='module')
+def gen():
+    spec = importlib.util.spec_from_file_location('create_psych_test_data', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_uuid4_format(gen):
+    ids = gen.uuid4_array(np.random.default_rng(0), 1000).to_pylist()
+    assert len(set(ids)) == 1000
+    assert all(re.fullmatch(r'[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}', i) for i in ids)
+
+
+def test_name_key_uses_whole_name(gen):
+    assert gen.name_key('cognitive_test_data') != gen.name_key('cognitive_retest')
+    assert gen.name_key('cognitive_test_data') == gen.name_key('cognitive_test_data')
+
+
+def test_chunked_output_deterministic_and_summarized(gen, tmp_path):
+    first = gen.generate('cognitive_test_data', gen.cognitive_chunk, 2500, tmp_path / 'a.csv', 'csv', 7, 1000)
+    gen.generate('cognitive_test_data', gen.cognitive_chunk, 2500, tmp_path / 'b.csv', 'csv', 7, 1000)
+    assert (tmp_path / 'a.csv').read_bytes() == (tmp_path / 'b.csv').read_bytes()
+
+    frame = pd.read_csv(tmp_path / 'a.csv')
+    assert len(frame) == 2500
+    assert frame['Participant_ID'].is_unique
+    assert set(frame['Testing_Environment']) == {'Lab', 'Remote', 'Clinical'}
+    expected = frame.describe()
+    moments = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(first.loc[moments, expected.columns], expected.loc[moments], rtol=1e-9)
+    # Quartiles come from KLL sketches: check their rank error
+    for column in expected.columns:
+        ranks = frame[column].rank(pct=True, method='average')
+        for q in [0.25, 0.5, 0.75]:
+            rank = np.interp(first.loc[f'{q:.0%}', column], np.sort(frame[column]), np.sort(ranks))
+            assert abs(rank - q) < 0.02
+
+
+def test_personality_items_and_parquet(gen, tmp_path):
+    gen.generate('personality_test_data', gen.personality_chunk, 1200, tmp_path / 'p.parquet', 'parquet', 42, 500)
+    frame = pq.read_table(tmp_path / 'p.parquet').to_pandas()
+    items = frame[[f'Item_{i + 1}' for i in range(100)]].to_numpy()
+    assert items.min() == 1 and items.max() == 5
+    # Items within a trait cluster correlate, across clusters they do not
+    corr = np.corrcoef(items[:, [0, 1, 20]].T)
+    assert corr[0, 1] > 0.6 and abs(corr[0, 2]) < 0.15
+    assert frame['Timestamp'].diff().dropna().eq(pd.Timedelta(minutes=30)).all()
@@ -0,0 +1,94 @@
+import io
+
+import mne
+import numpy as np
+import pytest
+
+import EEG
+from asr import ASR, find_clean_segment
+from live_frames import decode_block
+
+SFREQ = 128.0
+CHANNELS = ['Fp1', 'Fp2', 'C3', 'C4', 'O1', 'O2']
+
+
+@pytest.fixture
+def socket_client():
+    flask_client = EEG.app.test_client()
+    flask_client.post('/login', json={'username': 'admin', 'password': 'password'})
+    client = EEG.socketio.test_client(EEG.app, flask_test_client=flask_client)
+    yield client
+    client.disconnect()
+
+
+@pytest.fixture
+def block():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((len(CHANNELS), len(CHANNELS))) @ rng.standard_normal((len(CHANNELS), 8 * int(SFREQ)))
+
+
+def write_edf(path, data, sfreq, ch_names):
+    # Minimal EDF writer: one-second records of int16 samples spanning each channel's range
+    n_records = data.shape[1] // int(sfreq)
+    lo, hi = data.min(axis=1), data.max(axis=1)
+    field = lambda values, width: ''.join(str(v)[:width].ljust(width) for v in values)
+    n = len(ch_names)
+    header = (field(['0'], 8) + field(['X'], 80) + field(['X'], 80) + '01.01.24' + '00.00.00'
+              + field([256 * (n + 1)], 8) + field([''], 44) + field([n_records], 8) + field([1], 8)
+              + field([n], 4) + field(ch_names, 16) + field([''] * n, 80) + field(['uV'] * n, 8)
+              + field([f'{v:.2f}' for v in lo], 8) + field([f'{v:.2f}' for v in hi], 8)
+              + field([-32768] * n, 8) + field([32767] * n, 8) + field([''] * n, 80)
+              + field([int(sfreq)] * n, 8) + field([''] * n, 32))
+    digital = np.rint((data - lo[:, None]) / (hi - lo)[:, None] * 65535 - 32768).astype('<i2')
+    records = digital[:, :n_records * int(sfreq)].reshape(n, n_records, int(sfreq)).transpose(1, 0, 2)
+    path.write_bytes(header.encode('ascii') + records.tobytes())
+
+
+def test_upload_builds_overview_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    data = 10 * rng.standard_normal((len(CHANNELS), 60 * int(SFREQ))).cumsum(axis=1)
+    source = tmp_path / 'recording.edf'
+    write_edf(source, data, SFREQ, CHANNELS)
+    flask_client = EEG.app.test_client()
+    flask_client.post('/login', json={'username': 'admin', 'password': 'password'})
+    upload = {'file': (io.BytesIO(source.read_bytes()), 'recording.edf')}
+    response = flask_client.post('/api/eeg-data?width=100', data=upload, content_type='multipart/form-data')
+    assert response.status_code == 200 and set(response.get_json()['channels']) == set(CHANNELS)
+    assert (tmp_path / ('temp_eeg_file.edf' + EEG.OVERVIEW_SUFFIX)).exists()
+
+    # Requests only load the saved pyramid; the recording is never read again
+    EEG._overview_cache.clear()
+    monkeypatch.setattr(mne.io, 'read_raw_edf', lambda *args, **kwargs: pytest.fail('recording re-read'))
+    zoomed = EEG.process_eeg_data('temp_eeg_file.edf', 10.0, 20.0, 100)
+    assert zoomed['duration'] == pytest.approx(60.0) and len(zoomed['time']) <= 100
+    with pytest.raises(ValueError, match='upload it again'):
+        EEG.process_eeg_data(str(source))
+
+
+def message(block):
+    times = np.arange(block.shape[1]) / SFREQ
+    return {'data': {'time': times.tolist(), 'channels': {ch: block[i].tolist() for i, ch in enumerate(CHANNELS)}},
+            'sfreq': SFREQ}
+
+
+def test_process_eeg_pushes_binary_frames_to_live_viewers(socket_client, block):
+    socket_client.emit('subscribe_live', {'encoding': 'float32'})
+    socket_client.emit('process_eeg', message(block))
+    EEG.get_live_stream().flush(now=float('inf'))
+    received = socket_client.get_received()
+    assert 'eeg_data' not in {msg['name'] for msg in received}
+    info = next(msg['args'][0] for msg in received if msg['name'] == 'eeg_stream_info')
+    assert info['ch_names'] == CHANNELS and info['sfreq'] == SFREQ
+    frames = [msg['args'][0] for msg in received if msg['name'] == 'eeg_frame']
+    assert frames and all(isinstance(frame['data'], bytes) for frame in frames)
+    streamed = np.hstack([decode_block(frame['header'], frame['data']) for frame in frames])
+    expected = ASR(SFREQ).calibrate(find_clean_segment(block, SFREQ)).clean(block)
+    np.testing.assert_allclose(streamed, expected, rtol=1e-5, atol=1e-5)
+
+
+def test_process_eeg_falls_back_to_json(socket_client, block):
+    socket_client.emit('process_eeg', message(block))
+    received = socket_client.get_received()
+    assert [msg['name'] for msg in received] == ['eeg_data']
+    assert list(received[0]['args'][0]['channels']) == CHANNELS
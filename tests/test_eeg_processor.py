@@ -0,0 +1,158 @@
+import gzip
+import importlib.util
+import json
+import sys
+
+import mne
+import numpy as np
+import pytest
+
+from pipeline_spec import PipelineSpec
+
+SCRIPT = 'docs/EEG.py'
+CHANNELS = ['Fp1', 'Fp2', 'C3', 'C4', 'P3', 'P4', 'O1', 'O2']
+
+
+@pytest.fixture(scope='module')
+def eeg():
+    spec = importlib.util.spec_from_file_location('eeg_app', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['eeg_app'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def recording(tmp_path):
+    rng = np.random.default_rng(0)
+    sfreq, n_times = 128.0, 128 * 40
+    t = np.arange(n_times) / sfreq
+    alpha = np.sin(2 * np.pi * 10 * t) * np.linspace(1, 2, len(CHANNELS))[:, None]
+    data = 1e-5 * (alpha + rng.standard_normal((len(CHANNELS), n_times)))
+    stim = np.zeros((1, n_times))
+    info = mne.create_info(CHANNELS + ['STI'], sfreq, ['eeg'] * len(CHANNELS) + ['stim'])
+    path = tmp_path / 'rec_raw.fif'
+    mne.io.RawArray(np.vstack([data, stim]), info, verbose=False).save(path, verbose=False)
+    return path
+
+
+def quick_spec(**bands):
+    return PipelineSpec.from_dict({'stages': [{'name': 'bandpass', 'params': {'l_freq': 1.0, 'h_freq': 40.0}},
+                                              {'name': 'notch', 'params': {'freqs': [50, 60]}}],
+                                   'features': {'bands': bands or {'theta': [4, 8], 'alpha': [8, 13]}}})
+
+
+def test_run_pipeline_end_to_end(eeg, recording, tmp_path):
+    processor = eeg.EEGProcessor(cache_dir=str(tmp_path / 'cache'))
+    processor.load_eeg_data(str(recording))
+    spec = quick_spec()
+    assert processor.run_pipeline(spec)
+    features = processor.features
+    assert set(features) >= {'band_powers', 'connectivity', 'temporal', 'statistical'}
+    assert processor._feature_picks()[1] == CHANNELS
+    assert all(len(values) == len(CHANNELS) for values in features['band_powers'].values())
+    assert len(features['statistical']['variance']) == len(CHANNELS)
+    assert np.argmax(features['band_powers']['alpha']) == len(CHANNELS) - 1
+    stored = next((tmp_path / 'cache').rglob('features.json.gz'))
+    with gzip.open(stored, 'rt') as f:
+        assert json.load(f)['band_powers'] == features['band_powers']
+
+    # Another spec must not alter the cached results of the first
+    other = quick_spec(beta=[13, 30])
+    assert processor.run_pipeline(other)
+    assert set(processor.features['band_powers']) == {'beta'}
+    assert processor.run_pipeline(spec)
+    assert set(processor.features['band_powers']) == {'theta', 'alpha'}
+
+
+def test_artifacts_and_disabled_disk_cache(eeg, recording, tmp_path):
+    processor = eeg.EEGProcessor(cache_dir=None)
+    processor.load_eeg_data(str(recording))
+    spec = quick_spec()
+    processor.run_pipeline(spec)
+    before = processor.features['statistical']['variance']
+    processor.artifact_index = processor.artifact_index.merge(
+        eeg.artifact_index.ArtifactIndex([eeg.artifact_index.Annotation(0.0, 20.0)]))
+    processor.run_pipeline(spec)
+    assert processor.features['statistical']['variance'] != before
+    assert len(processor.pipeline_cache) == 2 and not list(tmp_path.rglob('features.json.gz'))
+
+
+def test_failed_feature_extraction_raises(eeg, recording, tmp_path):
+    processor = eeg.EEGProcessor(cache_dir=str(tmp_path / 'cache'))
+    processor.load_eeg_data(str(recording))
+    with pytest.raises(ValueError):
+        processor.run_pipeline(quick_spec(high=[100, 120]))
+    assert not processor.pipeline_cache or all(e['features'] is None for e in processor.pipeline_cache.values())
+    assert not list((tmp_path / 'cache').rglob('features.json.gz'))
+
+
+def test_band_powers_skip_annotated_artifacts(eeg, recording, tmp_path):
+    processor = eeg.EEGProcessor(cache_dir=None)
+    processor.load_eeg_data(str(recording))
+    spec = quick_spec()
+    processor.run_pipeline(spec)
+    clean = np.array(processor.features['band_powers']['alpha'])
+
+    # A large 10 Hz burst, annotated as an artifact, must not leak into the powers
+    processor.raw = processor.raw.copy()
+    t = np.arange(128 * 8) / 128.0
+    processor.raw._data[:len(CHANNELS), 128 * 10:128 * 18] += 1e-3 * np.sin(2 * np.pi * 10 * t)
+    processor.artifact_index = eeg.artifact_index.ArtifactIndex([eeg.artifact_index.Annotation(9.0, 19.0)])
+    processor.run_pipeline(spec)
+    np.testing.assert_allclose(processor.features['band_powers']['alpha'], clean, rtol=0.3)
+
+    processor.artifact_index = eeg.artifact_index.ArtifactIndex([eeg.artifact_index.Annotation(0.0, 40.0)])
+    assert processor.create_epochs() is None
+    with pytest.raises(ValueError, match='artifact-free'):
+        processor.extract_features()
+
+
+def test_precision_does_not_depend_on_request_history(eeg, recording):
+    processor = eeg.EEGProcessor(cache_dir=None)
+    processor.load_eeg_data(str(recording))
+    spec64 = quick_spec()
+    processor.run_pipeline(spec64)
+    expected = processor.features['band_powers']
+    processor.pipeline_cache.clear()
+
+    spec32 = PipelineSpec.from_dict({**spec64.to_dict(), 'precision': 'float32'})
+    processor.run_pipeline(spec32)
+    assert processor.filtered_data._data.dtype == np.float32 and processor.raw._data.dtype == np.float64
+    processor.clear_memory_cache()
+    processor.load_eeg_data(str(recording))
+    processor.run_pipeline(spec64)
+    assert processor.features['band_powers'] == expected
+
+
+def test_windowed_spectral_params_skip_annotated_artifacts(eeg, recording):
+    processor = eeg.EEGProcessor(cache_dir=None)
+    processor.load_eeg_data(str(recording))
+    processor.run_pipeline(quick_spec())
+    settings = {'window': 4.0, 'step': 2.0, 'segment': 1.0}
+    result = processor._calculate_spectral_params(settings)
+    assert result['windows']['n_windows'] == len(processor.spectral_windows['times'])
+    assert len(result['windows']['aperiodic_exponent_mean']) == len(CHANNELS)
+    data = processor.filtered_data.get_data(picks=processor._feature_picks()[0])
+    expected, times = eeg.spectral_params.fit_windows(data, 128.0, 4.0, 2.0, 1.0)
+    np.testing.assert_allclose(processor.spectral_windows['times'], times)
+    np.testing.assert_allclose(processor.spectral_windows['fit'].exponent, expected.exponent, rtol=1e-6)
+
+    processor.artifact_index = eeg.artifact_index.ArtifactIndex([eeg.artifact_index.Annotation(9.0, 19.0)])
+    processor._calculate_spectral_params(settings)
+    centers = processor.spectral_windows['times']
+    assert len(centers) < len(times) and not np.any((centers + 2.0 > 9.0) & (centers - 2.0 < 19.0))
+
+
+def test_disk_cache_keeps_float64_data(eeg, recording, tmp_path):
+    processor = eeg.EEGProcessor(cache_dir=str(tmp_path / 'cache'))
+    processor.load_eeg_data(str(recording))
+    spec = quick_spec()
+    processor.run_pipeline(spec)
+    fresh = processor.filtered_data.get_data()
+
+    reloaded = eeg.EEGProcessor(cache_dir=str(tmp_path / 'cache'))
+    reloaded.load_eeg_data(str(recording))
+    assert reloaded._load_cached_pipeline(spec) is not None
+    assert reloaded.run_pipeline(spec)
+    np.testing.assert_array_equal(reloaded.filtered_data.get_data(), fresh)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from feature_store import FeatureStore, feature_rows
+
+CH_NAMES = ['Fz', 'Cz', 'O1']
+
+
+def make_features(seed):
+    rng = np.random.default_rng(seed)
+    return {
+        'band_powers': {band: rng.random(3).tolist() for band in ('theta', 'alpha', 'beta')},
+        'statistical': {'kurtosis': rng.random(3).tolist(), 'mean': rng.random(3).tolist()},
+        'connectivity': {'coherence': rng.random((3, 3)).tolist()},
+        'global': {'snr': 3.5},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(tmp_path / 'store')
+    for i, age in enumerate([25, 45, 60]):
+        store.append(make_features(i), f'P{i}', CH_NAMES, recording_id=f'rec{i}', attributes={'Age': age})
+    return store
+
+
+def test_feature_rows_layout():
+    rows = list(feature_rows(make_features(0), CH_NAMES))
+    assert ('band_powers', 'power', 'alpha', 'O1') in {row[:4] for row in rows}
+    assert ('connectivity', 'coherence', '', 'Fz-O1') in {row[:4] for row in rows}
+    assert ('global', 'snr', '', '', 3.5) in rows
+    assert len(rows) == 9 + 6 + 3 + 1
+
+
+def test_query_alpha_o1_over_40(store):
+    rows = store.query(group='band_powers', band='alpha', channel='O1',
+                       where={'Age': {'>': 40}}, columns=['participant_id', 'value'])
+    assert list(rows.columns) == ['participant_id', 'value']
+    assert sorted(rows['participant_id']) == ['P1', 'P2']
+    expected = make_features(1)['band_powers']['alpha'][2]
+    assert rows.set_index('participant_id').loc['P1', 'value'] == pytest.approx(expected)
+
+
+def test_operators_and_membership(store):
+    rows = store.query(feature=['kurtosis', 'mean'], participant_id='P0', where={'Age': {'>=': 20, '<': 30}})
+    assert set(rows['feature']) == {'kurtosis', 'mean'}
+    assert len(rows) == 6
+    assert store.query(where={'Age': {'>': 100}}).empty
+    with pytest.raises(ValueError):
+        store.query(where={'Age': {'~': 1}})
+
+
+def test_reappend_replaces_recording(store):
+    store.append(make_features(7), 'P0', CH_NAMES, recording_id='rec0', attributes={'Age': 26})
+    rows = store.query(participant_id='P0', group='band_powers')
+    assert len(rows) == 9
+    assert store.participants(participant_id='P0')['Age'].tolist() == [26]
+
+    # Groups missing from the new features must not survive from the old files
+    store.append({'global': {'snr': 1.0}}, 'P0', CH_NAMES, recording_id='rec0')
+    rows = store.query(participant_id='P0')
+    assert rows[['group', 'feature', 'value']].values.tolist() == [['global', 'snr', 1.0]]
+    assert len(store.query(participant_id='P1')) == 19
+
+
+def test_invalid_predicates_raise_value_error(store):
+    store.register_participants(store.participants().assign(Gender='F'))
+    for query in ({'where': {'Unknown': {'>': 1}}}, {'where': {'Gender': {'>': 40}}},
+                  {'columns': ['nope']}, {'channel': {'>': 3}}):
+        with pytest.raises(ValueError):
+            store.query(**query)
+
+
+def test_pivot(store):
+    table = store.pivot(group='band_powers', channel='O1')
+    assert table.shape == (3, 3)
+    assert 'band_powers.power.alpha.O1' in table.columns
+
+
+def test_empty_store(tmp_path):
+    assert FeatureStore(tmp_path / 'none').query(band='alpha').empty
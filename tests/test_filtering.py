@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy import signal
+from filtering import (FilterEngine, clear_design_cache, design_bandpass_sos,
+                       design_notch_sos)
+
+SFREQ = 250.0
+
+def _tone_power(data, freq):
+    freqs, psd = signal.welch(data, fs=SFREQ, nperseg=1000, axis=-1)
+    return psd[..., np.argmin(np.abs(freqs - freq))]
+
+@pytest.fixture
+def data():
+    t = np.arange(int(20 * SFREQ)) / SFREQ
+    rng = np.random.default_rng(1)
+    tones = np.sin(2 * np.pi * 10 * t) + np.sin(2 * np.pi * 50 * t) + np.sin(2 * np.pi * 100 * t)
+    return tones + 0.01 * rng.standard_normal((4, t.size))
+
+def test_designs_are_memoized():
+    clear_design_cache()
+    first = design_bandpass_sos(SFREQ, 1.0, 40.0)
+    assert design_bandpass_sos(SFREQ, 1.0, 40.0) is first
+    assert design_bandpass_sos.cache_info().hits == 1
+    assert design_notch_sos(SFREQ, (50.0, 100.0)) is design_notch_sos(SFREQ, (50.0, 100.0))
+
+@pytest.mark.parametrize('method', ['iir', 'fir'])
+def test_bandpass_keeps_passband_and_shape(data, method):
+    out = FilterEngine(method=method).bandpass(data, SFREQ, 1.0, 40.0)
+    assert out.shape == data.shape and out.dtype == data.dtype
+    assert np.all(_tone_power(out, 100) < 1e-3 * _tone_power(data, 100))
+    np.testing.assert_allclose(_tone_power(out, 10), _tone_power(data, 10), rtol=0.1)
+
+def test_bandpass_preserves_float32(data):
+    out = FilterEngine().bandpass(data.astype(np.float32), SFREQ, 1.0, 40.0)
+    assert out.dtype == np.float32
+
+@pytest.mark.parametrize('method', ['comb', 'notch'])
+def test_line_noise_removes_harmonics(data, method):
+    out = FilterEngine(line_noise_method=method).remove_line_noise(data, SFREQ, 50.0)
+    for freq in (50, 100):
+        assert np.all(_tone_power(out, freq) < 1e-2 * _tone_power(data, freq))
+    np.testing.assert_allclose(_tone_power(out, 10), _tone_power(data, 10), rtol=0.1)
@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+
+import pytest
+from flask import Flask
+
+import http_cache
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'eeg.edf'
+    path.write_bytes(b'x' * 100)
+    return path
+
+
+@pytest.fixture
+def app(tmp_path, data_file):
+    app = Flask(__name__)
+    app.calls = 0
+    cache = http_cache.DiskCache(tmp_path / 'responses')
+
+    @app.route('/data', methods=['GET', 'POST'])
+    def data():
+        def build():
+            app.calls += 1
+            return {'values': list(range(1000))}
+        etag = http_cache.make_etag(http_cache.file_digest(data_file), {'width': 800})
+        return http_cache.conditional_response(etag, build, http_cache.file_mtime(data_file), cache)
+
+    @app.route('/degraded')
+    def degraded():
+        def build():
+            app.calls += 1
+            payload = {'values': list(range(1000)), 'downgraded': app.calls == 1}
+            return http_cache.Variant(payload, 'degraded') if app.calls == 1 else payload
+        return http_cache.conditional_response('full', build, cache=cache)
+
+    return app
+
+
+def test_etag_depends_on_content_and_params(data_file):
+    digest = http_cache.file_digest(data_file)
+    assert http_cache.make_etag(digest, {'a': 1}) == http_cache.make_etag(digest, {'a': 1})
+    assert http_cache.make_etag(digest, {'a': 1}) != http_cache.make_etag(digest, {'a': 2})
+    data_file.write_bytes(b'y' * 101)
+    assert http_cache.file_digest(data_file) != digest
+
+
+def test_not_modified_and_cached_body(app):
+    client = app.test_client()
+    first = client.get('/data')
+    assert first.status_code == 200 and first.headers['ETag']
+    assert json.loads(first.data)['values'][-1] == 999
+    revalidated = client.get('/data', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    since = client.get('/data', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    assert client.get('/data').status_code == 200
+    assert app.calls == 1
+
+
+def test_gzip_negotiation(app):
+    response = app.test_client().get('/data', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data))['values'][0] == 0
+    identity = app.test_client().get('/data', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in identity.headers
+
+
+def test_post_ignores_conditionals(app):
+    client = app.test_client()
+    etag = client.get('/data').headers['ETag']
+    assert client.post('/data', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_variant_payloads_are_not_cached(app):
+    client = app.test_client()
+    first = client.get('/degraded')
+    assert first.headers['ETag'] == '"degraded"' and first.get_json()['downgraded']
+    second = client.get('/degraded', headers={'If-None-Match': '"degraded"'})
+    assert second.status_code == 200 and second.headers['ETag'] == '"full"'
+    assert not second.get_json()['downgraded']
+    assert client.get('/degraded').get_json() == second.get_json() and app.calls == 2
+
+
+def test_redis_cache_errors_are_misses():
+    class Unavailable:
+        def get(self, key):
+            raise ConnectionError('down')
+
+        def set(self, key, value, ex=None):
+            raise ConnectionError('down')
+
+    cache = http_cache.RedisCache(Unavailable())
+    cache.set('k', b'v')
+    assert cache.get('k') is None
+
+
+def test_disk_cache_prunes_least_recently_used_on_write(tmp_path):
+    cache = http_cache.DiskCache(tmp_path / 'responses', max_bytes=3000, prune_every=1)
+    for i in range(3):
+        cache.set(f'k{i}', b'x' * 1000)
+        os.utime(cache._path(f'k{i}'), (i, i))
+    assert cache.get('k0') == b'x' * 1000
+    cache.set('k3', b'x' * 1000)
+    assert cache.get('k1') is None
+    assert all(cache.get(key) for key in ('k0', 'k2', 'k3'))
+    assert sum(p.stat().st_size for p in (tmp_path / 'responses').iterdir()) <= 3000
@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def _imported_modules(statement, cwd=REPO_ROOT):
+    code = (f"import json, sys; sys.path.insert(0, {str(REPO_ROOT)!r}); {statement}; "
+            f"print(json.dumps(sorted(sys.modules)))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=cwd,
+                         capture_output=True, text=True, check=True)
+    return set(json.loads(out.stdout.strip().splitlines()[-1]))
+
+def test_web_app_import_does_not_load_scientific_stack():
+    modules = _imported_modules('import EEG')
+    assert not {'numpy', 'scipy', 'mne'} & modules
+
+def test_analysis_app_import_has_no_side_effects(tmp_path):
+    # No scientific stack, no Redis connection, and no config, log or cache files
+    modules = _imported_modules(f"import runpy; runpy.run_path({str(REPO_ROOT / 'docs' / 'EEG.py')!r})",
+                                cwd=tmp_path)
+    assert not {'numpy', 'scipy', 'mne', 'pandas', 'redis'} & modules
+    assert not list(tmp_path.iterdir())
+
+def test_lazy_module_imports_on_first_use():
+    from lazy_imports import LazyModule, lazy_import
+    module = lazy_import('json')
+    assert module is json
+    lazy = LazyModule('colorsys')
+    assert 'not loaded' in repr(lazy)
+    assert lazy.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert 'loaded' in repr(lazy)
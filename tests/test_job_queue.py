@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue, JobStatus, Worker
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(fakeredis.FakeRedis(), claim_idle_ms=50, max_attempts=2)
+
+
+def test_submit_run_and_result(queue):
+    job_id = queue.submit('square', {'x': 7})
+    assert queue.status(job_id)['status'] == JobStatus.QUEUED.value
+    worker = Worker(queue, {'square': lambda payload: payload['x'] ** 2}, consumer='w1')
+    assert worker.run_once(block_ms=10)
+    assert queue.wait(job_id, timeout=1) == 49
+    status = queue.status(job_id)
+    assert status['status'] == 'done' and status['worker'] == 'w1'
+    assert not worker.run_once(block_ms=10)
+
+
+def test_each_job_delivered_once(queue):
+    ids = [queue.submit('echo', {'i': i}) for i in range(20)]
+    seen = []
+    workers = [Worker(queue, {'echo': lambda p: seen.append(p['i']) or p['i']}, consumer=f'w{n}')
+               for n in range(3)]
+    while any([w.run_once(block_ms=10) for w in workers]):
+        pass
+    assert sorted(seen) == list(range(20))
+    assert [queue.result(job_id) for job_id in ids] == list(range(20))
+
+
+def test_dead_worker_job_is_reclaimed(queue):
+    job_id = queue.submit('echo', {'i': 1})
+    assert queue.claim('dead', block_ms=10).id == job_id
+    time.sleep(0.1)
+    assert Worker(queue, {'echo': lambda p: p['i']}, consumer='alive').run_once(block_ms=10)
+    assert queue.result(job_id) == 1
+    assert queue.status(job_id)['attempts'] == '2'
+
+
+def test_heartbeat_prevents_reclaim(queue):
+    job_id = queue.submit('slow', {})
+    started = threading.Event()
+
+    def slow(payload):
+        started.set()
+        time.sleep(0.3)
+        return 'ok'
+
+    worker = Worker(queue, {'slow': slow}, consumer='busy', heartbeat_interval=0.01)
+    thread = threading.Thread(target=worker.run_once, kwargs={'block_ms': 10})
+    thread.start()
+    started.wait(1)
+    time.sleep(0.1)
+    assert queue.claim('other', block_ms=10) is None
+    thread.join()
+    assert queue.result(job_id) == 'ok'
+
+
+def test_failures_are_retried_then_marked_failed(queue):
+    job_id = queue.submit('boom', {})
+
+    def boom(payload):
+        raise ValueError('bad input')
+
+    worker = Worker(queue, {'boom': boom}, consumer='w1')
+    assert worker.run_once(block_ms=10) and worker.run_once(block_ms=10)
+    assert not worker.run_once(block_ms=10)
+    status = queue.status(job_id)
+    assert status['status'] == 'failed' and status['error'] == 'bad input'
+    with pytest.raises(RuntimeError):
+        queue.wait(job_id, timeout=1)
+
+
+def test_reclaimed_worker_loses_the_job(queue):
+    job_id = queue.submit('echo', {'i': 1})
+    stalled = queue.claim('A', block_ms=10)
+    time.sleep(0.1)
+    taken = queue.claim('B', block_ms=10)
+    assert taken.id == job_id
+    assert not queue.heartbeat(stalled, 'A') and queue.heartbeat(taken, 'B')
+    assert not queue.complete(stalled, 'stale', consumer='A')
+    assert queue.result(job_id) is None and queue.status(job_id)['worker'] == 'B'
+    assert queue.complete(taken, 'fresh', consumer='B')
+    assert queue.result(job_id) == 'fresh'
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from flask import Flask, request
+from flask_socketio import SocketIO
+
+from live_frames import FrameEmitter, decode_block, encode_block
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data=None, to=None, namespace=None):
+        self.sent.append((event, data, to))
+
+    def frames(self, sid):
+        return [data for event, data, to in self.sent if event == 'eeg_frame' and to == sid]
+
+
+@pytest.fixture
+def block():
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.standard_normal((8, 500)), axis=1) * 1e-5
+
+
+@pytest.mark.parametrize('encoding', ['float32', 'int16', 'delta16'])
+def test_roundtrip(block, encoding):
+    header, payload = encode_block(block, encoding)
+    decoded = decode_block(header, payload)
+    span = block.max(axis=1) - block.min(axis=1)
+    bound = {'float32': 1e-6 * np.abs(block).max(), 'int16': span.max() / 65534,
+             'delta16': span.max() / 32766}[encoding]
+    assert np.abs(decoded - block).max() <= bound
+    assert len(payload) == block.size * (4 if encoding == 'float32' else 2)
+
+
+def test_constant_channel_and_unknown_encoding():
+    header, payload = encode_block(np.full((2, 10), 3.0), 'delta16')
+    np.testing.assert_allclose(decode_block(header, payload), 3.0)
+    with pytest.raises(ValueError):
+        encode_block(np.zeros((1, 4)), 'json')
+
+
+def test_coalescing_and_shared_encoding(block):
+    recorder = Recorder()
+    emitter = FrameEmitter(recorder)
+    emitter.open([f'ch{i}' for i in range(8)], 250.0)
+    emitter.add_client('a', 'int16', fps=10)
+    emitter.add_client('b', 'int16', fps=10)
+    emitter.add_client('c', 'float32', fps=2)
+    for start in range(0, 500, 50):
+        emitter.push(block[:, start:start + 50])
+    assert emitter.flush(now=0.0) == 3
+    frame_a, frame_b = recorder.frames('a')[0], recorder.frames('b')[0]
+    assert frame_a['data'] is frame_b['data']
+    assert frame_a['header']['n_samples'] == 500
+    emitter.push(block[:, :25])
+    assert emitter.flush(now=0.05) == 0
+    assert emitter.flush(now=0.1) == 2
+    assert recorder.frames('a')[1]['header']['start_sample'] == 500
+    assert len(recorder.frames('c')) == 1
+
+
+def test_slow_client_skips_ahead(block):
+    recorder = Recorder()
+    emitter = FrameEmitter(recorder)
+    emitter.open(['x'] * 8, 100.0, buffer_seconds=1.0)
+    emitter.add_client('slow', 'float32')
+    emitter.push(block[:, :300])
+    emitter.flush(now=0.0)
+    header = recorder.frames('slow')[0]['header']
+    assert (header['start_sample'], header['n_samples'], header['dropped']) == (200, 100, 200)
+    np.testing.assert_allclose(decode_block(header, recorder.frames('slow')[0]['data']),
+                               block[:, 200:300], rtol=1e-6)
+
+
+def test_socketio_binary_attachment(block):
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    emitter = FrameEmitter(socketio)
+
+    @socketio.on('subscribe_live')
+    def subscribe(settings):
+        emitter.add_client(request.sid, settings['encoding'])
+
+    emitter.open(['x'] * 8, 250.0)
+    client = socketio.test_client(app)
+    client.emit('subscribe_live', {'encoding': 'delta16'})
+    emitter.push(block)
+    emitter.flush()
+    frames = [msg['args'][0] for msg in client.get_received() if msg['name'] == 'eeg_frame']
+    assert isinstance(frames[0]['data'], bytes)
+    np.testing.assert_allclose(decode_block(frames[0]['header'], frames[0]['data']), block, atol=1e-7)
@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+
+import mne
+import numpy as np
+import pytest
+
+from memory_budget import MemoryBudget, MemoryPlan, RecordingShape, estimate_plan, plan_job, read_shape
+from pipeline_spec import PipelineSpec
+
+GiB = 1024 ** 3
+
+
+@pytest.fixture
+def budget(tmp_path):
+    return MemoryBudget(tmp_path / 'ledger.json', total_bytes=10 * GiB, degrade_after=60.0, poll_interval=0.01)
+
+
+def plan(gib):
+    return MemoryPlan({'load': int(gib * GiB)})
+
+
+def test_read_shape_from_headers(tmp_path):
+    shape = read_shape('docs/examples/raw_eeg_data.csv')
+    assert shape.n_channels == 8
+    assert abs(shape.n_times - 2560) < 50
+    assert shape.sfreq == pytest.approx(256)
+
+    info = mne.create_info(4, 200.0, 'eeg')
+    mne.io.RawArray(np.zeros((4, 1000)), info, verbose=False).save(tmp_path / 'x_raw.fif', verbose=False)
+    assert read_shape(tmp_path / 'x_raw.fif') == RecordingShape(4, 1000, 200.0)
+
+
+def test_estimates_scale_with_precision_and_downgrades():
+    shape = RecordingShape(64, 3_600_000, 1000.0)
+    full = estimate_plan(shape, PipelineSpec(), report=True)
+    assert full.peak_stage == 'report'
+    assert estimate_plan(shape, PipelineSpec(precision='float32')).peak_bytes < estimate_plan(shape, PipelineSpec()).peak_bytes
+    plans = plan_job(shape, PipelineSpec(), report=True)
+    assert [p.peak_bytes for p in plans] == sorted((p.peak_bytes for p in plans), reverse=True)
+    assert plans[1].stage_bytes['ica'] < plans[0].stage_bytes['ica']
+
+    resampled = PipelineSpec.from_dict({'stages': ['resample', 'bandpass']})
+    assert estimate_plan(shape, resampled).stage_bytes['bandpass'] < estimate_plan(shape, PipelineSpec()).stage_bytes['bandpass']
+
+
+def test_downgraded_plan_changes_spec_hash_only_when_downgraded():
+    spec = PipelineSpec()
+    assert MemoryPlan(ica_decim=1).apply(spec) is spec
+    downgraded = MemoryPlan(ica_decim=4).apply(spec)
+    assert downgraded.stage('ica').params['decim'] == 4
+    assert downgraded.hash != spec.hash
+    assert PipelineSpec.from_dict(downgraded.to_dict()).hash == downgraded.hash
+
+
+def test_jobs_queue_until_memory_is_released(budget):
+    order = []
+    with budget.admit([plan(6)]):
+        def second():
+            with budget.admit([plan(6)]):
+                order.append('second')
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.1)
+        assert budget.usage()['queue_depth'] == 1
+        assert budget.usage()['reserved_bytes'] == 6 * GiB
+        order.append('first done')
+    thread.join(5)
+    assert order == ['first done', 'second']
+    assert budget.usage() == {'budget_bytes': 10 * GiB, 'reserved_bytes': 0, 'available_bytes': 10 * GiB,
+                              'running': 0, 'queue_depth': 0}
+
+
+def test_oversized_jobs_downgrade_or_fail(budget):
+    with budget.admit([plan(12), plan(4)]) as admitted:
+        assert admitted.peak_bytes == 4 * GiB
+    with pytest.raises(MemoryError):
+        with budget.admit([plan(12), plan(11)]):
+            pass
+
+
+def test_waiting_jobs_degrade_after_timeout(tmp_path):
+    budget = MemoryBudget(tmp_path / 'ledger.json', total_bytes=10 * GiB, degrade_after=0.05, poll_interval=0.01)
+    with budget.admit([plan(7)]):
+        with budget.admit([plan(6), plan(2)]) as admitted:
+            assert admitted.peak_bytes == 2 * GiB
+        with pytest.raises(TimeoutError):
+            with budget.admit([plan(6)], timeout=0.05):
+                pass
+    assert budget.usage()['queue_depth'] == 0
+
+
+def test_dead_processes_and_resident_memory_are_reclaimed(budget):
+    budget.ledger_path.write_text(json.dumps({
+        'reservations': {'lost': {'pid': 2 ** 22 + 1, 'bytes': 9 * GiB, 'job': True}}, 'queue': []
+    }))
+    assert budget.usage()['reserved_bytes'] == 0
+
+    budget.set_resident(8 * GiB)
+    reclaimed = []
+    with budget.admit([plan(5)], reclaim=lambda: reclaimed.append(True)):
+        assert reclaimed == [True]
+        assert budget.usage()['reserved_bytes'] == 5 * GiB
+
+
+def test_no_reclaim_while_this_process_runs_a_job(budget):
+    budget.set_resident(4 * GiB)
+    reclaimed = []
+    with budget.admit([plan(3)]):
+        with pytest.raises(TimeoutError):
+            with budget.admit([plan(7)], timeout=0.05, reclaim=lambda: reclaimed.append(True)):
+                pass
+    assert reclaimed == []
+    with budget.admit([plan(7)], reclaim=lambda: reclaimed.append(True)):
+        assert reclaimed == [True]
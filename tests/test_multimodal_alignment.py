@@ -0,0 +1,56 @@
+import mne
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+from multimodal_alignment import AlignedStore, Stream, align_streams, resample_poly_chunks
+
+@pytest.mark.parametrize('up, down', [(1, 2), (3, 8), (125, 128), (4, 1)])
+@pytest.mark.parametrize('chunk', [37, 1000, 20_000])
+def test_chunked_polyphase_matches_whole_signal(up, down, chunk):
+    x = np.random.default_rng(0).standard_normal((10_007, 2))
+    blocks = (x[i:i + chunk] for i in range(0, len(x), chunk))
+    out = np.concatenate(list(resample_poly_chunks(blocks, up, down)))
+    np.testing.assert_allclose(out, signal.resample_poly(x, up, down, axis=0), atol=1e-10)
+
+def test_asof_join_with_clock_offset_and_tolerance(tmp_path):
+    eye = pd.DataFrame({'timestamp': [100.0, 100.5, 101.0, 104.0],
+                        'pupil_size': [3.0, 3.1, 3.2, 3.5]})
+    eye.to_csv(tmp_path / 'eye.csv', index=False)
+    stream = Stream.from_csv('eye', tmp_path / 'eye.csv', chunksize=2,
+                             clock_offset=-100.0, tolerance=1.0)
+    store = align_streams([stream], tmp_path / 'aligned', sfreq=4.0)
+    frame = store.to_frame()
+    assert frame.index[0] == 0.0 and frame.index[-1] == 4.0
+    assert frame['eye.pupil_size'].iloc[:4].tolist() == pytest.approx([3.0, 3.0, 3.1, 3.1])
+    assert frame.loc[2.0, 'eye.pupil_size'] == pytest.approx(3.2)
+    assert np.isnan(frame.loc[2.5, 'eye.pupil_size'])
+    assert frame.loc[4.0, 'eye.pupil_size'] == pytest.approx(3.5)
+
+def test_unsorted_csv_is_rejected(tmp_path):
+    # Each chunk of two rows is sorted on its own; the file as a whole is not
+    eye = pd.DataFrame({'timestamp': [0.0, 2.0, 1.0, 3.0], 'pupil_size': [3.0, 3.1, 3.2, 3.5]})
+    eye.to_csv(tmp_path / 'eye.csv', index=False)
+    stream = Stream.from_csv('eye', tmp_path / 'eye.csv', chunksize=2)
+    with pytest.raises(ValueError, match='data row 2'):
+        align_streams([stream], tmp_path / 'aligned', sfreq=4.0)
+
+def test_eeg_and_vitals_on_common_timeline(tmp_path):
+    sfreq = 250.0
+    t = np.arange(int(60 * sfreq)) / sfreq
+    eeg = np.vstack([np.sin(2 * np.pi * 2 * t), np.cos(2 * np.pi * 3 * t)]) * 1e-5
+    raw = mne.io.RawArray(eeg, mne.create_info(['Fz', 'Cz'], sfreq, 'eeg'), verbose=False)
+    heart_times = np.arange(5.0, 55.0, 0.8)
+    vitals = Stream.from_arrays('vitals', heart_times, 60 + heart_times[:, None], ['heart_rate'],
+                                chunk_size=7)
+    store = align_streams([Stream.from_raw('eeg', raw, chunk_seconds=7.0), vitals],
+                          tmp_path / 'p01', sfreq=100.0)
+
+    reopened = AlignedStore.open(tmp_path / 'p01')
+    assert reopened.columns == ['eeg.Fz', 'eeg.Cz', 'vitals.heart_rate']
+    assert reopened.start == 5.0 and reopened.n_samples == store.n_samples
+    frame = reopened.to_frame(tmin=10.0, tmax=20.0)
+    expected = np.sin(2 * np.pi * 2 * frame.index.to_numpy()) * 1e-5
+    np.testing.assert_allclose(frame['eeg.Fz'], expected, atol=1e-7)
+    held = heart_times[np.searchsorted(heart_times, frame.index.to_numpy(), side='right') - 1]
+    np.testing.assert_allclose(frame['vitals.heart_rate'], 60 + held, rtol=1e-6)
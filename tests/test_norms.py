@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from norms import NormsIndex, NormsTable, load_norms
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(5)
+    return pd.DataFrame({
+        'Scores': np.round(rng.normal(70, 10, 1200), 1),
+        'Test_Type': rng.choice(['Aptitude', 'Placement'], 1200),
+        'Gender': rng.choice(['F', 'M', 'Other'], 1200, p=[0.49, 0.49, 0.02])
+    })
+
+def test_percentile_matches_scipy_mean_rank(reference):
+    table = NormsTable.from_scores(reference['Scores'].to_numpy())
+    queries = np.array([45.0, 70.0, reference['Scores'].iloc[0], 95.0])
+    expected = [stats.percentileofscore(reference['Scores'], q, kind='mean') for q in queries]
+    np.testing.assert_allclose(table.percentile(queries), expected)
+
+def test_standard_scores(reference):
+    table = NormsTable.from_scores(reference['Scores'].to_numpy())
+    converted = table.convert([table.mean, table.mean + table.std])
+    np.testing.assert_allclose(converted['z'], [0.0, 1.0])
+    np.testing.assert_allclose(converted['t'], [50.0, 60.0])
+    assert table.convert([-1e9, 1e9])['stanine'].tolist() == [1, 9]
+    assert converted['stanine'][0] == 5
+
+def test_sparse_groups_fall_back_to_parent(reference):
+    index = NormsIndex.from_frame(reference, group_by=['Test_Type', 'Gender'], min_group_size=50)
+    assert index.table_for({'Test_Type': 'Aptitude', 'Gender': 'F'})[0] == ('Aptitude', 'F')
+    assert index.table_for({'Test_Type': 'Aptitude', 'Gender': 'Other'})[0] == ('Aptitude',)
+    assert index.table_for({'Test_Type': 'Unknown'})[0] == ()
+
+def test_batch_conversion_matches_per_group(reference):
+    index = NormsIndex.from_frame(reference, group_by=['Test_Type'])
+    scores = reference['Scores'].to_numpy()[:300]
+    groups = [{'Test_Type': t} for t in reference['Test_Type'][:300]]
+    batch = index.convert_batch(scores, groups)
+    for test_type in ('Aptitude', 'Placement'):
+        rows = (reference['Test_Type'][:300] == test_type).to_numpy()
+        single = index.convert(scores[rows], {'Test_Type': test_type})
+        for name in single:
+            np.testing.assert_allclose(batch[name][rows], single[name])
+
+def test_persisted_norms_roundtrip_through_cache(reference, tmp_path):
+    index = NormsIndex.from_frame(reference, group_by=['Test_Type', 'Gender'])
+    path = tmp_path / 'norms.npz'
+    index.save(path)
+    loaded = load_norms(path)
+    assert load_norms(path) is loaded
+    assert loaded.group_by == ['Test_Type', 'Gender']
+    for key, table in index.tables.items():
+        np.testing.assert_array_equal(loaded.tables[key].values, table.values)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from overview_pyramid import OverviewPyramid
+
+@pytest.fixture
+def pyramid():
+    rng = np.random.default_rng(42)
+    data = rng.standard_normal((3, 10_001))
+    return data, OverviewPyramid(data, sfreq=250, ch_names=['Fz', 'Cz', 'Pz'])
+
+def test_levels_are_float32_power_of_two(pyramid):
+    data, pyr = pyramid
+    assert pyr.mins[-1].shape[1] == 1
+    for level in range(pyr.n_levels):
+        assert pyr.means[level].dtype == np.float32
+        assert pyr.means[level].shape[1] == -(-data.shape[1] // 2 ** level)
+
+def test_level_bins_match_raw_reductions(pyramid):
+    data, pyr = pyramid
+    level = 5
+    bin_size = 2 ** level
+    for b in (0, 17, pyr.means[level].shape[1] - 1):
+        chunk = data[:, b * bin_size:(b + 1) * bin_size]
+        np.testing.assert_allclose(pyr.mins[level][:, b], chunk.min(axis=1), rtol=1e-6)
+        np.testing.assert_allclose(pyr.maxs[level][:, b], chunk.max(axis=1), rtol=1e-6)
+        np.testing.assert_allclose(pyr.means[level][:, b], chunk.mean(axis=1), atol=1e-5)
+
+def test_query_payload_is_bounded(pyramid):
+    _, pyr = pyramid
+    for tmin, tmax in [(None, None), (0, 1), (10, 30.5)]:
+        result = pyr.query(tmin, tmax, max_points=100)
+        assert len(result['time']) <= 102
+        assert set(result['channels']) == {'Fz', 'Cz', 'Pz'}
+    # A short span is served from raw samples
+    assert pyr.query(0, 0.2, max_points=100)['level'] == 0
+
+def test_save_and_load_roundtrip(pyramid, tmp_path):
+    _, pyr = pyramid
+    pyr.save(tmp_path / 'overview.npz')
+    loaded = OverviewPyramid.load(tmp_path / 'overview.npz')
+    assert loaded.n_levels == pyr.n_levels
+    assert loaded.query(1, 20, 64) == pyr.query(1, 20, 64)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from personality_scoring import (ScoringKey, bootstrap_ci, reliability, score_traits)
+
+@pytest.fixture
+def key():
+    return ScoringKey.from_dict({
+        'traits': {'A': ['q1', 'q2', 'q3', 'q4'], 'B': ['q5', 'q6', 'q7']},
+        'reverse': ['q2', 'q6'],
+        'scale': [1, 5]
+    })
+
+@pytest.fixture
+def responses(key):
+    rng = np.random.default_rng(0)
+    n = 500
+    factors = rng.standard_normal((n, 2))
+    signs = np.array([1, -1, 1, 1, 1, -1, 1])
+    latent = np.repeat(factors, [4, 3], axis=1) * signs + 0.8 * rng.standard_normal((n, 7))
+    items = np.clip(np.round(3 + latent), 1, 5)
+    return pd.DataFrame(items, columns=[f'q{i}' for i in range(1, 8)])
+
+def _recoded(responses, key):
+    recoded = responses[key.items].copy()
+    recoded[key.reverse] = 6 - recoded[key.reverse]
+    return recoded
+
+def _alpha(items):
+    k = items.shape[1]
+    return k / (k - 1) * (1 - items.var(ddof=1).sum() / items.sum(axis=1).var(ddof=1))
+
+def test_scores_apply_reverse_keying(responses, key):
+    scores = score_traits(responses, key)
+    recoded = _recoded(responses, key)
+    np.testing.assert_allclose(scores['A'], recoded[key.traits['A']].mean(axis=1))
+    np.testing.assert_allclose(scores['B'], recoded[key.traits['B']].mean(axis=1))
+
+def test_missing_responses_are_prorated(responses, key):
+    responses = responses.copy()
+    responses.loc[0, 'q1'] = np.nan
+    responses.loc[1, ['q5', 'q6']] = np.nan
+    scores = score_traits(responses, key)
+    recoded = _recoded(responses, key)
+    assert scores.loc[0, 'A'] == pytest.approx(recoded.loc[0, ['q2', 'q3', 'q4']].mean())
+    assert np.isnan(scores.loc[1, 'B'])
+
+def test_reliability_matches_reference_formulas(responses, key):
+    report = reliability(responses, key)
+    recoded = _recoded(responses, key)
+    for trait, items in key.traits.items():
+        assert report.alpha[trait] == pytest.approx(_alpha(recoded[items]))
+        assert 0.0 < report.omega[trait] <= 1.0
+        for item in items:
+            rest = recoded[[other for other in items if other != item]].sum(axis=1)
+            assert report.item_total[item] == pytest.approx(np.corrcoef(recoded[item], rest)[0, 1])
+
+def test_omega_equals_alpha_for_parallel_items():
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal((20_000, 1)) + rng.standard_normal((20_000, 6))
+    key = ScoringKey({'T': [f'i{k}' for k in range(6)]})
+    report = reliability(data, key)
+    assert report.omega['T'] == pytest.approx(report.alpha['T'], abs=5e-3)
+
+def test_bootstrap_intervals_cover_point_estimates(responses, key):
+    report = reliability(responses, key)
+    ci = bootstrap_ci(responses, key, n_boot=400, random_state=3)
+    means = score_traits(responses, key).mean()
+    for trait in key.traits:
+        low, high = ci['alpha'][trait]
+        assert low < report.alpha[trait] < high
+        low, high = ci['mean'][trait]
+        assert low < means[trait] < high
+    assert ci == bootstrap_ci(responses, key, n_boot=400, random_state=3)
+
+def test_big_five_key_on_example_data():
+    data = pd.read_csv('examples/raw_data/personality_test_data.csv')
+    key = ScoringKey.big_five()
+    assert score_traits(data, key).shape == (len(data), 5)
+    assert all(alpha > 0.9 for alpha in reliability(data, key).alpha.values())
+
+def test_invalid_keys_are_rejected():
+    with pytest.raises(ValueError, match='keyed to both'):
+        ScoringKey({'A': ['q1'], 'B': ['q1']})
+    with pytest.raises(ValueError, match='not assigned'):
+        ScoringKey({'A': ['q1']}, reverse=['q9'])
@@ -0,0 +1,95 @@
+import json
+import pytest
+import yaml
+from pipeline_spec import DEFAULT_STAGES, PipelineSpec, StageSpec, parse_bands
+
+def test_default_spec_matches_historical_pipeline():
+    spec = PipelineSpec()
+    assert [s.name for s in spec.stages] == DEFAULT_STAGES
+    assert spec.stage('bandpass').params['l_freq'] == 1.0
+    assert PipelineSpec.from_dict({}).hash == spec.hash
+
+def test_hash_is_stable_and_parameter_sensitive():
+    a = PipelineSpec.from_dict({'stages': [{'name': 'bandpass', 'params': {'l_freq': 1, 'h_freq': 40}}]})
+    b = PipelineSpec.from_dict({'stages': [{'name': 'bandpass', 'params': {'h_freq': 40.0, 'l_freq': 1.0}}]})
+    c = PipelineSpec.from_dict({'stages': [{'name': 'bandpass', 'params': {'l_freq': 0.5, 'h_freq': 40}}]})
+    assert a.hash == b.hash
+    assert a.hash != c.hash
+    assert PipelineSpec.from_dict(a.to_dict()).hash == a.hash
+
+def test_disabled_stages_are_skipped():
+    spec = PipelineSpec.from_dict({'stages': ['bandpass', {'name': 'ica', 'enabled': False}]})
+    assert [s.name for s in spec.stages] == ['bandpass']
+
+def test_invalid_stage_and_params_are_rejected():
+    with pytest.raises(ValueError, match='Unknown pipeline stage'):
+        StageSpec('maxwell_filter')
+    with pytest.raises(ValueError, match='Unknown parameters'):
+        StageSpec('bandpass', {'cutoff': 3})
+    with pytest.raises(ValueError, match='Invalid frequency'):
+        StageSpec('notch', {'freqs': {'line': 50}})
+
+def test_frequency_lists_are_normalized():
+    a = PipelineSpec.from_dict({'stages': [{'name': 'notch', 'params': {'freqs': [50, 100]}}]})
+    b = PipelineSpec.from_dict({'stages': [{'name': 'notch', 'params': {'freqs': (50.0, 100.0)}}]})
+    assert a.stages[0].params['freqs'] == [50.0, 100.0]
+    assert a.hash == b.hash
+
+def test_from_file_yaml_and_json(tmp_path):
+    spec = {'stages': ['bandpass', 'line_noise'], 'features': {'bands': {'alpha': [8, 13]}}}
+    (tmp_path / 'spec.yaml').write_text(yaml.safe_dump(spec))
+    (tmp_path / 'spec.json').write_text(json.dumps(spec))
+    from_yaml = PipelineSpec.from_file(tmp_path / 'spec.yaml')
+    assert from_yaml.hash == PipelineSpec.from_file(tmp_path / 'spec.json').hash
+    assert from_yaml.bands == {'alpha': [8.0, 13.0]}
+    assert PipelineSpec.from_config({'pipeline': str(tmp_path / 'spec.yaml')}).hash == from_yaml.hash
+
+def test_from_settings_applies_frontend_controls():
+    settings = {
+        'filterRange': [2, 30],
+        'notchFreq': 60,
+        'analysisType': 'comprehensive',
+        'applyICA': False,
+        'customBands': 'alpha:8-12,beta:12-30',
+        'advancedSettings': {'filterOrder': 6, 'filterType': 'fir', 'interpolateChannels': True}
+    }
+    spec = PipelineSpec.from_settings(settings)
+    assert 'ica' not in [s.name for s in spec.stages]
+    assert spec.stage('bandpass').params == {'l_freq': 2.0, 'h_freq': 30.0, 'method': 'fir', 'order': 6}
+    assert spec.stage('line_noise').params['base_freq'] == 60.0
+    assert spec.bands == {'alpha': [8.0, 12.0], 'beta': [12.0, 30.0]}
+
+def test_quick_analysis_skips_expensive_stages():
+    spec = PipelineSpec.from_settings({'analysisType': 'quick'})
+    assert [s.name for s in spec.stages] == ['bandpass', 'notch', 'line_noise']
+
+def test_from_param_files():
+    spec = PipelineSpec.from_param_files('docs/examples/preprocessing_params.csv',
+                                         'docs/examples/feature_params.csv')
+    assert spec.stages[0].name == 'resample'
+    assert spec.stage('resample').params['sfreq'] == 256.0
+    assert spec.bands['delta'] == [0.5, 4.0]
+    assert spec.bands['gamma'] == [30.0, 45.0]
+
+def test_parse_bands_rejects_malformed_input():
+    with pytest.raises(ValueError):
+        parse_bands('alpha:8-x')
+
+def test_precision_is_part_of_the_spec_hash():
+    spec = PipelineSpec.from_dict({'precision': 'float32'})
+    assert spec.precision == 'float32'
+    assert spec.hash != PipelineSpec().hash
+    assert PipelineSpec.from_dict(spec.to_dict()).hash == spec.hash
+    assert PipelineSpec.from_settings({'advancedSettings': {'precision': 'float32'}}).hash == spec.hash
+    with pytest.raises(ValueError, match='Unknown precision'):
+        PipelineSpec.from_dict({'precision': 'float16'})
+
+def test_spectral_params_setting():
+    plain = PipelineSpec()
+    spec = PipelineSpec.from_dict({'features': {'spectral_params': {'window': 2.0, 'max_peaks': 3}}})
+    assert 'spectral_params' not in plain.to_dict()['features']
+    assert spec.hash != plain.hash
+    assert PipelineSpec.from_dict(spec.to_dict()).hash == spec.hash
+    assert PipelineSpec.from_dict({'features': {'spectral_params': True}}).spectral_params == {}
+    with pytest.raises(ValueError, match='spectral_params'):
+        PipelineSpec.from_dict({'features': {'spectral_params': {'knee': 1}}})
@@ -0,0 +1,83 @@
+import mne
+import numpy as np
+import pytest
+from mne.time_frequency import psd_array_welch
+from channel_stats import compute_channel_moments
+from filtering import FilterEngine
+from precision import FLOAT32_TOLERANCES, cast_raw, copy_raw, float64_data, resolve_dtype
+
+@pytest.fixture
+def data():
+    # Random-walk EEG-like signal in volts, 1 kHz, 60 s
+    rng = np.random.default_rng(7)
+    return np.cumsum(rng.standard_normal((8, 60_000)), axis=1) * 1e-6
+
+def _max_error_vs_rms(actual, expected):
+    rms = np.sqrt(np.mean(expected ** 2, axis=1))
+    return np.max(np.abs(actual - expected).max(axis=1) / rms)
+
+@pytest.mark.parametrize('method, tolerance', [('fir', 'fir_filter'), ('iir', 'iir_filter')])
+def test_bandpass_float32_within_tolerance(data, method, tolerance):
+    engine = FilterEngine(method=method)
+    expected = engine.bandpass(data, 1000.0, 1.0, 40.0)
+    actual = engine.bandpass(data.astype(np.float32), 1000.0, 1.0, 40.0)
+    assert actual.dtype == np.float32
+    assert _max_error_vs_rms(actual, expected) <= FLOAT32_TOLERANCES[tolerance]
+
+@pytest.mark.parametrize('method', ['comb', 'notch'])
+def test_line_noise_float32_within_tolerance(data, method):
+    engine = FilterEngine(line_noise_method=method)
+    expected = engine.remove_line_noise(data, 1000.0, 50.0)
+    actual = engine.remove_line_noise(data.astype(np.float32), 1000.0, 50.0)
+    assert actual.dtype == np.float32
+    assert _max_error_vs_rms(actual, expected) <= FLOAT32_TOLERANCES['iir_filter']
+
+def test_band_power_float32_within_tolerance(data):
+    kwargs = dict(fmin=1.0, fmax=40.0, n_fft=2048, n_overlap=1024, verbose=False)
+    expected, freqs = psd_array_welch(data, 1000.0, **kwargs)
+    actual, _ = psd_array_welch(data.astype(np.float32), 1000.0, **kwargs)
+    assert actual.dtype == np.float32
+    for low, high in [(1, 4), (8, 13), (30, 40)]:
+        mask = (freqs >= low) & (freqs <= high)
+        np.testing.assert_allclose(actual[:, mask].mean(axis=1), expected[:, mask].mean(axis=1),
+                                   rtol=FLOAT32_TOLERANCES['band_power'])
+
+def test_statistics_float32_within_tolerance(data):
+    expected = compute_channel_moments(data).to_features()
+    actual = compute_channel_moments(data.astype(np.float32), dtype=np.float32).to_features()
+    for name in ('variance', 'kurtosis', 'skewness', 'rms', 'peak_to_peak'):
+        np.testing.assert_allclose(actual[name], expected[name],
+                                   rtol=FLOAT32_TOLERANCES['statistics'], err_msg=name)
+
+def test_cast_raw_and_float64_roundtrip(data):
+    raw = mne.io.RawArray(data, mne.create_info(8, 1000.0, 'eeg'), verbose=False)
+    assert cast_raw(raw, 'float32') is raw
+    assert raw.get_data().dtype == np.float32
+    assert raw.copy()._data.dtype == np.float32
+    with float64_data(raw):
+        raw.resample(250.0, verbose=False)
+    assert raw._data.dtype == np.float32 and raw.n_times == 15_000
+
+def test_copy_raw_leaves_source_precision(data):
+    raw = mne.io.RawArray(data, mne.create_info(8, 1000.0, 'eeg'), verbose=False)
+    copied = copy_raw(raw, 'float32')
+    assert copied._data.dtype == np.float32 and raw._data.dtype == np.float64
+    assert raw.n_times == copied.n_times == 60_000 and raw.ch_names == copied.ch_names
+    copied._data[:] = 0
+    np.testing.assert_array_equal(raw._data, data)
+
+def test_copy_raw_of_memmap_is_copy_on_write(data, tmp_path):
+    mapped = np.memmap(tmp_path / 'raw.dat', dtype=np.float64, mode='w+', shape=data.shape)
+    mapped[:] = data
+    raw = mne.io.RawArray(mapped, mne.create_info(8, 1000.0, 'eeg'), verbose=False)
+    for precision in ('float64', 'float32'):
+        copied = copy_raw(raw, precision)
+        assert isinstance(copied._data, np.memmap) and copied._data.mode == 'c'
+        np.testing.assert_array_equal(copied._data, data.astype(precision))
+        copied._data[:] = 0
+    np.testing.assert_array_equal(np.fromfile(tmp_path / 'raw.dat').reshape(data.shape), data)
+
+def test_unsupported_precision_rejected():
+    assert resolve_dtype('float32') == np.float32
+    with pytest.raises(ValueError, match='Unsupported precision'):
+        resolve_dtype('float16')
@@ -0,0 +1,106 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qeeg_norms import QEEGNorms, build_qeeg_norms, load_qeeg_norms, transform_features
+
+CHANNELS = ['O1', 'O2', 'Pz', 'Cz']
+BANDS = ['theta', 'alpha', 'beta']
+
+
+def recording(rng, age, alpha_shift=0.0):
+    level = -11.0 - 0.01 * age + 0.2 * rng.standard_normal()
+    band_powers = {band: (10 ** (level + 0.1 * rng.standard_normal(4) + (alpha_shift if band == 'alpha' else 0.0))).tolist()
+                   for band in BANDS}
+    pairs = {f'{a}-{b}': float(np.tanh(0.5 + 0.2 * rng.standard_normal()))
+             for i, a in enumerate(CHANNELS) for b in CHANNELS[i + 1:]}
+    return {'band_powers': band_powers, 'connectivity': {'correlation': {'broadband': pairs}},
+            'statistical': {'variance': [1.0] * 4}}
+
+
+@pytest.fixture(scope='module')
+def reference(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    root = tmp_path_factory.mktemp('features')
+    for i, age in enumerate(rng.uniform(20, 60, 160)):
+        path = root / f'sub-{i:03d}'
+        path.mkdir()
+        with gzip.open(path / 'features.json.gz', 'wt') as f:
+            json.dump(recording(rng, age), f)
+        (path / 'attributes.json').write_text(json.dumps({'ch_names': CHANNELS, 'Age': age}))
+    norms = build_qeeg_norms(root, root / 'norms.npz', age_bins=(0, 20, 40, 60, 120), min_bin_size=30)
+    return root, norms
+
+
+def test_built_from_exported_directory(reference):
+    root, norms = reference
+    assert len(norms.feature_names) == 4 * 3 + 6
+    assert 'band_powers.alpha.O1' in norms.feature_names and 'statistical.variance.0' not in norms.feature_names
+    assert list(norms.groups) == ['band_powers', 'connectivity']
+    assert norms.n[0] == 160 and norms.n[1] == 0 and norms.n[2] + norms.n[3] == 160
+    loaded = load_qeeg_norms(root / 'norms.npz')
+    assert loaded.mean.dtype == np.float32 and loaded.feature_names == norms.feature_names
+
+
+def test_scores_typical_and_abnormal_recordings(reference):
+    root, _ = reference
+    norms = load_qeeg_norms(root / 'norms.npz')
+    rng = np.random.default_rng(1)
+    typical = [recording(rng, 30) for _ in range(40)]
+    scored = norms.score(norms.vectorize(typical, CHANNELS), [30] * 40)
+    assert scored['z'].shape == (40, len(norms.feature_names))
+    assert abs(np.nanmean(scored['z'])) < 0.3 and 0.7 < np.nanstd(scored['z']) < 1.3
+    assert np.mean(scored['mahalanobis']['band_powers']['p_value']) > 0.3
+    assert scored['age_bin'][0] == (20.0, 40.0)
+
+    result = norms.score_features(recording(rng, 30, alpha_shift=1.0), 30, CHANNELS)
+    assert result['z']['band_powers.alpha.O1'] > 3 and abs(result['z']['band_powers.beta.O1']) < 4
+    assert result['mahalanobis']['band_powers']['percentile'] == 100.0
+    assert result['mahalanobis']['band_powers']['p_value'] < 0.05
+    assert json.dumps(result)
+
+
+def test_sparse_bins_fall_back_and_missing_features():
+    rng = np.random.default_rng(2)
+    vectors = pd.DataFrame(rng.lognormal(size=(50, 3)), columns=['band_powers.alpha.0', 'band_powers.beta.0', 'x.y'])
+    vectors.loc[0, 'x.y'] = np.nan
+    norms = QEEGNorms.from_vectors(vectors, [10] * 45 + [70] * 5, age_bins=(0, 50, 100), min_bin_size=10)
+    assert norms.feature_names == ['band_powers.alpha.0', 'band_powers.beta.0']
+    assert norms.rows_for([10, 70, 200, np.nan]).tolist() == [1, 0, 0, 0]
+    scored = norms.score(np.array([[1.0, np.nan]]), [10])
+    assert np.isnan(scored['z'][0, 1]) and np.isnan(scored['mahalanobis']['band_powers']['d2'][0])
+    np.testing.assert_allclose(transform_features([[100.0, 0.5]], ['log', 'fisher']), [[2.0, np.arctanh(0.5)]])
+
+
+def dense_d2(z, x):
+    n, p = z.shape
+    sample = z.T @ z / n
+    target = np.trace(sample) / p
+    delta = np.sum((sample - target * np.eye(p)) ** 2) / p
+    beta = (np.sum(np.sum(z ** 2, axis=1) ** 2) - n * np.sum(sample ** 2)) / (n * n * p)
+    shrinkage = np.clip(beta / delta, 0.0, 1.0)
+    corr = shrinkage * target * np.eye(p) + (1.0 - shrinkage) * sample + 1e-6 * np.eye(p)
+    return x @ np.linalg.solve(corr, x)
+
+
+@pytest.mark.parametrize('n, p', [(12, 40), (60, 8)])
+def test_low_rank_distances_match_dense_shrinkage(n, p):
+    rng = np.random.default_rng(3)
+    sample = rng.standard_normal((n, p)) @ (np.eye(p) + 0.3 * rng.standard_normal((p, p)))
+    norms = QEEGNorms.from_vectors(pd.DataFrame(sample, columns=[f'x.{i}' for i in range(p)]), [30] * n,
+                                   age_bins=(0, 100), min_bin_size=1)
+    assert norms.basis['x'].shape[1] <= min(n - 1, p)
+    mean, std = sample.mean(axis=0), sample.std(axis=0, ddof=1)
+    new = rng.standard_normal((3, p))
+    expected = [dense_d2((sample - mean) / std, (x - mean) / std) for x in new]
+    np.testing.assert_allclose(norms.score(new, [30] * 3)['mahalanobis']['x']['d2'], expected, rtol=1e-6)
+
+    # Leave-one-out distances refit the mean and shrinkage without each recording
+    loo = []
+    for k in range(n):
+        others = np.delete(sample, k, axis=0)
+        loo.append(dense_d2((others - others.mean(axis=0)) / std, (sample[k] - others.mean(axis=0)) / std))
+    np.testing.assert_allclose(norms.reference_d2['x'][1], np.sort(loo), rtol=1e-6)
@@ -0,0 +1,82 @@
+import mne
+import numpy as np
+import pytest
+
+import spatial_filters
+from pipeline_spec import PipelineSpec
+from spatial_filters import SpatialOperator, build_operator
+
+NAMES = ['Fp1', 'Fp2', 'F7', 'F3', 'Fz', 'F4', 'F8', 'T7', 'C3', 'Cz', 'C4', 'T8',
+         'P7', 'P3', 'Pz', 'P4', 'P8', 'O1', 'O2']
+
+
+@pytest.fixture(scope='module')
+def info():
+    info = mne.create_info(NAMES, 256.0, 'eeg')
+    info.set_montage('standard_1020')
+    return info
+
+
+@pytest.fixture(scope='module')
+def pos(info):
+    return spatial_filters.montage_positions(info, NAMES)
+
+
+@pytest.fixture(scope='module')
+def smooth(pos):
+    # Low-order fields over the scalp, which splines reproduce closely
+    unit = spatial_filters._unit_sphere(pos)
+    fields = np.stack([unit[:, 0], unit[:, 1], unit[:, 0] * unit[:, 1]], axis=1)
+    return fields @ np.random.default_rng(0).standard_normal((3, 500))
+
+
+def test_average_reference_matches_mne(info):
+    data = np.random.default_rng(1).standard_normal((len(NAMES), 1000))
+    raw = mne.io.RawArray(data, info, verbose=False)
+    raw.info['bads'] = ['Cz']
+    expected = raw.copy().set_eeg_reference('average', verbose=False).get_data()
+    operator = build_operator(NAMES, bads=['Cz'], reference='average')
+    np.testing.assert_allclose(operator.apply(data), expected, atol=1e-12)
+
+    linked = build_operator(NAMES, reference=['O1', 'O2'])
+    assert linked.is_sparse and linked.nnz == 3 * len(NAMES) - 2
+
+
+def test_interpolation_and_laplacian(pos, smooth):
+    operator = build_operator(NAMES, pos=pos, bads=['C3', 'Pz'], interpolate=True)
+    assert operator.is_sparse
+    restored = operator.apply(np.where(np.isin(NAMES, ['C3', 'Pz'])[:, None], 0.0, smooth))
+    np.testing.assert_allclose(restored, smooth, atol=0.03 * np.abs(smooth).max())
+
+    constant = np.ones((len(NAMES), 5))
+    for method in spatial_filters.LAPLACIAN_METHODS:
+        assert np.abs(build_operator(NAMES, pos=pos, laplacian=method).apply(constant)).max() < 1e-9
+    hjorth = build_operator(NAMES, pos=pos, laplacian='hjorth', n_neighbors=3)
+    assert hjorth.is_sparse and hjorth.nnz == 4 * len(NAMES)
+
+
+def test_operators_are_cached_and_composed(pos):
+    first = build_operator(NAMES, pos=pos, bads=['C3'], interpolate=True, reference='average')
+    assert build_operator(NAMES, pos=pos.copy(), bads=['C3'], interpolate=True, reference='average') is first
+    moved = build_operator(NAMES, pos=pos[::-1].copy(), bads=['C3'], interpolate=True, reference='average')
+    assert moved is not first and not np.allclose(moved.toarray(), first.toarray())
+    composed = build_operator(NAMES, reference='average') @ build_operator(NAMES, pos=pos, bads=['C3'],
+                                                                          interpolate=True)
+    np.testing.assert_allclose(composed.toarray(), first.toarray(), atol=1e-12)
+    with pytest.raises(ValueError):
+        build_operator(NAMES, laplacian='spline')
+
+
+def test_chunked_in_place_application(pos):
+    data = np.random.default_rng(2).standard_normal((len(NAMES), 1001)).astype(np.float32)
+    operator = build_operator(NAMES, pos=pos, laplacian='spline')
+    expected = operator.toarray() @ data.astype(float)
+    operator.apply(data, out=data, chunk_size=100)
+    assert data.dtype == np.float32
+    np.testing.assert_allclose(data, expected, rtol=1e-4, atol=1e-4 * np.abs(expected).max())
+    assert np.array_equal(SpatialOperator.identity(NAMES).apply(data), data)
+
+
+def test_spatial_stage_in_spec():
+    spec = PipelineSpec.from_dict({'stages': ['bad_channels', {'name': 'spatial', 'params': {'laplacian': 'hjorth'}}]})
+    assert spec.stage('spatial').params == {'reference': 'average', 'laplacian': 'hjorth', 'n_neighbors': 4}
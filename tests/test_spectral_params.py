@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from spectral_params import fit_spectra, fit_windows
+
+FREQS = np.arange(0.5, 45.0, 0.25)
+
+
+def synthetic(offset, exponent, peaks, noise=0.01, seed=0):
+    logp = offset - exponent * np.log10(FREQS)
+    for center, height, std in peaks:
+        logp = logp + height * np.exp(-(FREQS - center) ** 2 / (2 * std ** 2))
+    return 10 ** (logp + np.random.default_rng(seed).normal(0, noise, FREQS.size))
+
+
+def test_recovers_aperiodic_and_peaks():
+    fit = fit_spectra(FREQS, synthetic(-1.0, 1.5, [(10.0, 0.8, 1.5), (21.0, 0.4, 2.0)]))
+    assert fit.offset == pytest.approx(-1.0, abs=0.05)
+    assert fit.exponent == pytest.approx(1.5, abs=0.05)
+    assert fit.n_peaks == 2
+    frequency, power, bandwidth = fit.dominant_peak(8, 13)
+    assert frequency == pytest.approx(10.0, abs=0.1)
+    assert power == pytest.approx(0.8, abs=0.05)
+    assert bandwidth == pytest.approx(3.0, abs=0.3)
+    assert fit.dominant_peak(15, 30)[0] == pytest.approx(21.0, abs=0.2)
+    assert fit.r_squared > 0.99
+
+
+def test_batch_shape_and_no_peaks():
+    spectra = np.stack([
+        np.stack([synthetic(0.0, 1.0, []), synthetic(0.5, 2.0, [(11.0, 0.6, 1.0)], seed=1)]),
+        np.stack([synthetic(0.2, 1.2, [(6.0, 0.5, 1.0)], seed=2), synthetic(0.0, 1.0, [], seed=3)]),
+    ])
+    fit = fit_spectra(FREQS, spectra, block_bytes=1)
+    assert fit.exponent.shape == (2, 2)
+    assert fit.peak_frequency.shape == (2, 2, 4)
+    np.testing.assert_array_equal(fit.n_peaks, [[0, 1], [1, 0]])
+    assert np.isnan(fit.dominant_peak()[0][0, 0])
+    np.testing.assert_allclose(fit.exponent, [[1.0, 2.0], [1.2, 1.0]], atol=0.05)
+    assert fit.model(FREQS[(FREQS >= 1) & (FREQS <= 40)]).shape == (2, 2, 157)
+
+
+def test_settings_validation():
+    with pytest.raises(ValueError, match='Unknown'):
+        fit_spectra(FREQS, synthetic(0, 1, []), aperiodic_mode='knee')
+    with pytest.raises(ValueError):
+        fit_spectra(FREQS, synthetic(0, 1, []), fmin=40.0, fmax=40.5)
+
+
+def test_sliding_windows_track_alpha():
+    sfreq = 250.0
+    rng = np.random.default_rng(0)
+    times = np.arange(int(60 * sfreq)) / sfreq
+    alpha = np.sin(2 * np.pi * 10 * times) * (times > 30)
+    data = np.stack([np.cumsum(rng.standard_normal(times.size)) * 0.05 + alpha, rng.standard_normal(times.size)])
+    fit, centers = fit_windows(data, sfreq, window=2.0, step=1.0)
+    assert fit.exponent.shape == (2, len(centers)) == (2, 59)
+    frequency = fit.dominant_peak(8, 13)[0][0]
+    assert np.mean(~np.isnan(frequency[centers > 32])) > 0.9
+    assert np.mean(~np.isnan(frequency[centers < 28])) < 0.5
+    assert np.nanmedian(fit.exponent[1]) == pytest.approx(0.0, abs=0.2)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from summary_sketch import DatasetSummary, KLLSketch, SummaryStore
+
+
+@pytest.fixture
+def responses():
+    rng = np.random.default_rng(0)
+    n = 60_000
+    frame = pd.DataFrame({
+        'Raw_Score': rng.normal(50, 10, n),
+        'Response_Time': rng.lognormal(6, 0.5, n),
+        'Test_Type': rng.choice(['Aptitude', 'Achievement', 'Placement'], n),
+    })
+    frame.loc[::97, 'Response_Time'] = np.nan
+    return frame
+
+
+def test_kll_exact_when_small_and_accurate_when_compacted():
+    values = np.random.default_rng(1).exponential(size=150)
+    np.testing.assert_allclose(KLLSketch().update(values).quantile([0.1, 0.5, 0.9]),
+                               np.quantile(values, [0.1, 0.5, 0.9]))
+    values = np.random.default_rng(2).exponential(size=200_000)
+    sketch = KLLSketch(seed=0)
+    for part in np.array_split(values, 7):
+        sketch.update(part)
+    assert sketch.n == values.size and sum(map(len, sketch.levels)) < 1000
+    ranks = np.searchsorted(np.sort(values), sketch.quantile([0.25, 0.5, 0.75])) / values.size
+    np.testing.assert_allclose(ranks, [0.25, 0.5, 0.75], atol=0.01)
+
+
+def test_batched_and_merged_summaries_match_describe(responses):
+    summary = DatasetSummary(['Test_Type'])
+    for start in range(0, len(responses), 12_000):
+        summary.update(responses.iloc[start:start + 12_000])
+    left, right = DatasetSummary(['Test_Type']), DatasetSummary(['Test_Type'])
+    left.update(responses.iloc[:20_000])
+    right.update(responses.iloc[20_000:])
+    merged = left.merge(right)
+
+    for result in (summary, merged):
+        assert result.n_rows == len(responses)
+        for key, rows in [(None, responses), (('Test_Type', 'Placement'), responses[responses['Test_Type'] == 'Placement'])]:
+            expected = rows.describe()
+            got = result.describe(key)[expected.columns]
+            moments = ['count', 'mean', 'std', 'min', 'max']
+            pd.testing.assert_frame_equal(got.loc[moments], expected.loc[moments], rtol=1e-9)
+            np.testing.assert_allclose(got.loc[['25%', '50%', '75%']], expected.loc[['25%', '50%', '75%']], rtol=0.02)
+    assert sorted(summary.groups()['Test_Type']) == ['Achievement', 'Aptitude', 'Placement']
+    with pytest.raises(ValueError):
+        summary.merge(DatasetSummary())
+
+
+def test_store_persists_and_serves(responses, tmp_path):
+    store = SummaryStore(tmp_path, group_by=['Test_Type'])
+    store.update('scores', responses.iloc[:30_000])
+    before = store.get('scores')
+    store.update('scores', responses.iloc[30_000:])
+    after = store.get('scores')
+    assert before.n_rows == 30_000 and after.n_rows == len(responses) and store.datasets() == ['scores']
+    served = after.to_dict('Test_Type')
+    assert served['groups']['Aptitude']['Raw_Score']['count'] == (responses['Test_Type'] == 'Aptitude').sum()
+    reloaded = DatasetSummary.load(tmp_path / 'scores.npz').update(responses.iloc[:10])
+    assert reloaded.n_rows == len(responses) + 10
+    with pytest.raises(ValueError):
+        store.path('../etc')
+    with pytest.raises(KeyError):
+        store.get('missing')
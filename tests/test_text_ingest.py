@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from text_ingest import read_raw_text, read_text_data, scan_layout
+
+EXAMPLE = 'docs/examples/raw_eeg_data.csv'
+
+
+@pytest.fixture
+def tsv_file(tmp_path):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.standard_normal((5000, 4)), columns=['A', 'B', 'C', 'D'])
+    frame.insert(0, 'Time', np.arange(5000) / 500.0)
+    path = tmp_path / 'eeg.tsv'
+    frame.to_csv(path, sep='\t', index=False)
+    return path, frame
+
+
+def test_example_csv_matches_pandas():
+    raw = read_raw_text(EXAMPLE)
+    expected = pd.read_csv(EXAMPLE)
+    assert raw.info['sfreq'] == 256
+    assert raw.ch_names == list(expected.columns[1:])
+    np.testing.assert_allclose(raw.get_data(), expected.iloc[:, 1:].to_numpy().T)
+
+
+def test_small_blocks_memmap_and_scale(tsv_file, tmp_path):
+    path, frame = tsv_file
+    layout = scan_layout(path, block_size=4096)
+    assert (layout.delimiter, layout.n_samples, layout.sfreq) == ('\t', 5000, 500)
+    data = read_text_data(path, layout, memmap_path=tmp_path / 'raw.dat', scale=1e-6, block_size=4096)
+    assert isinstance(data, np.memmap)
+    np.testing.assert_allclose(data, frame[['A', 'B', 'C', 'D']].to_numpy().T * 1e-6)
+
+
+def test_raw_shares_memmap(tsv_file, tmp_path):
+    path, _ = tsv_file
+    raw = read_raw_text(path, memmap_path=tmp_path / 'raw.dat')
+    assert isinstance(raw._data, np.memmap)
+
+
+def test_without_time_column(tmp_path):
+    path = tmp_path / 'eeg.csv'
+    pd.DataFrame({'Fz': np.arange(10.0), 'Cz': np.ones(10)}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        scan_layout(path)
+    with pytest.raises(ValueError):
+        scan_layout(path, time_column=None)
+    raw = read_raw_text(path, time_column=None, sfreq=100.0)
+    assert raw.n_times == 10 and raw.ch_names == ['Fz', 'Cz']
+
+
+def test_non_monotonic_time_rejected(tmp_path):
+    path = tmp_path / 'eeg.csv'
+    pd.DataFrame({'Time': [0.0, 0.1, 0.05], 'Fz': [1.0, 2.0, 3.0]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        scan_layout(path)